@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from synthetic import generate_stroke_data
+from Preprocessing.preprocessing import BMIImputer
+
+
+def legacy_fill_missing_bmi(df, glucose_col='avg_glucose_level', bmi_col='bmi', gender_col='gender', bins=4):
+    """
+    The original merge-based fill_missing_bmi, kept here as the benchmark baseline.
+    """
+    df = df.copy()
+    df['Glucose_bin'] = pd.cut(df[glucose_col], bins=bins, labels=False)
+    median_bmi = df.groupby([gender_col, 'Glucose_bin'])[bmi_col].median().reset_index()
+    median_bmi = median_bmi.rename(columns={bmi_col: 'Median_BMI'})
+    df = pd.merge(df, median_bmi, on=[gender_col, 'Glucose_bin'], how='left')
+    df[bmi_col] = df[bmi_col].fillna(df['Median_BMI'])
+    overall_median_per_gender = df.groupby(gender_col)[bmi_col].transform(lambda x: x.fillna(x.median()))
+    df[bmi_col] = df[bmi_col].fillna(overall_median_per_gender)
+    df[bmi_col] = df[bmi_col].fillna(df[bmi_col].median())
+    df.drop(columns=['Glucose_bin', 'Median_BMI'], inplace=True)
+    return df
+
+
+def best_time(func, repeat):
+    """
+    Returns the best wall time of repeat runs and the result of the last run.
+    """
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start_time)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BMIImputer against the merge-based fill_missing_bmi.")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    df = generate_stroke_data(args.rows)
+    print(f"{args.rows} rows, {df['bmi'].isna().sum()} missing BMI values")
+
+    legacy_time, legacy_df = best_time(lambda: legacy_fill_missing_bmi(df), args.repeat)
+    fit_time, imputer = best_time(lambda: BMIImputer().fit(df), args.repeat)
+    transform_time, new_df = best_time(lambda: imputer.transform(df), args.repeat)
+    chunked_time, _ = best_time(lambda: [imputer.transform(df.iloc[start:start + args.chunksize])
+                                         for start in range(0, len(df), args.chunksize)], args.repeat)
+
+    assert np.allclose(legacy_df['bmi'].to_numpy(), new_df['bmi'].to_numpy()), "Both implementations should fill the same values"
+
+    print(f"legacy fill_missing_bmi:       {legacy_time:8.3f} s")
+    print(f"BMIImputer.fit:                {fit_time:8.3f} s")
+    print(f"BMIImputer.transform:          {transform_time:8.3f} s")
+    print(f"BMIImputer.transform (chunks): {chunked_time:8.3f} s")
+    print(f"speedup (fit + transform):     {legacy_time / (fit_time + transform_time):8.1f}x")
+    print(f"speedup (transform only):      {legacy_time / transform_time:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import argparse
+import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from sklearn.preprocessing import StandardScaler
+from synthetic import generate_stroke_data
+from Preprocessing.preprocessing import explore_data, fill_missing_bmi, encode_columns, apply_schema
+from FeatureAnalysis.feature_analysis import split_data
+from config import Categorical_Columns, Encoding_Dictionary, Column_Schema, Categorical_Dtype, Feature_Dtype
+from bench_bmi_imputer import best_time
+
+
+def preprocess(df, compact):
+    """
+    Runs the in-memory preprocessing steps, with the original object/int64 types or with the compact schema.
+    """
+    df = explore_data(df.set_index('id'), Categorical_Columns, Categorical_Dtype if compact else 'object')
+    df = encode_columns(fill_missing_bmi(df), Encoding_Dictionary)
+    return apply_schema(df, Column_Schema) if compact else df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compact column schema against the original column types.")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    raw = generate_stroke_data(args.rows)
+    print(f"{args.rows} rows")
+
+    results = {}
+    for name, compact in (('original', False), ('compact', True)):
+        explored = explore_data(raw.set_index('id'), Categorical_Columns, Categorical_Dtype if compact else 'object')
+        preprocess_time, df = best_time(lambda: preprocess(raw, compact), args.repeat)
+        dtype = Feature_Dtype if compact else None
+        X = df.drop(columns=['stroke']).astype(dtype) if compact else df.drop(columns=['stroke'])
+        results[name] = {
+            'explored memory (MB)': explored.memory_usage(deep=True).sum() / 1024 ** 2,
+            'encoded memory (MB)': df.memory_usage(deep=True).sum() / 1024 ** 2,
+            'preprocessing (s)': preprocess_time,
+            'split_data (s)': best_time(lambda: split_data(df, 'stroke', dtype=dtype), args.repeat)[0],
+            'StandardScaler (s)': best_time(lambda: StandardScaler().fit_transform(X), args.repeat)[0],
+        }
+
+    print(f"{'':24}{'original':>12}{'compact':>12}{'ratio':>8}")
+    for measure in results['original']:
+        original, compact = results['original'][measure], results['compact'][measure]
+        print(f"{measure:24}{original:12.3f}{compact:12.3f}{original / compact:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
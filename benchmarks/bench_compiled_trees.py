@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from synthetic import generate_stroke_data
+from Preprocessing.preprocessing import fill_missing_bmi, encode_columns, apply_schema
+from FeatureAnalysis.balancing import balance_data
+from FeatureAnalysis.feature_analysis import split_data
+from compiled_trees import compile_trees
+from config import Encoding_Dictionary, Column_Schema, Feature_Dtype, Model_Registry, build_models
+
+Tree_Models = ['Decision Tree', 'Random Forest', 'Gradient Boosting']
+
+
+def load_data(n_rows):
+    """
+    Generates n_rows synthetic records and prepares them like the pipeline: imputation, encoding, balancing and split.
+    """
+    df = generate_stroke_data(n_rows).set_index('id')
+    df = apply_schema(encode_columns(fill_missing_bmi(df), Encoding_Dictionary), Column_Schema)
+    X_train, X_test, y_train, _ = split_data(balance_data(df), 'stroke', dtype=Feature_Dtype)
+    return X_train, X_test, np.asarray(y_train)
+
+
+def latencies(predict, batches):
+    """
+    Calls predict on every batch and returns the p50 and p99 latencies in milliseconds.
+    """
+    times = []
+    for batch in batches:
+        start_time = time.perf_counter()
+        predict(batch)
+        times.append(time.perf_counter() - start_time)
+    return np.percentile(times, 50) * 1000, np.percentile(times, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scoring latency of the compiled tree models against scikit-learn.")
+    parser.add_argument('--rows', type=int, default=100_000, help="synthetic records to generate")
+    parser.add_argument('--batch-sizes', type=int, nargs='*', default=[1, 64, 10_000])
+    parser.add_argument('--calls', type=int, default=200, help="predict_proba calls per batch size (at most 20 for 10k rows and more)")
+    parser.add_argument('--models', nargs='*', default=Tree_Models)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    X_train, X_test, y_train = load_data(args.rows)
+    X_test = np.resize(X_test, (max(len(X_test), max(args.batch_sizes)), X_test.shape[1]))
+    rng = np.random.RandomState(42)
+
+    print(f"{'model':18}{'batch':>7}{'sklearn p50':>13}{'p99 (ms)':>10}{'compiled p50':>14}{'p99 (ms)':>10}{'speedup p50':>13}")
+    models = build_models({name: Model_Registry[name] for name in args.models})
+    for name, model in models.items():
+        model.fit(X_train, y_train)
+        compiled = compile_trees(model)
+        for batch_size in args.batch_sizes:
+            n_calls = args.calls if batch_size < 10_000 else min(args.calls, 20)
+            starts = rng.randint(0, len(X_test) - batch_size + 1, n_calls)
+            batches = [X_test[start:start + batch_size] for start in starts]
+            assert np.array_equal(compiled.predict_proba(batches[0]), model.predict_proba(batches[0]))
+            sklearn_p50, sklearn_p99 = latencies(model.predict_proba, batches)
+            compiled_p50, compiled_p99 = latencies(compiled.predict_proba, batches)
+            print(f"{name:18}{batch_size:7d}{sklearn_p50:13.3f}{sklearn_p99:10.3f}{compiled_p50:14.3f}{compiled_p99:10.3f}"
+                  f"{sklearn_p50 / compiled_p50:12.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Modules are imported like python src/main.py does: from the repository root, with src on the path
+ENVIRONMENT = {**os.environ, 'PYTHONPATH': os.path.join(ROOT_DIR, 'src')}
+
+# Entry points: the training pipeline and the scoring-only CLI
+Entry_Points = ['main', 'predict']
+
+# Heavy dependencies that should only be loaded by the stages that use them
+Heavy_Modules = ['sklearn', 'scipy', 'matplotlib', 'seaborn']
+
+
+def cold_start(statement, repeat):
+    """
+    Runs statement in fresh interpreters and returns the wall times in seconds and the heavy modules it loaded.
+    """
+    code = (f"import sys, time; start = time.perf_counter(); {statement}; elapsed = time.perf_counter() - start; "
+            f"print(elapsed, *[module for module in {Heavy_Modules!r} if module in sys.modules])")
+    times, loaded = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, env=ENVIRONMENT, capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(output[0]))
+        loaded = output[1:]
+    return times, loaded
+
+
+def top_imports(module, count):
+    """
+    Returns the count slowest imports (cumulative microseconds) of a module from python -X importtime.
+    """
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], cwd=ROOT_DIR,
+                            env=ENVIRONMENT, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines()[1:]:
+        _, cumulative, name = line.split('|')
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cold-start import time of the entry points.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=0, help="also list the slowest imports of every entry point")
+    args = parser.parse_args()
+
+    print(f"{'entry point':12}{'median (s)':>12}{'best (s)':>10}  heavy modules loaded")
+    for module in Entry_Points:
+        times, loaded = cold_start(f"import {module}", args.repeat)
+        print(f"{module:12}{statistics.median(times):12.3f}{min(times):10.3f}  {', '.join(loaded) or '-'}")
+
+    for module in Entry_Points if args.top else []:
+        print(f"\nSlowest imports of {module}:")
+        for cumulative, name in top_imports(module, args.top):
+            print(f"{cumulative / 1e6:8.3f} s  {name}")
+
+
+if __name__ == '__main__':
+    main()
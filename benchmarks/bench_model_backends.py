@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from synthetic import generate_stroke_data
+from Preprocessing.preprocessing import fill_missing_bmi, encode_columns, apply_schema
+from FeatureAnalysis.balancing import balance_data
+from FeatureAnalysis.feature_analysis import split_data
+from metrics import compute_metrics
+from config import Encoding_Dictionary, Column_Schema, Feature_Dtype, Model_Backends, build_models
+
+
+def load_data(n_rows):
+    """
+    Generates n_rows synthetic records and prepares them like the pipeline: imputation, encoding, balancing and split.
+    """
+    df = generate_stroke_data(n_rows).set_index('id')
+    df = apply_schema(encode_columns(fill_missing_bmi(df), Encoding_Dictionary), Column_Schema)
+    X_train, X_test, y_train, y_test = split_data(balance_data(df), 'stroke', dtype=Feature_Dtype)
+    return X_train, X_test, np.asarray(y_train), np.asarray(y_test)
+
+
+def evaluate(model, X_train, y_train, X_test, y_test):
+    """
+    Fits the model and returns its fit time, predict time and test metrics.
+    """
+    start_time = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    y_pred = model.predict(X_test)
+    predict_time = time.perf_counter() - start_time
+    return fit_time, predict_time, compute_metrics(y_test, y_pred)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the model backends on growing synthetic datasets.")
+    parser.add_argument('--rows', type=int, nargs='*', default=[5_000, 100_000, 1_000_000])
+    parser.add_argument('--families', nargs='*', default=list(Model_Backends))
+    parser.add_argument('--max-slow-rows', type=int, default=100_000,
+                        help="skip the exact gradient boosting and kernel SVM above this many training rows")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    slow_backends = {('Gradient Boosting', 'exact'), ('SVM', 'kernel')}
+    print(f"{'rows':>9}{'train rows':>12}  {'model':18}{'backend':11}{'fit (s)':>9}{'predict (s)':>12}{'F-Score':>9}{'Accuracy':>10}")
+    for n_rows in args.rows:
+        X_train, X_test, y_train, y_test = load_data(n_rows)
+        for family in args.families:
+            for backend, entry in Model_Backends[family].items():
+                prefix = f"{n_rows:9d}{len(y_train):12d}  {family:18}{backend:11}"
+                if (family, backend) in slow_backends and len(y_train) > args.max_slow_rows:
+                    print(f"{prefix}{'skipped':>9}")
+                    continue
+                model = build_models({family: entry['estimator']})[family]
+                fit_time, predict_time, metrics = evaluate(model, X_train, y_train, X_test, y_test)
+                print(f"{prefix}{fit_time:9.2f}{predict_time:12.3f}{metrics['F-Score']:9.2f}{metrics['Accuracy']:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import pipeline
+from synthetic import write_stroke_csv
+from plotting import PlotQueue
+from profiler import StageProfiler
+from FeatureAnalysis.feature_analysis import split_data, pca_analysis
+from FeatureAnalysis.balancing import balance_data
+from models import grid_search_func
+from config import Feature_Dtype, PCA_Batch_Size, Models, SearchStrategies
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), 'results', 'pipeline_stages.csv')
+
+# Small grids, so the search stage measures how the scheduler and the fits scale with the rows
+Benchmark_Grids = {
+    'Decision Tree': {'max_depth': [5, 10, None]},
+    'Random Forest': {'n_estimators': [25, 50], 'max_depth': [10, None]},
+    'Neural Network': {'hidden_layer_sizes': [(50,)], 'max_iter': [100, 200]},
+    'SVM': {'C': [1], 'kernel': ['rbf']},
+    'Gradient Boosting': {'n_estimators': [25, 50], 'max_depth': [3]},
+}
+
+# A stage is reported as a regression when it is this much slower than in the previous run with the same rows and
+# configuration (stages faster than Regression_Min_Time seconds are too noisy to compare)
+Regression_Ratio = 1.2
+Regression_Min_Time = 0.5
+
+
+def git_commit():
+    """
+    Returns the short hash of the checked out commit (with a + if the tree has changes), or None outside git.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        changed = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+        return commit + ('+' if changed else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_stages(filepath, models, streaming_chunksize, work_directory):
+    """
+    Runs preprocess_data, split_data, pca_analysis and grid_search_func on one data file under a StageProfiler.
+    Returns the profiler's summary table.
+    """
+    # Measure the stages themselves: no feature store, no plots, and the streaming intermediates in the work directory
+    pipeline.Feature_Store_Directory = None
+    pipeline.plot_queue = PlotQueue('off')
+    pipeline.Streaming_Chunksize = streaming_chunksize
+    pipeline.Intermediate_Directory = os.path.join(work_directory, 'intermediate')
+
+    profiler = StageProfiler()
+    with profiler.stage('preprocess_data'):
+        df, _ = pipeline.preprocess_data(filepath)
+    with profiler.stage('split_data'):
+        X_train, _, _, _ = split_data(df, 'stroke', dtype=Feature_Dtype)
+    with profiler.stage('pca_analysis'):
+        pca_analysis(X_train, PCA_Batch_Size)
+
+    X_train, X_test, y_train, y_test = split_data(balance_data(df), 'stroke', dtype=Feature_Dtype)
+    with profiler.stage('grid_search_func') as record:
+        results = grid_search_func(X_train, y_train, X_test, y_test, {name: Models[name] for name in models},
+                                   Benchmark_Grids, SearchStrategies)
+        record['fits'] = int(results['Fits'].sum())
+    return profiler.summary()
+
+
+def compare_with_previous(results, previous):
+    """
+    Adds the time of the previous run with the same configuration, rows and stage, and flags the stages that got slower.
+    """
+    previous = previous[previous['config'] == results['config'].iloc[0]] if previous is not None else None
+    if previous is None or previous.empty:
+        return results.assign(previous_wall_time=np.nan, ratio=np.nan, regression=False)
+    last_run = previous[previous['run'] == previous['run'].iloc[-1]]
+    merged = results.merge(last_run[['rows', 'stage', 'wall_time']].rename(columns={'wall_time': 'previous_wall_time'}),
+                           on=['rows', 'stage'], how='left')
+    merged['ratio'] = (merged['wall_time'] / merged['previous_wall_time']).round(2)
+    merged['regression'] = (merged['ratio'] > Regression_Ratio) & (merged['wall_time'] >= Regression_Min_Time)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on growing synthetic datasets.")
+    parser.add_argument('--rows', type=int, nargs='*', default=[5_000, 50_000, 500_000])
+    parser.add_argument('--models', nargs='*', default=['Decision Tree', 'Random Forest', 'Gradient Boosting'])
+    parser.add_argument('--chunksize', type=int, default=None, help="preprocess in chunks (Streaming_Chunksize)")
+    parser.add_argument('--output', default=RESULTS_PATH, help="CSV file the results of every run are appended to")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    previous = pd.read_csv(args.output) if os.path.exists(args.output) else None
+    run = {'run': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': git_commit(),
+           'config': f"chunksize={args.chunksize} models={'/'.join(args.models)}"}
+
+    tables = []
+    with tempfile.TemporaryDirectory() as work_directory:
+        for n_rows in args.rows:
+            filepath = write_stroke_csv(os.path.join(work_directory, f"stroke_{n_rows}.csv"), n_rows)
+            summary = run_stages(filepath, args.models, args.chunksize, work_directory)
+            tables.append(summary.reset_index().assign(rows=n_rows, **run))
+            os.remove(filepath)
+
+    columns = ['run', 'commit', 'config', 'rows', 'stage', 'wall_time', 'cpu_time', 'peak_rss_mb', 'fits']
+    results = pd.concat(tables)[columns]
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    results.to_csv(args.output, mode='a', header=previous is None, index=False)
+
+    report = compare_with_previous(results, previous)
+    print(report[['rows', 'stage', 'wall_time', 'cpu_time', 'peak_rss_mb', 'fits', 'previous_wall_time', 'ratio']].to_string(index=False))
+    regressions = report[report['regression']]
+    for _, row in regressions.iterrows():
+        print(f"Regression: {row['stage']} at {row['rows']} rows took {row['wall_time']:.2f} s "
+              f"({row['ratio']:.2f}x the previous run)")
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
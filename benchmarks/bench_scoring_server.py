@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from synthetic import generate_stroke_data
+
+SERVE_SCRIPT = os.path.join(os.path.dirname(__file__), '../src/serve.py')
+
+
+async def request(reader, writer, method, path, payload=None):
+    """
+    Sends one request on a keep-alive connection and returns the status and JSON body of the response.
+    """
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers['content-length']))
+    return int(status_line.split()[1]), json.loads(body)
+
+
+async def client(host, port, records, latencies):
+    """
+    Sends the records one request at a time on one connection, like a single intake terminal.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    for record in records:
+        start_time = time.perf_counter()
+        status, _ = await request(reader, writer, 'POST', '/predict', record)
+        latencies.append(time.perf_counter() - start_time)
+        if status != 200:
+            raise RuntimeError(f"The server answered {status}.")
+    writer.close()
+
+
+async def run_load(host, port, records, concurrency):
+    """
+    Sends the records from concurrency clients at once. Returns the elapsed time, the request latencies
+    and the server's metrics after the run.
+    """
+    latencies = []
+    start_time = time.perf_counter()
+    await asyncio.gather(*[client(host, port, records[i::concurrency], latencies) for i in range(concurrency)])
+    elapsed = time.perf_counter() - start_time
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, metrics = await request(reader, writer, 'GET', '/metrics')
+    writer.close()
+    return elapsed, np.asarray(latencies) * 1000, metrics
+
+
+def wait_for_server(host, port, timeout=60):
+    """
+    Waits until the server answers /health.
+    """
+    async def health():
+        reader, writer = await asyncio.open_connection(host, port)
+        status, _ = await request(reader, writer, 'GET', '/health')
+        writer.close()
+        return status
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if asyncio.run(health()) == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"No scoring server on {host}:{port}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the scoring server with concurrent single-patient requests.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--requests', type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument('--concurrency', type=int, nargs='*', default=[1, 8, 32, 128])
+    parser.add_argument('--start-server', action='store_true',
+                        help="start src/serve.py on the port first (with the exported model artifact)")
+    parser.add_argument('--max-batch-size', type=int, default=None)
+    parser.add_argument('--max-wait-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    server = None
+    if args.start_server:
+        command = [sys.executable, SERVE_SCRIPT, '--host', args.host, '--port', str(args.port)]
+        if args.max_batch_size is not None:
+            command += ['--max-batch-size', str(args.max_batch_size)]
+        if args.max_wait_ms is not None:
+            command += ['--max-wait-ms', str(args.max_wait_ms)]
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server(args.host, args.port)
+
+        # Raw patient records as the intake system would send them (a missing BMI is null)
+        df = generate_stroke_data(args.requests).drop(columns=['id', 'stroke'])
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+
+        print(f"{'clients':>8}{'requests/s':>12}{'p50 (ms)':>10}{'p99 (ms)':>10}{'mean batch':>12}{'max queue':>11}")
+        previous = {'records': 0, 'batches': 0}
+        for concurrency in args.concurrency:
+            elapsed, latencies, metrics = asyncio.run(run_load(args.host, args.port, records, concurrency))
+            mean_batch = (metrics['records'] - previous['records']) / max(metrics['batches'] - previous['batches'], 1)
+            previous = metrics
+            print(f"{concurrency:8d}{len(records) / elapsed:12.0f}{np.percentile(latencies, 50):10.2f}"
+                  f"{np.percentile(latencies, 99):10.2f}{mean_batch:12.1f}{metrics['max_queue_depth']:11d}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import warnings
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from Preprocessing.preprocessing import fill_missing_bmi, encode_columns, apply_schema
+from FeatureAnalysis.balancing import balance_data, UndersampledEnsemble
+from FeatureAnalysis.feature_analysis import split_data
+from metrics import compute_metrics
+from config import Encoding_Dictionary, Column_Schema, Feature_Dtype, Models
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/healthcare-dataset-stroke-data.csv')
+
+
+def load_data():
+    """
+    Preprocesses the stroke dataset and splits it like the pipeline: the single balanced subset is split
+    into training and test sets, and the non-stroke rows left out by balancing are scaled the same way.
+    """
+    df = apply_schema(encode_columns(fill_missing_bmi(pd.read_csv(DATA_PATH, index_col='id')), Encoding_Dictionary), Column_Schema)
+    balanced, unused = balance_data(df, return_unused=True)
+    X_train, X_test, y_train, y_test, scaler = split_data(balanced, 'stroke', return_scaler=True, dtype=Feature_Dtype)
+    X_unused = scaler.transform(unused.drop(columns=['stroke']).astype(Feature_Dtype))
+    return X_train, X_test, np.asarray(y_train), np.asarray(y_test), X_unused, unused['stroke'].astype(int).to_numpy()
+
+
+def evaluate(model, X_train, y_train, X_test, y_test, predict_rows):
+    """
+    Fits the model and returns its fit time, prediction throughput (rows/s) and test metrics.
+    """
+    start_time = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start_time
+
+    X_predict = np.resize(X_test, (predict_rows, X_test.shape[1]))
+    start_time = time.perf_counter()
+    model.predict(X_predict)
+    throughput = predict_rows / (time.perf_counter() - start_time)
+
+    return fit_time, throughput, compute_metrics(y_test, model.predict(X_test))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the undersampled ensemble against the single balanced subset.")
+    parser.add_argument('--subsets', type=int, default=10)
+    parser.add_argument('--sampling', choices=['disjoint', 'bootstrap'], default='disjoint')
+    parser.add_argument('--predict-rows', type=int, default=100_000)
+    parser.add_argument('--models', nargs='*', default=list(Models))
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    warnings.filterwarnings('ignore', message='Stochastic Optimizer')
+
+    X_train, X_test, y_train, y_test, X_unused, y_unused = load_data()
+    X_full, y_full = np.concatenate([X_train, X_unused]), np.concatenate([y_train, y_unused])
+    print(f"balanced training rows: {len(y_train)}, with the left-out rows: {len(y_full)}, test rows: {len(y_test)}")
+
+    print(f"{'model':20}{'mode':10}{'fit (s)':>9}{'rows/s':>12}{'Precision':>10}{'Recall':>8}{'F-Score':>8}")
+    for model_name in args.models:
+        estimator = Models[model_name]
+        runs = {
+            'single': evaluate(estimator, X_train, y_train, X_test, y_test, args.predict_rows),
+            'ensemble': evaluate(UndersampledEnsemble(estimator, args.subsets, args.sampling),
+                                 X_full, y_full, X_test, y_test, args.predict_rows),
+        }
+        for mode, (fit_time, throughput, metrics) in runs.items():
+            print(f"{model_name:20}{mode:10}{fit_time:9.2f}{throughput:12.0f}"
+                  f"{metrics['Precision']:10.2f}{metrics['Recall']:8.2f}{metrics['F-Score']:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import warnings
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from Preprocessing.preprocessing import fill_missing_bmi, encode_columns, apply_schema
+from FeatureAnalysis.balancing import balance_data
+from FeatureAnalysis.feature_analysis import split_data
+from scheduler import run_schedule
+from config import Encoding_Dictionary, Column_Schema, Feature_Dtype, Models, ParametersForGridSearch, SearchStrategies
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/healthcare-dataset-stroke-data.csv')
+
+# Models whose grids have a warm-start parameter (n_estimators or max_iter)
+Warm_Start_Models = ['Random Forest', 'Gradient Boosting']
+
+
+def load_data():
+    """
+    Preprocesses and balances the stroke dataset and returns the balanced training set, like the pipeline.
+    """
+    df = apply_schema(encode_columns(fill_missing_bmi(pd.read_csv(DATA_PATH, index_col='id')), Encoding_Dictionary), Column_Schema)
+    X_train, _, y_train, _ = split_data(balance_data(df), 'stroke', dtype=Feature_Dtype)
+    return X_train, np.asarray(y_train)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the searches with and without warm-started paths.")
+    parser.add_argument('--models', nargs='*', default=Warm_Start_Models)
+    parser.add_argument('--strategy', choices=['config', 'exhaustive'], default='config',
+                        help="search strategies of config.SearchStrategies, or an exhaustive search of every grid")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    warnings.filterwarnings('ignore', message='Stochastic Optimizer')
+
+    X_train, y_train = load_data()
+    print(f"training rows: {len(y_train)}, strategy: {args.strategy}")
+    print(f"{'model':20}{'warm start':>11}{'wall (s)':>10}{'fit time (s)':>14}{'fits':>7}{'warm':>7}  best parameters")
+    for model_name in args.models:
+        strategies = SearchStrategies if args.strategy == 'config' else {}
+        for warm_start in (False, True):
+            start_time = time.perf_counter()
+            result = run_schedule({'X': X_train}, y_train, {model_name: Models[model_name]}, ParametersForGridSearch,
+                                  strategies, n_jobs=args.n_jobs, warm_start=warm_start)[('X', model_name)]
+            wall_time = time.perf_counter() - start_time
+            print(f"{model_name:20}{str(warm_start):>11}{wall_time:10.2f}{result['search_time']:14.2f}"
+                  f"{result['n_fits']:7d}{result['n_warm']:7d}  {result['best_params']}")
+
+
+if __name__ == '__main__':
+    main()
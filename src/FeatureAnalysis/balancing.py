@@ -1,19 +1,23 @@
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
 from sklearn.utils import shuffle
-from logger import logger 
+from logger import logger, LazyMessage 
 
-def balance_data(df, target_col='stroke'):
+def balance_data(df, target_col='stroke', return_unused=False):
     """
     Balances the dataset by randomly selecting an equal number of non-stroke cases 
     as there are stroke cases.
+    With return_unused=True the non-stroke cases that were left out are returned as well,
+    so an undersampled ensemble can still train on them.
 
     """
     try:
         logger.info("Starting the balancing process...")
 
         # Count the number of samples before balancing
-        before_balancing = df[target_col].value_counts()
-        logger.info(f"Before balancing:\n{before_balancing}")
+        logger.info("Before balancing:\n%s", LazyMessage(df[target_col].value_counts))
 
         # Separate the dataset into stroke and non-stroke cases
         stroke_cases = df[df[target_col] == 1]
@@ -29,13 +33,92 @@ def balance_data(df, target_col='stroke'):
         balanced_df = shuffle(balanced_df, random_state=42).reset_index(drop=True)
 
         # Count the number of samples after balancing
-        after_balancing = balanced_df[target_col].value_counts()
-        logger.info(f"\nAfter balancing:\n{after_balancing}")
+        logger.info("\nAfter balancing:\n%s", LazyMessage(balanced_df[target_col].value_counts))
 
         logger.info("Balancing completed successfully.")
 
+        if return_unused:
+            return balanced_df, non_stroke_cases.drop(random_non_stroke.index).reset_index(drop=True)
         return balanced_df
 
     except Exception as e:
         logger.error(f"Error during data balancing: {e}")
-        return None
+        return (None, None) if return_unused else None
+
+
+def undersample_indices(y, n_subsets=None, sampling='disjoint', random_state=42):
+    """
+    Draws balanced training subsets: every subset has all the minority class rows and as many majority class rows.
+    sampling='disjoint' splits the shuffled majority rows into subsets that do not overlap
+    (n_subsets=None uses all of them), sampling='bootstrap' draws every subset independently.
+    Returns a list of row index arrays.
+
+    """
+    y = np.asarray(y)
+    classes, counts = np.unique(y, return_counts=True)
+    minority = np.flatnonzero(y == classes[np.argmin(counts)])
+    majority = np.flatnonzero(y != classes[np.argmin(counts)])
+    rng = np.random.default_rng(random_state)
+
+    max_subsets = len(majority) // len(minority)
+    if sampling == 'disjoint':
+        n_subsets = max_subsets if n_subsets is None else min(n_subsets, max_subsets)
+        chosen = rng.permutation(majority)[:n_subsets * len(minority)].reshape(n_subsets, len(minority))
+    elif sampling == 'bootstrap':
+        chosen = np.array([rng.choice(majority, len(minority), replace=False) for _ in range(n_subsets or max_subsets)])
+    else:
+        raise ValueError(f"Unknown sampling '{sampling}', expected 'disjoint' or 'bootstrap'.")
+
+    return [np.sort(np.concatenate([minority, subset])) for subset in chosen]
+
+
+def _fit_member(estimator, X, y, indices):
+    return clone(estimator).fit(X[indices], y[indices])
+
+
+class UndersampledEnsemble(ClassifierMixin, BaseEstimator):
+    """
+    Repeated undersampling ensemble: fits a copy of the estimator on each balanced subset drawn by
+    undersample_indices (in parallel), so all of the majority class is used, and averages the members.
+    predict_proba stacks the members' probabilities (or their votes, for estimators without predict_proba)
+    and averages them in one vectorized operation.
+    """
+
+    def __init__(self, estimator, n_subsets=None, sampling='disjoint', n_jobs=-1, random_state=42):
+        self.estimator = estimator
+        self.n_subsets = n_subsets
+        self.sampling = sampling
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X, y = np.asarray(X), np.asarray(y)
+        self.classes_ = np.unique(y)
+        subsets = undersample_indices(y, self.n_subsets, self.sampling, self.random_state)
+        self.estimators_ = Parallel(n_jobs=self.n_jobs)(delayed(_fit_member)(self.estimator, X, y, indices) for indices in subsets)
+        return self
+
+    def partial_fit(self, X, y):
+        """
+        Adds members fitted on balanced subsets of new rows, keeping the members already fitted.
+        """
+        if not hasattr(self, 'estimators_'):
+            return self.fit(X, y)
+        X, y = np.asarray(X), np.asarray(y)
+        # Draw the new subsets with a different seed than the ones already used
+        random_state = None if self.random_state is None else self.random_state + len(self.estimators_)
+        subsets = undersample_indices(y, self.n_subsets, self.sampling, random_state)
+        self.estimators_ += Parallel(n_jobs=self.n_jobs)(delayed(_fit_member)(self.estimator, X, y, indices) for indices in subsets)
+        return self
+
+    def predict_proba(self, X):
+        X = np.asarray(X)
+        if all(hasattr(member, 'predict_proba') for member in self.estimators_):
+            probabilities = np.stack([member.predict_proba(X) for member in self.estimators_])
+        else:
+            votes = np.stack([member.predict(X) for member in self.estimators_])
+            probabilities = (votes[..., None] == self.classes_).astype(float)
+        return probabilities.mean(axis=0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -1,56 +1,89 @@
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
 from logger import logger
-from sklearn.decomposition import PCA
+from FeatureAnalysis.moments import MomentAccumulator
+import numpy as np
 import pandas as pd
 
-def split_data(df, outcome):
+# Rows converted to float64 at once when the moments of the split are collected (unless split_data is given a batch_size)
+Moment_Batch_Rows = 100_000
+
+def split_data(df, outcome, return_scaler=False, dtype=None, return_moments=False, scale=True, batch_size=None):
     """    
-    Splits the data into training and testing sets, and standardizes the features.
+    Splits the data into training and testing sets, and standardizes the features with the scaler of the training rows.
+    With scale=False the features are returned unscaled, for searches that fit the preprocessing inside every fold.
+    With return_scaler=True the fitted StandardScaler is returned as well, so it can be reused on new data.
+    With a dtype (e.g. 'float32') the features are cast to it before scaling, so the scaled matrices keep it.
+    With return_moments=True the MomentAccumulators of the training and testing rows (all columns of df) are returned
+    as well, so the correlation matrix and the PCA do not need to scan the data again. The moments are collected
+    from chunks of batch_size rows (Moment_Batch_Rows by default), so only one chunk is copied to float64 at a time.
 
     """
+    n_outputs = 4 + return_scaler + return_moments
     try:
         logger.info("Starting the data splitting process...")
         
         # Check if outcome column exists in the DataFrame
         if outcome not in df.columns:
             logger.error(f"Outcome column '{outcome}' not found in DataFrame.")
-            return None, None, None, None
+            return (None,) * n_outputs
         
         # Split the data into features and outcome
         y = df[outcome].astype(int)
         X = df.drop(columns=[outcome])
+        if dtype is not None:
+            X = X.astype(dtype)
         
         logger.info("Data successfully split into features and outcome.")
         
-        # Standardize the features
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        
-        logger.info("Features successfully standardized.")
-        
+        # Split the row positions, and collect the moments of the training and testing rows chunk by chunk
+        train_idx, test_idx = train_test_split(np.arange(len(df)), test_size=0.3, random_state=42)
+        step = batch_size or Moment_Batch_Rows
+        train_moments, test_moments = MomentAccumulator(df.columns), MomentAccumulator(df.columns)
+        for moments, idx in ((train_moments, train_idx), (test_moments, test_idx)):
+            for start in range(0, len(idx), step):
+                moments.update(df.iloc[idx[start:start + step]].to_numpy(dtype=np.float64))
+
         # Split the dataset into training and testing sets
-        X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.3, random_state=42)
+        X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+
+        # Standardize the features with the StandardScaler of the training rows, derived from their moments
+        scaler = train_moments.select(X.columns).scaler()
+        if scale:
+            X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+            logger.info("Features successfully standardized.")
+        else:
+            X_train, X_test = X_train.to_numpy(), X_test.to_numpy()
+        y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
         
         logger.info("Data successfully split into training and testing sets.")
         
-        return X_train, X_test, y_train, y_test
+        outputs = (X_train, X_test, y_train, y_test)
+        if return_scaler:
+            outputs += (scaler,)
+        if return_moments:
+            outputs += ((train_moments, test_moments),)
+        return outputs
     
     except Exception as e:
         logger.error(f"Error in split_data function: {e}")
-        return None, None, None, None
+        return (None,) * n_outputs
 
-def pca_analysis(X_train):
+def pca_analysis(X_train, batch_size=None, moments=None):
     """
     Perform PCA analysis on the provided training data.
+    The PCA is derived from one eigendecomposition of the covariance matrix of X_train, from its moments when they
+    were already collected (see scaled_training_moments). With a batch_size, the moments are accumulated and the data
+    is projected in chunks of rows, so memory is bounded by the chunk size.
 
     """
     try:
         logger.info("Starting PCA analysis...")
 
-        # Perform PCA
-        pca = PCA()
-        X_pca = pca.fit_transform(X_train)
+        # Accumulate the moments of the training data unless they are given, then project it
+        if moments is None:
+            moments = MomentAccumulator.from_array(X_train, batch_size=batch_size)
+        pca = moments.pca(dtype=X_train.dtype)
+        X_pca = pca_transform(pca, X_train, batch_size)
 
         logger.info("PCA analysis completed successfully.")
         
@@ -60,6 +93,30 @@ def pca_analysis(X_train):
         return None, None
 
 
+def scaled_training_moments(moments, scaler):
+    """
+    Returns the moments of the standardized training features, from the moments of the training rows
+    and the scaler returned by split_data.
+
+    """
+    return moments.select(list(scaler.feature_names_in_)).standardize(scaler.mean_, scaler.scale_)
+
+
+def pca_transform(pca, X, batch_size=None):
+    """
+    Projects X on all principal components, in chunks of batch_size rows if one is given.
+    The result keeps the type of X and can be sliced for any number of components.
+
+    """
+    if batch_size is None:
+        return pca.transform(X)
+
+    X_pca = np.empty((len(X), pca.n_components_), dtype=X.dtype)
+    for start in range(0, len(X), batch_size):
+        X_pca[start:start + batch_size] = pca.transform(X[start:start + batch_size])
+    return X_pca
+
+
 def pca_contribution(pca, features):
     """
     Evaluates the contribution of the features to the first two principal components (PC1 and PC2).
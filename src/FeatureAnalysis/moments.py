@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import StandardScaler
+
+
+class MomentAccumulator:
+    """
+    Count, mean and co-moment matrix (the sum of the outer products of the centered rows) of the columns of a dataset.
+    Chunks of rows are added with update, and the accumulators of other chunks or worker processes are combined
+    with merge (the pairwise update of Chan et al.), so the statistics take one scan of the data in any order.
+    The correlation matrix, the StandardScaler and the PCA are derived from them without scanning the data again.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.n_samples = 0
+        self.mean = np.zeros(len(self.columns))
+        self.comoment = np.zeros((len(self.columns), len(self.columns)))
+
+    @classmethod
+    def from_array(cls, X, columns=None, batch_size=None):
+        """
+        Accumulates the rows of X (an array or DataFrame), in chunks of batch_size rows if one is given.
+
+        """
+        if columns is None:
+            columns = X.columns if isinstance(X, pd.DataFrame) else range(X.shape[1])
+        accumulator = cls(columns)
+        step = batch_size or max(len(X), 1)
+        for start in range(0, len(X), step):
+            accumulator.update(X[start:start + step])
+        return accumulator
+
+    def _combine(self, n_samples, mean, comoment):
+        if n_samples == 0:
+            return
+        if self.n_samples == 0:
+            self.n_samples, self.mean, self.comoment = n_samples, mean.copy(), comoment.copy()
+            return
+        total = self.n_samples + n_samples
+        delta = mean - self.mean
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * (self.n_samples * n_samples / total)
+        self.mean = self.mean + delta * (n_samples / total)
+        self.n_samples = total
+
+    def update(self, X):
+        """
+        Adds a chunk of rows.
+
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return self
+        mean = X.mean(axis=0)
+        centered = X - mean
+        self._combine(len(X), mean, centered.T @ centered)
+        return self
+
+    def merge(self, other):
+        """
+        Returns the accumulator of the rows of both accumulators.
+
+        """
+        if other.columns != self.columns:
+            raise ValueError("Only accumulators of the same columns can be merged.")
+        merged = MomentAccumulator(self.columns)
+        merged._combine(self.n_samples, self.mean, self.comoment)
+        merged._combine(other.n_samples, other.mean, other.comoment)
+        return merged
+
+    def select(self, columns):
+        """
+        Returns the accumulator of a subset of the columns.
+
+        """
+        positions = [self.columns.index(column) for column in columns]
+        selected = MomentAccumulator(columns)
+        selected.n_samples = self.n_samples
+        selected.mean = self.mean[positions]
+        selected.comoment = self.comoment[np.ix_(positions, positions)]
+        return selected
+
+    def standardize(self, mean, scale):
+        """
+        Returns the statistics of the rows after they are standardized with mean and scale (e.g. a fitted StandardScaler's).
+
+        """
+        standardized = MomentAccumulator(self.columns)
+        standardized.n_samples = self.n_samples
+        standardized.mean = (self.mean - mean) / scale
+        standardized.comoment = self.comoment / np.outer(scale, scale)
+        return standardized
+
+    def covariance(self, ddof=1):
+        return self.comoment / max(self.n_samples - ddof, 1)
+
+    def correlation(self):
+        """
+        Returns the Pearson correlation matrix as a DataFrame, like DataFrame.corr (NaN for constant columns).
+
+        """
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = self.comoment / np.outer(std, std)
+        correlation[:, std == 0] = np.nan
+        correlation[std == 0, :] = np.nan
+        np.fill_diagonal(correlation, np.where(std == 0, np.nan, 1.0))
+        return pd.DataFrame(np.clip(correlation, -1, 1), index=self.columns, columns=self.columns)
+
+    def scaler(self):
+        """
+        Returns a StandardScaler fitted to the accumulated rows.
+
+        """
+        var = self.covariance(ddof=0).diagonal().copy()
+
+        # Constant columns (up to the rounding error of the variance) keep a scale of 1, like in StandardScaler
+        eps = np.finfo(np.float64).eps
+        constant = var <= self.n_samples * eps * var + (self.n_samples * self.mean * eps) ** 2
+
+        scaler = StandardScaler()
+        scaler.mean_, scaler.var_ = self.mean.copy(), var
+        scaler.scale_ = np.where(constant, 1.0, np.sqrt(var))
+        scaler.n_samples_seen_ = self.n_samples
+        scaler.n_features_in_ = len(self.columns)
+        if all(isinstance(column, str) for column in self.columns):
+            scaler.feature_names_in_ = np.asarray(self.columns, dtype=object)
+        return scaler
+
+    def pca(self, n_components=None, dtype=np.float64):
+        """
+        Returns a PCA fitted to the accumulated rows from one eigendecomposition of their covariance matrix,
+        with the sign convention of scikit-learn's PCA. dtype is the type of the data it will transform.
+
+        """
+        n_features = len(self.columns)
+        n_components = n_features if n_components is None else n_components
+        eigenvalues, eigenvectors = np.linalg.eigh(self.covariance())
+        order = np.argsort(eigenvalues)[::-1]
+        eigenvalues = np.clip(eigenvalues[order], 0, None)
+        components = eigenvectors[:, order].T
+
+        # Make the largest loading of every component positive
+        signs = np.sign(components[np.arange(n_features), np.argmax(np.abs(components), axis=1)])
+        components *= signs[:, np.newaxis]
+
+        pca = PCA(n_components=n_components)
+        pca.components_ = components[:n_components].astype(dtype)
+        pca.explained_variance_ = eigenvalues[:n_components].astype(dtype)
+        pca.explained_variance_ratio_ = (eigenvalues[:n_components] / eigenvalues.sum()).astype(dtype)
+        pca.singular_values_ = np.sqrt(eigenvalues[:n_components] * (self.n_samples - 1)).astype(dtype)
+        pca.noise_variance_ = float(eigenvalues[n_components:].mean()) if n_components < n_features else 0.0
+        pca.mean_ = self.mean.astype(dtype)
+        pca.n_components_ = n_components
+        pca.n_samples_ = self.n_samples
+        pca.n_features_in_ = n_features
+        return pca
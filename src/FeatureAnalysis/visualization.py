@@ -1,21 +1,26 @@
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
 import pandas as pd
 import os
 from logger import logger
+from config import Plot_Directory
 
 # Define a directory to save the plots
-output_dir = "plots" 
+output_dir = Plot_Directory
 
-# Make sure the directory exists
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
+def _pyplot():
+    """
+    Imports matplotlib with the non-interactive Agg backend when the first plot is drawn,
+    and makes sure the plots directory exists.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    os.makedirs(output_dir, exist_ok=True)
+    return plt
 
 def plot_correlation_heatmap(df, method='pearson'):
     """
     Calculates and plots a heatmap for the correlation matrix of the given DataFrame.
+    Returns the paths of the saved plots.
 
     """
     logger.info(f"Calculating {method} correlation matrix...")
@@ -26,10 +31,21 @@ def plot_correlation_heatmap(df, method='pearson'):
         logger.info("Correlation matrix calculated successfully.")
     except Exception as e:
         logger.error(f"Error computing correlation matrix: {e}")
-        return
+        return []
+
+    return plot_correlation_matrix(corr_mat, method)
+
 
+def plot_correlation_matrix(corr_mat, method='pearson'):
+    """
+    Plots a heatmap of an already calculated correlation matrix (e.g. from a MomentAccumulator).
+    Returns the paths of the saved plots.
+
+    """
     # Plot heatmap
     try:
+        import seaborn as sns
+        plt = _pyplot()
         plt.figure(figsize=(8, 6))
         sns.heatmap(corr_mat, annot=True, cmap='coolwarm', fmt='.2f')
         plt.title(f'Correlation Heatmap ({method.capitalize()} Method)')
@@ -40,13 +56,16 @@ def plot_correlation_heatmap(df, method='pearson'):
         plt.close() 
 
         logger.info(f"Correlation heatmap saved as {plot_filename}.")
+        return [plot_filename]
     except Exception as e:
         logger.error(f"Error plotting heatmap: {e}")
+        return []
 
 
 def plot_scree_plot(pca, status):
     """
     Plots the Scree plot showing the explained variance ratio of each principal component.
+    Returns the paths of the saved plots.
     
     """
     try:
@@ -56,6 +75,7 @@ def plot_scree_plot(pca, status):
         explained_variance = pca.explained_variance_ratio_
 
         # Plotting the Scree plot
+        plt = _pyplot()
         plt.figure(figsize=(8, 6))
         plt.plot(range(1, len(explained_variance) + 1), explained_variance, marker='o', linestyle='--')
         plt.title(f'Scree Plot - {status}')
@@ -77,5 +97,7 @@ def plot_scree_plot(pca, status):
         for i, var in enumerate(explained_variance_percent, 1):
             logger.info(f"PC{i}: {var:.2f}%")
 
+        return [plot_filename]
     except Exception as e:
-        logger.error(f"Error in plotting Scree plot: {e}")
\ No newline at end of file
+        logger.error(f"Error in plotting Scree plot: {e}")
+        return []
\ No newline at end of file
@@ -1,73 +1,198 @@
+import numpy as np
 import pandas as pd
-from logger import logger
+from logger import logger, LazyMessage
 
 
-def explore_data(df, categorical_columns):
+def explore_data(df, categorical_columns, categorical_dtype='object'):
     """
-    Explores the dataset and converting categorical columns to object type,
+    Explores the dataset and converting categorical columns to object type (or to categorical_dtype),
     checking for missing values, and identifying duplicates.
 
     """
     logger.info("Starting data exploring process...")
 
     # Convert categorical columns to object type
-    df[categorical_columns] = df[categorical_columns].astype('object')
-    logger.info("Converted categorical columns to object type.")
+    df[categorical_columns] = df[categorical_columns].astype(categorical_dtype)
+    logger.info(f"Converted categorical columns to {categorical_dtype} type.")
 
-    # Descriptive statistics
-    logger.info(f"Descriptive Statistics:\n{df.describe()}")
+    # Descriptive statistics (the statistics are only computed when the records are logged)
+    logger.info("Descriptive Statistics:\n%s", LazyMessage(df.describe))
 
     # Check for duplicates
-    duplicates = df.duplicated().sum()
-    logger.info(f"Number of duplicate rows: {duplicates}")
+    logger.info("Number of duplicate rows: %s", LazyMessage(lambda: df.duplicated().sum()))
 
     # Check for missing values
-    missing_values = df.isna().sum()
-    logger.info(f"Missing values per column:\n{missing_values}")
+    logger.info("Missing values per column:\n%s", LazyMessage(lambda: df.isna().sum()))
 
     logger.info("Data exploring process completed.")
     return df
 
-def fill_missing_bmi(df, glucose_col='avg_glucose_level', bmi_col='bmi', gender_col='gender', bins=4):
+def _median_from_counts(values, counts):
+    """
+    Returns the median of a multiset given as distinct values and their counts (NaN if it is empty).
+    """
+    total = counts.sum()
+    if total == 0:
+        return np.nan
+    order = np.argsort(values, kind='stable')
+    cumulative = np.cumsum(counts[order])
+    lower = values[order][np.searchsorted(cumulative, (total - 1) // 2, side='right')]
+    upper = values[order][np.searchsorted(cumulative, total // 2, side='right')]
+    return (lower + upper) / 2
+
+class BMIImputer:
+    """
+    Fills missing BMI values with the median BMI of the row's (gender, glucose level bin) group,
+    then with the median BMI per gender, then with the overall median.
+    The glucose bin edges and the medians are learned once by fit, and transform fills new rows
+    (or chunks of rows) with an indexed lookup into those learned tables.
+    """
+
+    def __init__(self, glucose_col='avg_glucose_level', bmi_col='bmi', gender_col='gender', bins=4):
+        self.glucose_col = glucose_col
+        self.bmi_col = bmi_col
+        self.gender_col = gender_col
+        self.bins = bins
+
+    def _codes(self, df):
+        """
+        Returns the gender code (-1 for unknown genders) and glucose bin of every row.
+        Glucose levels outside the training range fall into the first or last bin.
+        """
+        gender_codes = self.genders_.get_indexer(df[self.gender_col])
+        glucose_bins = np.searchsorted(self.bin_edges_[1:-1], df[self.glucose_col].to_numpy(dtype=float), side='left')
+        return gender_codes, glucose_bins
+
+    def fit(self, df):
+        """
+        Learns the equal-width glucose bin edges and the median BMI tables from the training data.
+        """
+        # Same equal-width bins as pd.cut(bins=bins)
+        glucose = df[self.glucose_col].to_numpy(dtype=float)
+        _, self.bin_edges_ = pd.cut(glucose, bins=self.bins, retbins=True)
+        glucose_bins = np.searchsorted(self.bin_edges_[1:-1], glucose, side='left')
+        gender_codes, self.genders_ = pd.factorize(df[self.gender_col])
+        bmi = df[self.bmi_col].to_numpy(dtype=float)
+        known = gender_codes >= 0
+
+        # Median BMI for each (gender, glucose_bin) group, stored as a (gender x bin) lookup table
+        group_keys = gender_codes[known] * self.bins + glucose_bins[known]
+        group_medians = pd.Series(bmi[known]).groupby(group_keys).median()
+        self.group_medians_ = np.full(len(self.genders_) * self.bins, np.nan)
+        self.group_medians_[group_medians.index.to_numpy()] = group_medians.to_numpy()
+        self.group_medians_ = self.group_medians_.reshape(len(self.genders_), self.bins)
+
+        # Gender-wise and overall medians, computed after the group fill
+        group_filled = bmi.copy()
+        fill_group = np.isnan(bmi) & known
+        group_filled[fill_group] = self.group_medians_[gender_codes[fill_group], glucose_bins[fill_group]]
+        gender_medians = pd.Series(group_filled[known]).groupby(gender_codes[known]).median()
+        self.gender_medians_ = gender_medians.reindex(range(len(self.genders_))).to_numpy()
+
+        gender_filled = group_filled.copy()
+        fill_gender = np.isnan(group_filled) & known
+        gender_filled[fill_gender] = self.gender_medians_[gender_codes[fill_gender]]
+        self.overall_median_ = float(np.nanmedian(gender_filled))
+        return self
+
+    def fit_chunks(self, make_chunks):
+        """
+        Fits the imputer on data that does not fit in memory. make_chunks() must return a new iterator
+        of DataFrame chunks: the first pass finds the glucose range and the genders, the second pass counts
+        the BMI values of every group, from which the same medians as fit are computed exactly.
+        """
+        # First pass: glucose range (which sets the bin edges) and genders
+        low, high, genders = np.inf, -np.inf, pd.Index([])
+        for chunk in make_chunks():
+            glucose = chunk[self.glucose_col].to_numpy(dtype=float)
+            low, high = min(low, np.nanmin(glucose)), max(high, np.nanmax(glucose))
+            genders = genders.append(pd.Index(pd.unique(chunk[self.gender_col].dropna()))).unique()
+        _, self.bin_edges_ = pd.cut(np.array([low, high]), bins=self.bins, retbins=True)
+        self.genders_ = genders
+        n_groups = len(self.genders_) * self.bins
+
+        # Second pass: mergeable counts of every (group, BMI value) pair and of the missing values per group
+        value_counts, missing_counts = None, np.zeros(n_groups, dtype=np.int64)
+        for chunk in make_chunks():
+            gender_codes, glucose_bins = self._codes(chunk)
+            bmi = chunk[self.bmi_col].to_numpy(dtype=float)
+            group_keys = gender_codes * self.bins + glucose_bins
+            known = gender_codes >= 0
+            present = known & ~np.isnan(bmi)
+            chunk_counts = pd.Series(bmi[present]).groupby([group_keys[present], bmi[present]]).size()
+            value_counts = chunk_counts if value_counts is None else value_counts.add(chunk_counts, fill_value=0)
+            missing_counts += np.bincount(group_keys[known & np.isnan(bmi)], minlength=n_groups)
+
+        # Group medians from the counts
+        keys = value_counts.index.get_level_values(0).to_numpy()
+        values = value_counts.index.get_level_values(1).to_numpy()
+        counts = value_counts.to_numpy()
+        self.group_medians_ = np.array([_median_from_counts(values[keys == key], counts[keys == key]) for key in range(n_groups)])
+
+        # Gender-wise medians after the group fill: missing values count as their group median
+        group_filled = np.flatnonzero((missing_counts > 0) & ~np.isnan(self.group_medians_))
+        keys = np.concatenate([keys, group_filled])
+        values = np.concatenate([values, self.group_medians_[group_filled]])
+        counts = np.concatenate([counts, missing_counts[group_filled]])
+        genders = keys // self.bins
+        self.gender_medians_ = np.array([_median_from_counts(values[genders == gender], counts[genders == gender])
+                                         for gender in range(len(self.genders_))])
+
+        # Overall median after the gender fill
+        still_missing = np.bincount(np.flatnonzero(np.isnan(self.group_medians_)) // self.bins,
+                                    weights=missing_counts[np.isnan(self.group_medians_)], minlength=len(self.genders_))
+        gender_filled = np.flatnonzero((still_missing > 0) & ~np.isnan(self.gender_medians_))
+        values = np.concatenate([values, self.gender_medians_[gender_filled]])
+        counts = np.concatenate([counts, still_missing[gender_filled]])
+        self.group_medians_ = self.group_medians_.reshape(len(self.genders_), self.bins)
+        self.overall_median_ = float(_median_from_counts(values, counts))
+        return self
+
+    def transform(self, df):
+        """
+        Returns a copy of df with its missing BMI values filled from the learned tables.
+        """
+        df = df.copy()
+        bmi = df[self.bmi_col].to_numpy(dtype=float, copy=True)
+        missing = np.flatnonzero(np.isnan(bmi))
+        if len(missing) == 0:
+            return df
+
+        # Only the missing rows are looked up
+        gender_codes, glucose_bins = self._codes(df.iloc[missing])
+        known = gender_codes >= 0
+        fill = np.full(len(missing), np.nan)
+        fill[known] = self.group_medians_[gender_codes[known], glucose_bins[known]]
+        fill_gender = np.isnan(fill) & known
+        fill[fill_gender] = self.gender_medians_[gender_codes[fill_gender]]
+        fill[np.isnan(fill)] = self.overall_median_
+
+        bmi[missing] = fill
+        df[self.bmi_col] = bmi
+        return df
+
+    def fit_transform(self, df):
+        """
+        Fits the imputer on df and fills its missing BMI values.
+        """
+        return self.fit(df).transform(df)
+
+def fill_missing_bmi(df, glucose_col='avg_glucose_level', bmi_col='bmi', gender_col='gender', bins=4, return_imputer=False):
     """
     Fills missing BMI values with the median BMI, grouped by gender and glucose level bins.
     If any BMI values remain missing, they are filled using the overall median BMI per gender.
+    With return_imputer=True the fitted BMIImputer is returned as well, so it can fill new records the same way.
     """
     logger.info("Starting BMI filling process...")
 
-    df = df.copy()
-
-    # Create glucose bins
-    df['Glucose_bin'] = pd.cut(df[glucose_col], bins=bins, labels=False)
-    logger.info(f"Created {bins} glucose bins.")
-
-    # Calculate median BMI for each (gender, glucose_bin) group
-    median_bmi = df.groupby([gender_col, 'Glucose_bin'])[bmi_col].median().reset_index()
-    median_bmi = median_bmi.rename(columns={bmi_col: 'Median_BMI'})
-    logger.info("Calculated median BMI for each (gender, glucose_bin) group.")
-
-    # Merge and fill missing BMI values
-    df = pd.merge(df, median_bmi, on=[gender_col, 'Glucose_bin'], how='left')
     missing_before = df[bmi_col].isna().sum()
-    df[bmi_col] = df[bmi_col].fillna(df['Median_BMI'])
-    missing_after = df[bmi_col].isna().sum()
-    logger.info(f"Filled {missing_before - missing_after} missing BMI values.")
-
-    # Handle any remaining NaN values using gender-wise median BMI
-    overall_median_per_gender = df.groupby(gender_col)[bmi_col].transform(lambda x: x.fillna(x.median()))
-    df[bmi_col] = df[bmi_col].fillna(overall_median_per_gender)
-    final_missing = df[bmi_col].isna().sum()
-    
-    if final_missing > 0:
-        overall_median = df[bmi_col].median()
-        df[bmi_col].fillna(overall_median, inplace=True)
-        logger.info(f"Filled remaining {final_missing} missing BMI values using overall median.")
-
-    # Drop temporary columns
-    df.drop(columns=['Glucose_bin', 'Median_BMI'], inplace=True)
-    logger.info("Dropped temporary columns used for grouping.")
+    imputer = BMIImputer(glucose_col, bmi_col, gender_col, bins).fit(df)
+    df = imputer.transform(df)
+    logger.info(f"Filled {missing_before} missing BMI values using {bins} glucose bins.")
 
     logger.info("BMI filling process completed.")
+    if return_imputer:
+        return df, imputer
     return df
 
 def encode_columns(df, encoding_dict):
@@ -85,3 +210,20 @@ def encode_columns(df, encoding_dict):
 
     logger.info("Encoding process completed.")
     return df_copy
+
+def apply_schema(df, schema):
+    """
+    Casts the columns of the encoded dataset to the compact types of the schema
+    (columns missing from the schema keep their type) and logs the memory saved.
+
+    """
+    logger.info("Starting schema casting process...")
+
+    memory_before = df.memory_usage(deep=True).sum()
+    df = df.astype({column: dtype for column, dtype in schema.items() if column in df.columns})
+    memory_after = df.memory_usage(deep=True).sum()
+    logger.info(f"Memory usage reduced from {memory_before / 1024 ** 2:.2f} MB to {memory_after / 1024 ** 2:.2f} MB "
+                f"({1 - memory_after / memory_before:.0%} saved).")
+
+    logger.info("Schema casting process completed.")
+    return df
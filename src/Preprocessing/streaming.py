@@ -0,0 +1,239 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from logger import logger, LazyMessage
+from Preprocessing.preprocessing import BMIImputer, encode_columns
+
+# Size reserved for the .npy header, so the number of rows can be written once the file is complete
+NPY_HEADER_SIZE = 128
+
+
+def _npy_header(dtype, n_rows):
+    """
+    Builds a fixed-size .npy (version 1.0) header for a one-dimensional array of n_rows values.
+    """
+    header = repr({'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': (n_rows,)})
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + np.uint16(len(header)).tobytes() + header.encode('latin1')
+
+
+class ColumnarWriter:
+    """
+    Appends DataFrame chunks to one .npy file per column, so the result can be opened
+    with np.load(mmap_mode='r') without loading it into memory.
+    """
+
+    def __init__(self, directory, dtypes):
+        self.directory = directory
+        self.dtypes = dtypes
+        self.n_rows = 0
+        os.makedirs(directory, exist_ok=True)
+        self.files = {column: open(os.path.join(directory, f"{column}.npy"), 'wb') for column in dtypes}
+        for column, file in self.files.items():
+            file.write(_npy_header(dtypes[column], 0))
+
+    def append(self, df):
+        for column, file in self.files.items():
+            file.write(np.ascontiguousarray(df[column].to_numpy(dtype=self.dtypes[column])).tobytes())
+        self.n_rows += len(df)
+
+    def close(self):
+        # Write the final number of rows into every header, then the schema of the dataset
+        for column, file in self.files.items():
+            file.seek(0)
+            file.write(_npy_header(self.dtypes[column], self.n_rows))
+            file.close()
+
+        schema = {'n_rows': self.n_rows, 'dtypes': {column: np.dtype(dtype).str for column, dtype in self.dtypes.items()}}
+        with open(os.path.join(self.directory, 'schema.json'), 'w') as file:
+            json.dump(schema, file, indent=2)
+
+
+def load_columnar(directory, index_col='id', mmap_mode='r'):
+    """
+    Opens a columnar dataset written by ColumnarWriter as a DataFrame backed by memory-mapped columns.
+
+    """
+    with open(os.path.join(directory, 'schema.json')) as file:
+        schema = json.load(file)
+
+    columns = {column: np.load(os.path.join(directory, f"{column}.npy"), mmap_mode=mmap_mode) for column in schema['dtypes']}
+    index = columns.pop(index_col, None)
+    return pd.DataFrame(columns, index=pd.Index(index, name=index_col) if index is not None else None, copy=False)
+
+
+class ExplorationStats:
+    """
+    Builds the exploration statistics of explore_data incrementally, one chunk at a time:
+    counts, missing values, moments and value counts are exact, quantiles come from a bounded random sample
+    of rows, and duplicate rows are found by spilling 64-bit row hashes into buckets on disk.
+    """
+
+    def __init__(self, numeric_columns, categorical_columns, spill_directory, sample_size=100000, n_buckets=64, random_state=42):
+        self.numeric_columns = numeric_columns
+        self.categorical_columns = categorical_columns
+        self.spill_directory = spill_directory
+        self.sample_size = sample_size
+        self.n_buckets = n_buckets
+        self.rng = np.random.default_rng(random_state)
+
+        self.n_rows = 0
+        self.missing_values = None
+        self.value_counts = {}
+        self.moments = {column: {'count': 0, 'mean': 0.0, 'm2': 0.0, 'min': np.inf, 'max': -np.inf} for column in numeric_columns}
+        self.sample, self.sample_keys = None, np.empty(0)
+
+        os.makedirs(spill_directory, exist_ok=True)
+        self.buckets = [open(os.path.join(spill_directory, f"hashes_{bucket}.bin"), 'wb') for bucket in range(n_buckets)]
+
+    def update(self, chunk):
+        """
+        Adds one chunk of raw rows to the statistics.
+        """
+        self.n_rows += len(chunk)
+
+        # Missing values and categorical value counts
+        missing = chunk.isna().sum()
+        self.missing_values = missing if self.missing_values is None else self.missing_values.add(missing, fill_value=0)
+        for column in self.categorical_columns:
+            counts = chunk[column].value_counts()
+            self.value_counts[column] = counts if column not in self.value_counts else self.value_counts[column].add(counts, fill_value=0)
+
+        # Mergeable moments of the numeric columns (Chan et al. parallel update)
+        for column in self.numeric_columns:
+            values = chunk[column].to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            moments = self.moments[column]
+            count = moments['count'] + len(values)
+            delta = values.mean() - moments['mean']
+            moments['m2'] += ((values - values.mean()) ** 2).sum() + delta ** 2 * moments['count'] * len(values) / count
+            moments['mean'] += delta * len(values) / count
+            moments['count'] = count
+            moments['min'] = min(moments['min'], values.min())
+            moments['max'] = max(moments['max'], values.max())
+
+        # Bottom-k random sample of rows: keep the rows with the smallest random keys
+        keys = self.rng.random(len(chunk))
+        sample = chunk if self.sample is None else pd.concat([self.sample, chunk])
+        keys = np.concatenate([self.sample_keys, keys])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            sample, keys = sample.iloc[keep], keys[keep]
+        self.sample, self.sample_keys = sample, keys
+
+        # Spill the row hashes to their bucket files for the duplicate count
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        buckets = hashes % self.n_buckets
+        for bucket in np.unique(buckets):
+            self.buckets[bucket].write(hashes[buckets == bucket].tobytes())
+
+    def count_duplicates(self):
+        """
+        Counts the duplicate rows one hash bucket at a time and removes the spill files.
+        """
+        for file in self.buckets:
+            file.close()
+
+        duplicates = 0
+        for bucket in range(self.n_buckets):
+            hashes = np.fromfile(os.path.join(self.spill_directory, f"hashes_{bucket}.bin"), dtype=np.uint64)
+            duplicates += len(hashes) - len(np.unique(hashes))
+        self.close()
+        return duplicates
+
+    def close(self):
+        """
+        Closes the bucket files and removes the spill directory (also when the statistics were not finished).
+        """
+        for file in self.buckets:
+            file.close()
+        shutil.rmtree(self.spill_directory, ignore_errors=True)
+
+    def describe(self):
+        """
+        Returns the same table as DataFrame.describe() for the numeric columns, with approximate quartiles.
+        """
+        table = {}
+        for column, moments in self.moments.items():
+            count = moments['count']
+            quartiles = self.sample[column].quantile([0.25, 0.5, 0.75]).to_numpy()
+            table[column] = [count, moments['mean'], np.sqrt(moments['m2'] / (count - 1)) if count > 1 else np.nan,
+                             moments['min'], *quartiles, moments['max']]
+        return pd.DataFrame(table, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
+
+
+def _decode(codes, mapping):
+    """
+    Maps encoded values back to their labels with a lookup array.
+    """
+    labels = np.empty(max(mapping.values()) + 1, dtype=object)
+    for label, code in mapping.items():
+        labels[code] = label
+    return labels[codes]
+
+
+def stream_preprocess(filepath, output_directory, categorical_columns, numeric_columns, encoding_dict, chunksize=100000, schema=None):
+    """
+    Preprocesses a CSV file that does not fit in memory. The file is read once in chunks: exploration statistics
+    are built incrementally and the encoded chunks are written to a columnar dataset of .npy files.
+    The BMI imputer is then fitted and applied on the memory-mapped columns, so peak memory depends on
+    the chunk size and not on the file size. Columns are written with the types of the schema when given.
+    Returns the exploration statistics and the fitted BMIImputer.
+
+    """
+    logger.info(f"Starting streaming preprocessing of {filepath} in chunks of {chunksize} rows...")
+
+    # Compact output types in the file's column order: the schema's types, or else small integer codes
+    # for categorical columns and floats for numeric ones
+    schema = schema or {}
+    dtypes = {}
+    for column in pd.read_csv(filepath, nrows=0).columns:
+        dtypes[column] = schema.get(column, 'int8' if column in categorical_columns else 'float64' if column in numeric_columns else 'int64')
+
+    stats = ExplorationStats(numeric_columns, categorical_columns, os.path.join(output_directory, '_hashes'))
+    writer = ColumnarWriter(output_directory, dtypes)
+
+    # Single pass over the CSV file: statistics, encoding and columnar output, then the duplicate count,
+    # which also releases the spill files of the row hashes (whatever the log level)
+    try:
+        for chunk in pd.read_csv(filepath, index_col='id', chunksize=chunksize):
+            stats.update(chunk)
+            encoded = encode_columns(chunk, encoding_dict).reset_index()
+            writer.append(encoded)
+        writer.close()
+        duplicates = stats.count_duplicates()
+    finally:
+        stats.close()
+    logger.info(f"Wrote {writer.n_rows} encoded rows to {output_directory}.")
+
+    # Log the exploration statistics like explore_data
+    logger.info("Descriptive Statistics (quartiles from a sample of %d rows):\n%s", len(stats.sample), LazyMessage(stats.describe))
+    logger.info("Number of duplicate rows: %d", duplicates)
+    logger.info("Missing values per column:\n%s", LazyMessage(lambda: stats.missing_values.astype(int)))
+
+    # Fit the BMI imputer on the memory-mapped columns, with the gender labels it is trained with
+    imputer = BMIImputer()
+    gender, glucose, bmi = (np.load(os.path.join(output_directory, f"{column}.npy"), mmap_mode='r+')
+                            for column in (imputer.gender_col, imputer.glucose_col, imputer.bmi_col))
+
+    def make_chunks():
+        for start in range(0, writer.n_rows, chunksize):
+            yield pd.DataFrame({
+                imputer.gender_col: _decode(gender[start:start + chunksize], encoding_dict[imputer.gender_col]),
+                imputer.glucose_col: glucose[start:start + chunksize],
+                imputer.bmi_col: bmi[start:start + chunksize],
+            })
+
+    imputer.fit_chunks(make_chunks)
+
+    # Fill the missing BMI values in place, chunk by chunk
+    for start, chunk in zip(range(0, writer.n_rows, chunksize), make_chunks()):
+        bmi[start:start + len(chunk)] = imputer.transform(chunk)[imputer.bmi_col].to_numpy()
+    bmi.flush()
+
+    logger.info("Streaming preprocessing completed.")
+    return stats, imputer
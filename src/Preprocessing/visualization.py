@@ -1,28 +1,36 @@
 import os
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from logger import logger 
+from config import Plot_Directory
 
 # Define a directory to save the plots
-output_dir = "plots" 
+output_dir = Plot_Directory
 
-# Make sure the directory exists
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
+def _pyplot():
+    """
+    Imports matplotlib with the non-interactive Agg backend when the first plot is drawn,
+    and makes sure the plots directory exists.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    os.makedirs(output_dir, exist_ok=True)
+    return plt
 
 def plot_categorical_data(df, categorical_columns):
     """
     Function to visualize the distribution of categorical columns in the dataset.
+    Returns the paths of the saved plots.
 
     """
     logger.info("Starting categorical data visualization...")
+    plt = _pyplot()
+    plot_filenames = []
     
     # Iterate through the list of categorical columns and plot bar charts
     for column in categorical_columns:
         if column in df.columns:
             value_counts = df[column].value_counts()
-            logger.info(f"Value counts for {column}:\n{value_counts}")
+            logger.info("Value counts for %s:\n%s", column, value_counts)
 
             # Plot bar chart
             plt.figure(figsize=(6, 4))
@@ -37,18 +45,23 @@ def plot_categorical_data(df, categorical_columns):
             plt.savefig(plot_filename)
             plt.close()
             
+            plot_filenames.append(plot_filename)
             logger.info(f"Bar chart saved as {plot_filename}.")
         else:
             logger.warning(f"Column {column} not found in DataFrame.")
 
     logger.info("Categorical data visualization completed.")
+    return plot_filenames
 
 def plot_numerical_data(df, numeric_columns):
     """
     Function to visualize the distribution of numerical columns in the dataset.
+    Returns the paths of the saved plots.
 
     """
     logger.info("Starting numerical data visualization...")
+    plt = _pyplot()
+    plot_filenames = []
 
     # Iterate through the list of numeric columns and plot histograms 
     for column in numeric_columns:
@@ -65,8 +78,10 @@ def plot_numerical_data(df, numeric_columns):
             plt.savefig(plot_filename)
             plt.close()  
             
+            plot_filenames.append(plot_filename)
             logger.info(f"Histogram saved as {plot_filename}.")
         else:
             logger.warning(f"Column {column} not found in DataFrame.")
 
     logger.info("Numerical data visualization completed.")
+    return plot_filenames
@@ -0,0 +1,122 @@
+import os
+import uuid
+import joblib
+from logger import logger
+
+
+def array_digest(*arrays):
+    """
+    Returns a content hash of the given arrays, computed once per dataset and reused in the cache keys.
+
+    """
+    return joblib.hash(arrays)
+
+
+class EstimatorCache:
+    """
+    Content-addressed on-disk cache of fitted estimators and their fold scores.
+    Entries are keyed on a hash of the input data, the estimator class, its full parameters and the fold,
+    and the least recently used entries are evicted once the cache grows over max_size_mb.
+    """
+
+    def __init__(self, directory='cache', max_size_mb=1024):
+        self.directory = directory
+        self.max_size = max_size_mb * 1024 * 1024
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, data_digest, estimator, params, fold_id):
+        """
+        Builds the cache key of one fit: data hash, estimator class, all of its parameters and the fold.
+
+        """
+        estimator_class = f"{type(estimator).__module__}.{type(estimator).__name__}"
+        all_params = {**estimator.get_params(deep=False), **params}
+        return joblib.hash((data_digest, estimator_class, sorted(all_params.items(), key=lambda item: item[0]), fold_id))
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.joblib")
+
+    def get(self, key):
+        """
+        Returns the cached {'model', 'score'} entry for the key, or None on a miss.
+        A hit refreshes the entry's access time, which is what the LRU eviction uses.
+
+        """
+        path = self._path(key)
+        try:
+            entry = joblib.load(path)
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def put(self, key, model, score):
+        """
+        Stores a fitted model and its score. The file is written under a temporary name first,
+        so worker processes writing at the same time never leave a half-written entry behind.
+
+        """
+        path = self._path(key)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        joblib.dump({'model': model, 'score': score}, temp_path)
+        os.replace(temp_path, path)
+
+    def snapshot(self, keys):
+        """
+        Returns a CacheSnapshot of the entries stored for the keys, for a task that runs where the cache
+        directory cannot be reached.
+
+        """
+        entries = {key: self.get(key) for key in keys}
+        return CacheSnapshot({key: entry for key, entry in entries.items() if entry is not None})
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits in its size cap.
+
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.joblib'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        n_evicted = 0
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            n_evicted += 1
+
+        if n_evicted:
+            logger.info(f"Evicted {n_evicted} least recently used entries from the estimator cache.")
+
+
+class CacheSnapshot:
+    """
+    Entries of an EstimatorCache looked up ahead of a task that runs on another machine (a work queue worker),
+    with the get/put interface of the cache: get returns the entries it was given, and put keeps the new entries
+    in stored, which the coordinator writes to its cache when the task's outcome comes back.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.stored = []
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, model, score):
+        self.stored.append((key, model, score))
@@ -0,0 +1,175 @@
+import numpy as np
+from logger import logger
+
+
+class CompiledTrees:
+    """
+    Fitted decision tree, random forest or gradient boosting classifier flattened into contiguous node arrays
+    (feature, threshold, left and right child, missing-value direction and value of every node of every tree),
+    for scoring small batches and single patients without the per-call overhead of scikit-learn's predict.
+    All the trees are traversed at once, one level per step for every (tree, sample) pair, and their outputs are
+    summed in the order of the estimator, so the predictions and probabilities are exactly scikit-learn's.
+    Large batches are faster with scikit-learn's compiled traversal. Built by compile_trees.
+    """
+
+    # Rows traversed together (their node arrays stay in the cache) and levels between two removals of finished pairs
+    Chunk_Rows = 512
+    Compact_Steps = 4
+
+    def __init__(self, trees, classes, kind, n_features, scale=1.0, baseline=None, loss=None, n_columns=1):
+        self.classes_ = classes
+        self.kind = kind
+        self.n_features_in_ = n_features
+        self.loss = loss
+        self.n_columns = n_columns
+        self.n_trees = len(trees)
+
+        # Concatenate the nodes of all trees, with the children as global node indices
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        self.roots = offsets[:-1].astype(np.intp)
+        left = np.concatenate([tree.children_left + offset for tree, offset in zip(trees, offsets)])
+        right = np.concatenate([tree.children_right + offset for tree, offset in zip(trees, offsets)])
+        leaf = np.concatenate([tree.children_left == -1 for tree in trees])
+
+        # Leaves point to themselves, so the pairs at a leaf can take more steps until they are dropped; the children
+        # are interleaved as (right, left), so the next node is children[2 * node + go_left]
+        nodes = np.arange(offsets[-1])
+        self.is_leaf = leaf
+        self.children = np.stack([np.where(leaf, nodes, right), np.where(leaf, nodes, left)], axis=1).ravel().astype(np.intp)
+        self.feature = np.where(leaf, 0, np.concatenate([tree.feature for tree in trees])).astype(np.intp)
+        self.threshold = np.concatenate([tree.threshold for tree in trees])
+        # Trees of scikit-learn before 1.3 have no missing-value direction (they cannot see NaN during the fit);
+        # like scikit-learn, those trees and gradient boosting reject missing values
+        self.missing_left = np.concatenate([np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count)), dtype=bool)
+                                            for tree in trees])
+        self.allow_missing = kind == 'forest' and all(hasattr(tree, 'missing_go_to_left') for tree in trees)
+
+        # Forests keep the class fractions of every node, boosting the scaled regression value of its stage
+        if kind == 'forest':
+            self.value = np.concatenate([class_fractions(tree.value[:, 0, :len(classes)]) for tree in trees])
+        else:
+            self.value = np.concatenate([scale * tree.value[:, 0, 0] for tree in trees])
+            self.baseline = np.asarray(baseline, dtype=np.float64).reshape(n_columns)
+
+    def apply(self, X):
+        """
+        Returns the leaf of every sample in every tree, as an (n_trees, n_samples) array of node indices.
+        The samples are traversed in chunks of Chunk_Rows rows. Every Compact_Steps levels the (tree, sample) pairs
+        that reached a leaf are dropped, so the work follows the actual path lengths rather than the deepest tree.
+
+        """
+        # Trees compare the features as float32, like scikit-learn
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if len(X) > self.Chunk_Rows:
+            return np.hstack([self.apply(X[start:start + self.Chunk_Rows]) for start in range(0, len(X), self.Chunk_Rows)])
+
+        has_missing = np.isnan(X).any()
+        if has_missing and not self.allow_missing:
+            raise ValueError("Input X contains NaN.")
+        flat = X.ravel()
+        leaves = np.repeat(self.roots[:, np.newaxis], len(X), axis=1).ravel()
+        positions = np.arange(len(leaves))
+        nodes = leaves.copy()
+        row_offsets = (positions % len(X)) * X.shape[1]
+        step = 0
+        while len(nodes):
+            x = flat.take(self.feature.take(nodes) + row_offsets)
+            go_left = x <= self.threshold.take(nodes)
+            if has_missing:
+                go_left |= np.isnan(x) & self.missing_left.take(nodes)
+            nodes = self.children.take(2 * nodes + go_left)
+
+            # Keep the pairs that reached a leaf, and go on with the others
+            step += 1
+            if step % self.Compact_Steps == 0:
+                at_leaf = self.is_leaf.take(nodes)
+                leaves[positions[at_leaf]] = nodes[at_leaf]
+                inner = ~at_leaf
+                positions, nodes, row_offsets = positions[inner], nodes[inner], row_offsets[inner]
+        return leaves.reshape(self.n_trees, len(X))
+
+    def decision_function(self, X):
+        """
+        Returns the raw predictions of a gradient boosting model: the initial prediction plus the scaled values
+        of the stages, summed stage by stage.
+
+        """
+        if self.kind != 'boosting':
+            raise AttributeError("Only compiled gradient boosting models have a decision function.")
+        values = self.value.take(self.apply(X))
+        raw = np.empty((values.shape[1], self.n_columns))
+        for column in range(self.n_columns):
+            stages = values[column::self.n_columns]
+            raw[:, column] = np.add.reduce(np.vstack([np.full((1, values.shape[1]), self.baseline[column]), stages]), axis=0)
+        return raw.ravel() if self.n_columns == 1 else raw
+
+    def predict_proba(self, X):
+        """
+        Returns the class probabilities, the mean of the trees' class fractions for forests.
+
+        """
+        if self.kind == 'boosting':
+            return self.loss.predict_proba(self.decision_function(X))
+        return np.add.reduce(self.value[self.apply(X)], axis=0) / self.n_trees
+
+    def predict(self, X):
+        """
+        Returns the predicted classes.
+
+        """
+        if self.kind == 'boosting':
+            raw = self.decision_function(X)
+            encoded = (raw >= 0).astype(int) if raw.ndim == 1 else np.argmax(raw, axis=1)
+            return self.classes_[encoded]
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def class_fractions(value):
+    """
+    Returns the class fractions of the nodes of a classification tree. scikit-learn stores them from version 1.4,
+    earlier versions store the weighted class counts, which are divided by their sum like their predict_proba does.
+    Fractions are returned as they are, so the probabilities stay exactly scikit-learn's.
+
+    """
+    totals = value.sum(axis=1, keepdims=True)
+    if np.allclose(totals, 1.0):
+        return value
+    return value / np.where(totals == 0, 1.0, totals)
+
+
+def compile_trees(model):
+    """
+    Flattens a fitted DecisionTreeClassifier, RandomForestClassifier, ExtraTreesClassifier or
+    GradientBoostingClassifier (with the default or zero initial prediction) into a CompiledTrees.
+    Raises a ValueError for other models.
+
+    """
+    # scikit-learn is imported here, so scoring an exported artifact does not load it
+    from sklearn.dummy import DummyClassifier
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, ExtraTreesClassifier
+    from sklearn.tree import DecisionTreeClassifier
+
+    if isinstance(model, DecisionTreeClassifier) and model.n_outputs_ == 1:
+        return CompiledTrees([model.tree_], model.classes_, 'forest', model.n_features_in_)
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)) and model.n_outputs_ == 1:
+        return CompiledTrees([estimator.tree_ for estimator in model.estimators_], model.classes_, 'forest', model.n_features_in_)
+    if isinstance(model, GradientBoostingClassifier) and (model.init_ == 'zero' or isinstance(model.init_, DummyClassifier)):
+        # The default initial prediction (the class prior) does not depend on the features
+        baseline = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0]
+        return CompiledTrees([tree.tree_ for tree in model.estimators_.ravel()], model.classes_, 'boosting', model.n_features_in_,
+                             model.learning_rate, baseline, model._loss, model.estimators_.shape[1])
+    raise ValueError(f"{type(model).__name__} cannot be compiled into node arrays.")
+
+
+def compile_model(model):
+    """
+    Returns the CompiledTrees of a tree model, or None for a model that is scored with its own predict.
+
+    """
+    try:
+        compiled = compile_trees(model)
+        logger.info(f"Compiled {compiled.n_trees} trees into node arrays for scoring.")
+        return compiled
+    except ValueError as e:
+        logger.info(f"{e} It is scored with its own predict.")
+        return None
@@ -1,7 +1,4 @@
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.neural_network import MLPClassifier
-from sklearn.svm import SVC
+import importlib
 
 
 # Columns related to categorical and numrical data
@@ -20,16 +17,35 @@ Encoding_Dictionary = {
 Features = ['gender', 'age', 'hypertension', 'heart_disease', 'ever_married','work_type', 'residence_type', 'avg_glucose_level', 'bmi', 'smoking_status']
 
 
-# Define the models
-Models = {
-    'Decision Tree': DecisionTreeClassifier(random_state=42),
-    'Random Forest': RandomForestClassifier(random_state=42),
-    'Neural Network': MLPClassifier(max_iter=1000, random_state=42),
-    'SVM': SVC(random_state=42),
-    'Gradient Boosting': GradientBoostingClassifier(random_state=42)
+# Define the models: estimator class and constructor parameters.
+# config.Models instantiates them on first use, so importing config does not load scikit-learn.
+Model_Registry = {
+    'Decision Tree': ('sklearn.tree.DecisionTreeClassifier', {'random_state': 42}),
+    'Random Forest': ('sklearn.ensemble.RandomForestClassifier', {'random_state': 42}),
+    'Neural Network': ('sklearn.neural_network.MLPClassifier', {'max_iter': 1000, 'random_state': 42}),
+    'SVM': ('sklearn.svm.SVC', {'random_state': 42}),
+    'Gradient Boosting': ('sklearn.ensemble.GradientBoostingClassifier', {'random_state': 42})
 }
 
+def build_models(registry=None):
+    """
+    Imports and instantiates the estimators of the model registry.
+    """
+    models = {}
+    for model_name, (class_path, params) in (registry or Model_Registry).items():
+        module_name, class_name = class_path.rsplit('.', 1)
+        models[model_name] = getattr(importlib.import_module(module_name), class_name)(**params)
+    return models
+
+def __getattr__(name):
+    # Build config.Models on first access and keep it, so every caller shares the same estimators
+    if name == 'Models':
+        globals()['Models'] = build_models()
+        return globals()['Models']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # Define parameter grids for each model
+# (forests and boosting are grown along their n_estimators and max_iter values by warm starting, instead of refitting each value)
 ParametersForGridSearch = {
     'Decision Tree': {
         'max_depth': [None, 10, 20, 30],
@@ -58,4 +74,157 @@ ParametersForGridSearch = {
         'min_samples_split': [2, 5, 10],
         'min_samples_leaf': [1, 2, 4]
 }
-}
\ No newline at end of file
+}
+
+# Search strategy for each model's hyperparameter tuning:
+# 'exhaustive' evaluates the whole grid, 'halving' gives more samples (or estimators) only to the surviving candidates
+SearchStrategies = {
+    'Decision Tree': {'strategy': 'exhaustive'},
+    'Random Forest': {'strategy': 'halving', 'resource': 'n_estimators', 'factor': 2},
+    'Neural Network': {'strategy': 'halving', 'resource': 'n_samples', 'factor': 3},
+    'SVM': {'strategy': 'exhaustive'},
+    'Gradient Boosting': {'strategy': 'halving', 'resource': 'n_estimators', 'factor': 2}
+}
+
+# Backends a deployment can pick per model family: the estimator (class path and constructor parameters),
+# its parameter grid and its search strategy. The exact gradient boosting and the kernel SVM scale badly with rows:
+# 'histogram' boosting bins the features and splits the encoded categorical columns natively, and the 'linear'
+# and 'nystroem' (kernel approximation) SVMs train in time linear in the rows.
+Model_Backends = {
+    'Gradient Boosting': {
+        'exact': {'estimator': Model_Registry['Gradient Boosting'], 'grid': ParametersForGridSearch['Gradient Boosting'],
+                  'search': SearchStrategies['Gradient Boosting']},
+        'histogram': {
+            'estimator': ('estimators.CategoricalHistGradientBoosting', {'random_state': 42}),
+            'grid': {
+                'max_iter': [100, 200, 400],
+                'learning_rate': [0.05, 0.1, 0.2],
+                'max_leaf_nodes': [15, 31, 63],
+                'min_samples_leaf': [10, 20, 40],
+                'l2_regularization': [0.0, 1.0]
+            },
+            'search': {'strategy': 'halving', 'resource': 'max_iter', 'factor': 2}
+        }
+    },
+    'SVM': {
+        'kernel': {'estimator': Model_Registry['SVM'], 'grid': ParametersForGridSearch['SVM'], 'search': SearchStrategies['SVM']},
+        'linear': {
+            'estimator': ('sklearn.svm.LinearSVC', {'random_state': 42}),
+            'grid': {'C': [0.01, 0.1, 1, 10]},
+            'search': {'strategy': 'exhaustive'}
+        },
+        'nystroem': {
+            'estimator': ('estimators.NystroemSVM', {'random_state': 42}),
+            'grid': {'C': [0.1, 1, 10], 'gamma': [None, 0.05, 0.5], 'n_components': [100, 300]},
+            'search': {'strategy': 'exhaustive'}
+        }
+    }
+}
+
+# Backend used by each model family of Model_Backends
+Model_Backend = {'Gradient Boosting': 'exact', 'SVM': 'kernel'}
+
+def use_backends(selection):
+    """
+    Switches model families to other backends (e.g. {'SVM': 'nystroem'}): updates Model_Registry,
+    ParametersForGridSearch and SearchStrategies, and the estimators of config.Models if it was already built.
+    """
+    for family, backend in selection.items():
+        entry = Model_Backends[family][backend]
+        Model_Registry[family] = entry['estimator']
+        ParametersForGridSearch[family] = entry['grid']
+        SearchStrategies[family] = entry['search']
+        Model_Backend[family] = backend
+    if 'Models' in globals():
+        globals()['Models'].update(build_models({family: Model_Registry[family] for family in selection}))
+
+use_backends(Model_Backend)
+
+# On-disk cache of fitted estimators and fold scores (set the directory to None to disable it)
+Cache_Directory = 'cache'
+Cache_Max_Size_MB = 1024
+
+# Feature sets the models are trained on, with the number of principal components used (None = all features);
+# the scaler and the PCA are fitted inside every fold, and a list of numbers is searched with the model parameters
+Feature_Sets = {'AllFeatures': None, '2PCA': 2, '8PCA': 8}
+
+# The best model by this metric (over all feature sets) is exported with its preprocessing chain for predict.py
+Export_Selection_Metric = 'F-Score'
+Model_Artifact_Path = 'artifacts/stroke_model.joblib'
+
+# Batches of up to this many records are scored with the tree models compiled into node arrays (faster for small
+# batches and single patients); larger batches use the model's own predict
+Compiled_Trees_Max_Batch = 128
+
+# Online scoring server (src/serve.py): concurrent requests are gathered into micro-batches of up to
+# Serving_Max_Batch_Size records, waiting at most Serving_Max_Wait_ms after the first request of a batch
+Serving_Host = '127.0.0.1'
+Serving_Port = 8080
+Serving_Max_Batch_Size = 64
+Serving_Max_Wait_ms = 5
+
+# Read the data file in chunks of this many rows into a memory-mapped columnar dataset (None loads it into memory at once)
+Streaming_Chunksize = None
+Intermediate_Directory = 'intermediate'
+
+# Compact column types of the preprocessed dataset: small integer codes, bool flags and float32 measurements
+Column_Schema = {
+    'gender': 'int8', 'ever_married': 'int8', 'work_type': 'int8', 'Residence_type': 'int8', 'smoking_status': 'int8',
+    'hypertension': 'bool', 'heart_disease': 'bool', 'stroke': 'bool',
+    'age': 'float32', 'avg_glucose_level': 'float32', 'bmi': 'float32'
+}
+# Categorical columns are kept as pandas categories (instead of object) until they are encoded
+Categorical_Dtype = 'category'
+# Type of the standardized feature matrices
+Feature_Dtype = 'float32'
+
+# Memory-mapped store of the preprocessed dataset and split feature matrices, reused while the data file
+# and the preprocessing configuration are unchanged (set the directory to None to disable it)
+Feature_Store_Directory = 'feature_store'
+
+# Accumulate the scaler and PCA statistics and project the rows in chunks of this many rows, in the split of the
+# feature analysis and inside every fold of the searches (None processes all rows at once, or 100k rows for the split)
+PCA_Batch_Size = None
+
+# Timing report of the pipeline stages, and the stage (e.g. 'train_models') to run under cProfile (None profiles no stage)
+Timing_Report_Path = 'timing_report.json'
+Profile_Stage = None
+Profile_Directory = 'profiles'
+
+# Plot rendering: 'process' draws the plots in worker processes while the pipeline goes on, 'inline' draws them
+# on the main process and 'off' skips them. Plots whose input data did not change since the last run are not redrawn.
+Plot_Mode = 'process'
+Plot_Workers = 2
+# Directory of the PNG files and of their plot_hashes.json
+Plot_Directory = 'plots'
+
+# Number of bootstrap resamples of the test set for the confidence intervals of the metrics (None disables them)
+Bootstrap_Resamples = 10000
+
+# Balancing: 'single' trains the models on one balanced subset of the data, 'ensemble' refits every tuned model
+# as an ensemble over Ensemble_Subsets balanced subsets that also use the non-stroke rows left out by balancing
+Balancing_Mode = 'single'
+Ensemble_Subsets = 10
+Ensemble_Sampling = 'disjoint'
+
+# Incremental updates of the exported model with new records (update.py): the number of trees or boosting stages
+# (n_estimators) or MLP iterations (max_iter) added per update, ensembles add members fitted on the new records
+Incremental_Growth = {'n_estimators': 50, 'max_iter': 50}
+
+# Resource budgets of the model searches, so a slow model cannot hold up the others: the share of the cores its fits
+# may occupy at once, the seconds of fitting time after which its search stops with the best candidate found so far,
+# and the seconds after which a single fit is cancelled (its candidate then scores -inf). Models that are not listed
+# run without limits; set to None to run all searches without budgets
+Search_Budgets = {
+    'SVM': {'core_share': 0.5, 'time_limit': 1800, 'max_fit_time': 120},
+}
+
+# Shared directory (e.g. on NFS) of a work queue that spreads the search fits over the machines running
+# `python src/worker.py <directory>`; workers can join and leave during the search. None runs them locally
+Work_Queue_Directory = None
+
+# Logging: records are written to Log_File and the console by a background thread. Stage_Log_Levels sets the level
+# of single pipeline stages (e.g. {'preprocess_data': 'WARNING'} skips the exploration statistics of the data)
+Log_File = 'app.log'
+Log_Level = 'INFO'
+Stage_Log_Levels = {}
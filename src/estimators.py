@@ -0,0 +1,93 @@
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.kernel_approximation import Nystroem
+from sklearn.svm import LinearSVC
+
+
+class CategoricalHistGradientBoosting(ClassifierMixin, BaseEstimator):
+    """
+    Histogram gradient boosting that treats the low-cardinality columns of X (at most max_categories distinct values,
+    like the encoded Encoding_Dictionary columns, even after scaling) as native categorical features.
+    The category values are mapped to integer codes, and values not seen during fit are treated as missing.
+    With warm_start, a refit keeps the fitted categories and adds boosting iterations up to max_iter.
+    """
+
+    def __init__(self, learning_rate=0.1, max_iter=100, max_leaf_nodes=31, max_depth=None, min_samples_leaf=20,
+                 l2_regularization=0.0, early_stopping='auto', max_categories=16, warm_start=False, random_state=None):
+        self.learning_rate = learning_rate
+        self.max_iter = max_iter
+        self.max_leaf_nodes = max_leaf_nodes
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.l2_regularization = l2_regularization
+        self.early_stopping = early_stopping
+        self.max_categories = max_categories
+        self.warm_start = warm_start
+        self.random_state = random_state
+
+    def _find_categories(self, X):
+        # Only columns with few values in a sample of the rows are checked on all of them
+        categories = {}
+        for column in range(X.shape[1]):
+            if len(np.unique(X[:10000, column])) <= self.max_categories:
+                values = np.unique(X[:, column])
+                if len(values) <= self.max_categories:
+                    categories[column] = values
+        return categories
+
+    def _encode(self, X):
+        X = np.array(X, dtype=np.result_type(X.dtype, np.float32))
+        for column, values in self.categories_.items():
+            codes = np.minimum(np.searchsorted(values, X[:, column]), len(values) - 1)
+            X[:, column] = np.where(values[codes] == X[:, column], codes, np.nan)
+        return X
+
+    def fit(self, X, y):
+        X = np.asarray(X)
+        if not (self.warm_start and hasattr(self, 'model_')):
+            self.categories_ = self._find_categories(X)
+            mask = np.isin(np.arange(X.shape[1]), list(self.categories_))
+            self.model_ = HistGradientBoostingClassifier(categorical_features=mask if mask.any() else None)
+
+        self.model_.set_params(learning_rate=self.learning_rate, max_iter=self.max_iter, max_leaf_nodes=self.max_leaf_nodes,
+                               max_depth=self.max_depth, min_samples_leaf=self.min_samples_leaf,
+                               l2_regularization=self.l2_regularization, early_stopping=self.early_stopping,
+                               warm_start=self.warm_start, random_state=self.random_state)
+        self.model_.fit(self._encode(X), y)
+        self.classes_ = self.model_.classes_
+        self.n_iter_ = self.model_.n_iter_
+        return self
+
+    def predict_proba(self, X):
+        return self.model_.predict_proba(self._encode(np.asarray(X)))
+
+    def predict(self, X):
+        return self.model_.predict(self._encode(np.asarray(X)))
+
+
+class NystroemSVM(ClassifierMixin, BaseEstimator):
+    """
+    Approximate RBF kernel SVM: the rows are mapped on n_components Nystroem landmarks and a LinearSVC is trained
+    on the mapped features, so fitting scales linearly with the rows instead of quadratically to cubically like SVC.
+    gamma=None uses 1 / n_features, which matches SVC's gamma='scale' on standardized features.
+    """
+
+    def __init__(self, C=1.0, gamma=None, n_components=300, random_state=None):
+        self.C = C
+        self.gamma = gamma
+        self.n_components = n_components
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X = np.asarray(X)
+        self.feature_map_ = Nystroem(gamma=self.gamma, n_components=min(self.n_components, len(X)), random_state=self.random_state)
+        self.svm_ = LinearSVC(C=self.C, random_state=self.random_state).fit(self.feature_map_.fit_transform(X), y)
+        self.classes_ = self.svm_.classes_
+        return self
+
+    def decision_function(self, X):
+        return self.svm_.decision_function(self.feature_map_.transform(np.asarray(X)))
+
+    def predict(self, X):
+        return self.svm_.predict(self.feature_map_.transform(np.asarray(X)))
@@ -0,0 +1,174 @@
+import time
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from logger import logger, configure_worker, worker_config
+
+
+class SharedData:
+    """
+    Placeholder for an object the workers received once when they started (e.g. a training matrix),
+    so it is not sent again with every task.
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+
+def _worker(connection, shared, log_config):
+    """
+    Worker process loop: runs the (index, function, args) tasks it receives until it gets None.
+
+    """
+    configure_worker(*log_config)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        index, function, args = message
+        args = [shared[arg.key] if isinstance(arg, SharedData) else arg for arg in args]
+        try:
+            connection.send((index, True, function(*args)))
+        except Exception as e:
+            connection.send((index, False, e))
+
+
+class BudgetedExecutor:
+    """
+    Process pool that runs tasks under per-group budgets (the scheduler uses one group per search):
+    - max_workers: how many of the workers the group's tasks may occupy at once (its core share),
+    - time_limit: total seconds of task time after which the group's running and remaining tasks are cancelled,
+    - and a maximum time per task, after which the task's worker is killed and replaced.
+    Tasks are dispatched in their list order and their outcomes are returned in the same order,
+    so the results do not depend on which worker finishes first.
+    shared is sent to every worker once when it starts, tasks refer to its entries with SharedData placeholders.
+    """
+
+    def __init__(self, n_workers, shared=None, start_method='spawn'):
+        self.n_workers = n_workers
+        self.shared = shared or {}
+        self.context = multiprocessing.get_context(start_method)
+        self.workers = []
+        self.used_time = {}
+        self.exhausted = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _start_worker(self):
+        parent_connection, child_connection = self.context.Pipe()
+        process = self.context.Process(target=_worker, args=(child_connection, self.shared, worker_config()), daemon=True)
+        process.start()
+        child_connection.close()
+        return {'process': process, 'connection': parent_connection, 'task': None}
+
+    def _replace_worker(self, worker):
+        worker['process'].kill()
+        worker['process'].join()
+        worker['connection'].close()
+        self.workers[self.workers.index(worker)] = self._start_worker()
+
+    def run(self, tasks, budgets=None):
+        """
+        Runs (group, function, args, max_time) tasks, max_time being None for no limit.
+        budgets maps a group to its {'max_workers', 'time_limit'} (missing entries mean no limit);
+        the time a group used is kept across calls, so a time limit covers all of a search's rounds.
+        Returns one (status, result, elapsed) outcome per task, with status 'done', 'timeout' (the task went over
+        its max_time) or 'over_budget' (its group went over its time limit). Exceptions of tasks are raised.
+
+        """
+        budgets = budgets or {}
+        while len(self.workers) < self.n_workers:
+            self.workers.append(self._start_worker())
+
+        outcomes = [None] * len(tasks)
+        queue = deque(range(len(tasks)))
+        running = {}
+
+        def cancel(index, status, elapsed=0.0):
+            outcomes[index] = (status, None, elapsed)
+            group = tasks[index][0]
+            self.used_time[group] = self.used_time.get(group, 0.0) + elapsed
+
+        while queue or running:
+            now = time.perf_counter()
+
+            # Cancel the running and queued tasks of groups that went over their time limit
+            for group, budget in budgets.items():
+                time_limit = budget.get('time_limit')
+                if time_limit is None or group in self.exhausted:
+                    continue
+                used = self.used_time.get(group, 0.0) + sum(now - start for index, start in running.values() if tasks[index][0] == group)
+                if used > time_limit:
+                    self.exhausted.add(group)
+                    logger.warning(f"Search {group} went over its time limit of {time_limit} s, cancelling its remaining fits.")
+            for worker in [worker for worker in self.workers if worker['task'] is not None]:
+                index, start = running[id(worker)]
+                max_time = tasks[index][3]
+                if tasks[index][0] in self.exhausted or (max_time is not None and now - start > max_time):
+                    cancel(index, 'over_budget' if tasks[index][0] in self.exhausted else 'timeout', now - start)
+                    del running[id(worker)]
+                    self._replace_worker(worker)
+            for index in [index for index in queue if tasks[index][0] in self.exhausted]:
+                queue.remove(index)
+                cancel(index, 'over_budget')
+
+            # Hand the first queued tasks whose group has a free core share to the idle workers
+            busy = {}
+            for index, _ in running.values():
+                busy[tasks[index][0]] = busy.get(tasks[index][0], 0) + 1
+            for worker in self.workers:
+                if worker['task'] is not None:
+                    continue
+                for index in queue:
+                    group = tasks[index][0]
+                    if busy.get(group, 0) < budgets.get(group, {}).get('max_workers', self.n_workers):
+                        break
+                else:
+                    break
+                queue.remove(index)
+                busy[group] = busy.get(group, 0) + 1
+                worker['connection'].send((index, tasks[index][1], tasks[index][2]))
+                worker['task'] = index
+                running[id(worker)] = (index, time.perf_counter())
+
+            # Wait for a result, or until the next task deadline
+            deadlines = [start + tasks[index][3] for index, start in running.values() if tasks[index][3] is not None]
+            timeout = max(0.0, min(deadlines) - time.perf_counter()) + 0.01 if deadlines else 1.0
+            for connection in wait([worker['connection'] for worker in self.workers if worker['task'] is not None], timeout):
+                worker = next(worker for worker in self.workers if worker['connection'] is connection)
+                index, start = running.pop(id(worker))
+                worker['task'] = None
+                try:
+                    _, success, result = connection.recv()
+                except EOFError:
+                    # The worker died (e.g. out of memory), the task cannot be retried safely
+                    self._replace_worker(worker)
+                    raise RuntimeError(f"Worker process died while running task {index} of {tasks[index][0]}.")
+                if not success:
+                    raise result
+                elapsed = time.perf_counter() - start
+                outcomes[index] = ('done', result, elapsed)
+                self.used_time[tasks[index][0]] = self.used_time.get(tasks[index][0], 0.0) + elapsed
+
+        return outcomes
+
+    def close(self):
+        """
+        Stops the worker processes.
+
+        """
+        for worker in self.workers:
+            try:
+                worker['connection'].send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                worker['process'].kill()
+            worker['connection'].close()
+        self.workers = []
@@ -0,0 +1,132 @@
+import os
+import uuid
+import shutil
+import hashlib
+import joblib
+import numpy as np
+from logger import logger
+from Preprocessing.streaming import ColumnarWriter, load_columnar
+
+
+def file_digest(filepath, block_size=1024 * 1024):
+    """
+    Returns the SHA-256 hash of a file, read in blocks so large files are not loaded into memory.
+
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def frame_digest(df):
+    """
+    Returns a content hash of a DataFrame from its column names, column values and index,
+    so in-memory and memory-mapped frames with the same content get the same hash.
+
+    """
+    return joblib.hash([list(df.columns), df.index.to_numpy()] + [df[column].to_numpy() for column in df.columns])
+
+
+class FeatureStore:
+    """
+    On-disk store of the preprocessed dataset and the split feature matrices, kept as .npy files
+    that later runs open memory-mapped instead of recomputing them.
+    Entries live in directory/<key>/<name>, where the key hashes the source data and the configuration
+    that produced them. Memory-mapped arrays are passed to joblib workers by file reference, not pickled.
+    """
+
+    def __init__(self, directory='feature_store'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, *inputs):
+        """
+        Builds the key of an entry from its inputs: hashable objects, with file paths given as ('file', path).
+
+        """
+        return joblib.hash([file_digest(value[1]) if isinstance(value, tuple) and value[:1] == ('file',) else value
+                            for value in inputs])
+
+    def _path(self, key, name):
+        return os.path.join(self.directory, key, name)
+
+    def _write(self, key, name, write):
+        """
+        Writes an entry into a temporary directory with write(path), then moves it into place,
+        so a reader never sees a half-written entry.
+
+        """
+        path = self._path(key, name)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(temp_path)
+        try:
+            write(temp_path)
+        except Exception as e:
+            logger.warning(f"Could not store feature store entry {path}: {e}")
+            shutil.rmtree(temp_path, ignore_errors=True)
+            return
+        try:
+            os.replace(temp_path, path)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+    def load_frame(self, key, name, index_col='id'):
+        """
+        Returns the stored DataFrame (with memory-mapped columns) and its objects, or (None, None) on a miss.
+
+        """
+        path = self._path(key, name)
+        if not os.path.isdir(path):
+            return None, None
+        try:
+            return load_columnar(path, index_col), joblib.load(os.path.join(path, 'objects.joblib'))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable feature store entry {path}: {e}")
+            return None, None
+
+    def save_frame(self, key, name, df, **objects):
+        """
+        Stores a DataFrame as one .npy file per column, with fitted objects (e.g. the BMI imputer) next to it.
+
+        """
+        df = df.reset_index()
+
+        def write(path):
+            writer = ColumnarWriter(path, df.dtypes.to_dict())
+            writer.append(df)
+            writer.close()
+            joblib.dump(objects, os.path.join(path, 'objects.joblib'))
+
+        self._write(key, name, write)
+
+    def load_arrays(self, key, name, mmap_mode='r'):
+        """
+        Returns the stored arrays (memory-mapped) and objects, or (None, None) on a miss.
+
+        """
+        path = self._path(key, name)
+        if not os.path.isdir(path):
+            return None, None
+        try:
+            objects = joblib.load(os.path.join(path, 'objects.joblib'))
+            arrays = {array_name: np.load(os.path.join(path, f"{array_name}.npy"), mmap_mode=mmap_mode)
+                      for array_name in objects.pop('_arrays')}
+            return arrays, objects
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable feature store entry {path}: {e}")
+            return None, None
+
+    def save_arrays(self, key, name, arrays, **objects):
+        """
+        Stores a dictionary of arrays as .npy files, with fitted objects (e.g. the scaler) next to them.
+
+        """
+        def write(path):
+            for array_name, array in arrays.items():
+                np.save(os.path.join(path, f"{array_name}.npy"), np.asarray(array))
+            joblib.dump({'_arrays': list(arrays), **objects}, os.path.join(path, 'objects.joblib'))
+
+        self._write(key, name, write)
@@ -0,0 +1,199 @@
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from logger import logger
+from compiled_trees import compile_model
+from config import Compiled_Trees_Max_Batch
+
+
+def export_model(filepath, model, model_name, feature_set, feature_columns, bmi_imputer, encoding_dict, scaler, pca=None, n_components=None, metrics=None):
+    """
+    Saves the whole fitted chain (BMI imputer, encoding mapping, scaler, optional PCA and model)
+    as one artifact, so new patient records can be scored exactly like the training data.
+    Tree models are also saved compiled into node arrays, which score small batches faster.
+
+    """
+    try:
+        logger.info(f"Exporting {model_name} trained on {feature_set} to {filepath}...")
+
+        artifact = {
+            'model_name': model_name,
+            'feature_set': feature_set,
+            'feature_columns': list(feature_columns),
+            'bmi_imputer': bmi_imputer,
+            'encoding_dict': encoding_dict,
+            'scaler': scaler,
+            'pca': pca,
+            'n_components': n_components,
+            'model': model,
+            'compiled': compile_model(model),
+            'metrics': metrics,
+        }
+
+        save_model(filepath, artifact)
+
+        logger.info("Model artifact exported successfully.")
+        return artifact
+
+    except Exception as e:
+        logger.error(f"Error exporting the model artifact: {e}")
+        return None
+
+
+def save_model(filepath, artifact):
+    """
+    Saves a model artifact, creating its directory if needed.
+
+    """
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    joblib.dump(artifact, filepath)
+
+
+def load_model(filepath):
+    """
+    Loads a model artifact saved by export_model.
+
+    """
+    logger.info(f"Loading model artifact from {filepath}...")
+    return joblib.load(filepath)
+
+
+def prepare_features(df, artifact):
+    """
+    Applies the training preprocessing to raw patient records: BMI imputation, encoding, scaling and PCA.
+    Returns the feature matrix and a mask of the rows that could be prepared
+    (rows with unknown categories, or missing or non-numeric values other than the BMI, are left out).
+
+    """
+    # Coerce the numeric feature columns, values that are not numbers become NaN and their rows are skipped
+    numeric_columns = [column for column in artifact['feature_columns'] if column not in artifact['encoding_dict']]
+    df = df.assign(**{column: pd.to_numeric(df[column], errors='coerce') for column in numeric_columns})
+    df = artifact['bmi_imputer'].transform(df)
+
+    # Encode categorical columns, unknown categories become NaN and their rows are skipped
+    valid = np.ones(len(df), dtype=bool)
+    for column, mapping in artifact['encoding_dict'].items():
+        if column in df.columns:
+            df[column] = df[column].map(mapping)
+            valid &= df[column].notna().to_numpy()
+
+    valid &= df[artifact['feature_columns']].notna().all(axis=1).to_numpy()
+    features = df.loc[valid, artifact['feature_columns']].astype(float)
+    X = artifact['scaler'].transform(features)
+    if artifact['pca'] is not None:
+        X = artifact['pca'].transform(X)[:, :artifact['n_components']]
+
+    return X, valid
+
+
+def predict_batch(df, artifact):
+    """
+    Scores a batch of raw patient records with one vectorized predict call.
+    Batches of up to Compiled_Trees_Max_Batch rows are scored with the compiled trees of a tree model.
+    Returns a DataFrame with the stroke prediction (and probability, if the model provides one) per row.
+
+    """
+    X, valid = prepare_features(df, artifact)
+    model = artifact['model']
+    if artifact.get('compiled') is not None and len(X) <= Compiled_Trees_Max_Batch:
+        model = artifact['compiled']
+
+    predictions = pd.DataFrame(index=df.index)
+    predictions['stroke_prediction'] = pd.Series(pd.NA, index=df.index, dtype='Int8')
+    if hasattr(model, 'predict_proba'):
+        predictions['stroke_probability'] = np.nan
+
+    if valid.any():
+        predictions.loc[valid, 'stroke_prediction'] = model.predict(X)
+        if hasattr(model, 'predict_proba'):
+            predictions.loc[valid, 'stroke_probability'] = model.predict_proba(X)[:, 1]
+
+    return predictions
+
+
+def update_model(df, artifact, growth):
+    """
+    Feeds new labelled patient records into the exported model without retraining it from scratch.
+    Forests and gradient boosting get growth['n_estimators'] more trees or stages fitted on the new records,
+    MLPs train growth['max_iter'] more iterations on them, and undersampled ensembles add members.
+    The new records are balanced like the training data (all stroke cases and as many non-stroke cases).
+    Returns the updated artifact, or None if the model cannot be updated incrementally.
+
+    """
+    from search import warm_start_parameter, grow_model
+    from FeatureAnalysis.balancing import undersample_indices, UndersampledEnsemble
+
+    try:
+        model = artifact['model']
+        X, valid = prepare_features(df, artifact)
+        y = df['stroke'].to_numpy()[valid].astype(int)
+        if len(np.unique(y)) < 2:
+            logger.error("The new records need both stroke and non-stroke cases to update the model.")
+            return None
+
+        if isinstance(model, UndersampledEnsemble):
+            n_members = len(model.estimators_)
+            model.partial_fit(X, y)
+            logger.info(f"Added {len(model.estimators_) - n_members} ensemble members fitted on {len(y)} new records.")
+        else:
+            param = warm_start_parameter(model, [growth], exact=False)
+            if param is None:
+                logger.error(f"{artifact['model_name']} cannot be updated incrementally, it has to be retrained on the whole dataset.")
+                return None
+
+            # Grow the model on one balanced subset of the new records
+            rows = undersample_indices(y, n_subsets=1)[0]
+            value = model.get_params()[param] + growth[param]
+            grow_model(model, param, value, X[rows], y[rows])
+            logger.info(f"Grew {artifact['model_name']} to {param}={value} on {len(rows)} balanced new records.")
+
+        # The grown trees have to be compiled again
+        artifact['compiled'] = compile_model(model)
+        artifact['n_updates'] = artifact.get('n_updates', 0) + 1
+        return artifact
+
+    except Exception as e:
+        logger.error(f"Error updating the model with new records: {e}")
+        return None
+
+
+def _read_chunks(filepath, chunksize):
+    """
+    Reads a CSV or JSONL file in chunks of chunksize rows.
+
+    """
+    if filepath.endswith(('.jsonl', '.json')):
+        return pd.read_json(filepath, lines=True, chunksize=chunksize)
+    return pd.read_csv(filepath, chunksize=chunksize)
+
+
+def predict_file(input_path, output_path, artifact, chunksize=10000):
+    """
+    Scores a CSV or JSONL file of patient records in fixed-size chunks and appends the predictions to a CSV file,
+    so memory stays flat for files of any size. Returns the number of rows scored and the rows per second.
+
+    """
+    logger.info(f"Scoring {input_path} in chunks of {chunksize} rows...")
+
+    start_time = time.perf_counter()
+    n_rows, n_skipped = 0, 0
+    for chunk_index, chunk in enumerate(_read_chunks(input_path, chunksize)):
+        predictions = predict_batch(chunk, artifact)
+        if 'id' in chunk.columns:
+            predictions.insert(0, 'id', chunk['id'].to_numpy())
+
+        predictions.to_csv(output_path, mode='w' if chunk_index == 0 else 'a', header=chunk_index == 0, index=False)
+        n_rows += len(chunk)
+        n_skipped += int(predictions['stroke_prediction'].isna().sum())
+
+    elapsed = time.perf_counter() - start_time
+    rows_per_second = n_rows / elapsed if elapsed > 0 else float('inf')
+
+    if n_skipped:
+        logger.warning(f"{n_skipped} rows had unknown categories or missing values and were not scored.")
+    logger.info(f"Scored {n_rows} rows in {elapsed:.2f} seconds ({rows_per_second:.0f} rows/sec). Predictions saved to {output_path}.")
+    return n_rows, rows_per_second
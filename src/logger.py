@@ -1,14 +1,107 @@
+import atexit
 import logging
+import logging.handlers
+import multiprocessing
+from contextlib import contextmanager
+from config import Log_File, Log_Level, Stage_Log_Levels
 
-# Configure logger
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("app.log"), 
-        logging.StreamHandler() 
-    ]
-)
+Log_Format = "%(asctime)s - %(levelname)s - %(message)s"
 
 # Create logger instance
 logger = logging.getLogger(__name__)
+
+
+class LazyMessage:
+    """
+    Log argument that calls function(*args) only when its record is formatted, i.e. when the level is enabled,
+    e.g. logger.info("Descriptive Statistics:\n%s", LazyMessage(df.describe)).
+    """
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+        self.text = None
+
+    def __str__(self):
+        # Every handler formats the record, the function only runs for the first one
+        if self.text is None:
+            self.text = str(self.function(*self.args))
+        return self.text
+
+
+def _use_queue(log_queue):
+    """
+    Replaces the handlers of the root logger with one that puts the records on log_queue.
+    """
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(Log_Level)
+
+
+def _start_listener():
+    """
+    Starts the background thread that writes the records of the queue to the log file and the console,
+    so logging calls do not wait for the writes. The queue also takes the records of the worker processes.
+    """
+    log_queue = multiprocessing.get_context('spawn').Queue()
+    formatter = logging.Formatter(Log_Format)
+    handlers = [logging.FileHandler(Log_File, delay=True), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    _use_queue(log_queue)
+    return log_queue, listener
+
+
+# Configure logging in the main process, worker processes send their records to it with configure_worker
+_log_queue, _listener = _start_listener() if multiprocessing.parent_process() is None else (None, None)
+
+
+def configure_worker(log_queue, level):
+    """
+    Initializer of worker processes (plot pool, search workers): sends their records to the listener
+    of the main process through log_queue, with the log level the main process had when it started them.
+
+    """
+    global _log_queue, _listener
+    if log_queue is None:
+        return
+    if _listener is not None:
+        atexit.unregister(_listener.stop)
+        _listener.stop()
+        _listener = None
+    _log_queue = log_queue
+    _use_queue(log_queue)
+    logger.setLevel(level)
+
+
+def worker_config():
+    """
+    Returns the arguments of configure_worker for the worker processes started now.
+
+    """
+    return _log_queue, logger.getEffectiveLevel()
+
+
+@contextmanager
+def stage_log_level(name):
+    """
+    Context manager applying the log level of the pipeline stage name from Stage_Log_Levels while it runs.
+
+    """
+    level = Stage_Log_Levels.get(name)
+    if level is None:
+        yield
+        return
+    previous = logger.level
+    logger.setLevel(level)
+    try:
+        yield
+    finally:
+        logger.setLevel(previous)
@@ -1,17 +1,31 @@
-from pipeline import preprocess_data, feature_analysis, train_models
+from pipeline import preprocess_data, feature_analysis, train_models, export_best_model
+from profiler import profiler
+from plotting import plot_queue
+from config import Timing_Report_Path
 
 def main():
     # Load the healthcare dataset into a pandas DataFrame 
     filepath = 'data/healthcare-dataset-stroke-data.csv'
 
     # Step 1: Preprocess the dataset (exploration, visualization, missing values handling, encoding)
-    healthCareDataFrame = preprocess_data(filepath)
+    healthCareDataFrame, bmi_imputer = preprocess_data(filepath)
 
     # Step 2: Perform feature analysis (PCA, data balancing, scree plot, feature contributions)
-    X_train_balanced, X_test_balanced, y_train_balanced, y_test_balanced, X_pca_balanced, pca_balanced = feature_analysis(healthCareDataFrame)
+    X_train_balanced, X_test_balanced, y_train_balanced, y_test_balanced, unused_balanced = feature_analysis(healthCareDataFrame)
 
     # Step 3: Train models using all features and PCA-reduced features, then save results
-    train_models(X_train_balanced, X_test_balanced, y_train_balanced, y_test_balanced, X_pca_balanced, pca_balanced)
+    ModelsResults, best_estimators = train_models(X_train_balanced, X_test_balanced, y_train_balanced, y_test_balanced, unused_balanced)
+
+    # Step 4: Export the best model with its preprocessing chain for scoring new patient records
+    feature_columns = healthCareDataFrame.columns.drop('stroke')
+    export_best_model(ModelsResults, best_estimators, bmi_imputer, feature_columns)
+
+    # Wait for the plots still being rendered
+    with profiler.stage('plots'):
+        plot_queue.close()
+
+    # Save the timing report of the stages and log the summary table
+    profiler.write_report(Timing_Report_Path)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,80 @@
+import numpy as np
+
+# Metrics derived from the confusion counts, in the order of the results table
+Metric_Names = ['Precision', 'Recall', 'F-Score', 'Accuracy', 'Miss rate', 'Fall-out rate']
+
+# Resampled indices (resamples x samples) drawn and scored at once by bootstrap_metrics, which bounds its memory
+Bootstrap_Chunk_Size = 2 ** 22
+
+
+def confusion_counts(y_true, y_pred):
+    """
+    Returns the confusion counts (tn, fp, fn, tp) of binary labels in one pass.
+    y_true and y_pred can be single vectors or batches of vectors (one per row, e.g. the predictions of several
+    candidates or thresholds, or bootstrap resamples); they are broadcast against each other and the counts
+    have one value per vector of the batch.
+
+    """
+    y_true = np.asarray(y_true) != 0
+    y_pred = np.asarray(y_pred) != 0
+    n_samples = y_pred.shape[-1]
+
+    tp = np.count_nonzero(y_true & y_pred, axis=-1)
+    fp = np.count_nonzero(y_pred, axis=-1) - tp
+    fn = np.count_nonzero(y_true, axis=-1) - tp
+    tn = n_samples - tp - fp - fn
+    return tn, fp, fn, tp
+
+
+def _ratio(numerator, denominator):
+    # Metrics with an empty denominator are 0, like scikit-learn's zero_division default
+    numerator, denominator = np.broadcast_arrays(np.asarray(numerator, dtype=float), np.asarray(denominator, dtype=float))
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+
+def metrics_from_counts(tn, fp, fn, tp):
+    """
+    Derives every metric of Metric_Names from the confusion counts. Returns a dictionary of arrays
+    (or floats, for single counts).
+
+    """
+    values = [
+        _ratio(tp, tp + fp),
+        _ratio(tp, tp + fn),
+        _ratio(2 * tp, 2 * tp + fp + fn),
+        _ratio(tp + tn, tp + tn + fp + fn),
+        _ratio(fn, fn + tp),
+        _ratio(fp, fp + tn),
+    ]
+    return {name: value if value.ndim else float(value) for name, value in zip(Metric_Names, values)}
+
+
+def compute_metrics(y_true, y_pred):
+    """
+    Computes every metric of Metric_Names for one prediction vector or a batch of them.
+
+    """
+    return metrics_from_counts(*confusion_counts(y_true, y_pred))
+
+
+def bootstrap_metrics(y_true, y_pred, n_resamples=10000, confidence=0.95, random_state=42):
+    """
+    Percentile bootstrap confidence intervals of every metric of Metric_Names.
+    The resamples are drawn as (resamples x n_samples) index matrices of at most Bootstrap_Chunk_Size entries,
+    each scored in a single batch; the draws are the same as those of one matrix of all resamples.
+    Returns a dictionary of (low, high) bounds per metric.
+
+    """
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    rng = np.random.default_rng(random_state)
+    dtype = np.int32 if len(y_true) < 2 ** 31 else np.int64
+    chunk_size = max(1, Bootstrap_Chunk_Size // max(len(y_true), 1))
+
+    # Score the resamples chunk by chunk, then join the metrics of all chunks
+    chunks = []
+    for start in range(0, n_resamples, chunk_size):
+        indices = rng.integers(0, len(y_true), size=(min(chunk_size, n_resamples - start), len(y_true)), dtype=dtype)
+        chunks.append(compute_metrics(y_true[indices], y_pred[indices]))
+    metrics = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in Metric_Names}
+    tail = (1 - confidence) / 2 * 100
+    return {name: tuple(np.percentile(values, [tail, 100 - tail])) for name, values in metrics.items()}
@@ -1,36 +1,26 @@
-from sklearn.metrics import confusion_matrix, precision_score, recall_score, f1_score, accuracy_score
 from logger import logger 
-from sklearn.model_selection import GridSearchCV
+from metrics import compute_metrics, bootstrap_metrics, Metric_Names
+from scheduler import run_schedule
+from profiler import profiler
+from FeatureAnalysis.balancing import UndersampledEnsemble
+from sklearn.pipeline import Pipeline
+import numpy as np
 import pandas as pd
 
 def calculate_metrics(y_true, y_pred):
     """
     Function to evaluate model performance using various metrics.
+    The confusion counts are computed once and every metric is derived from them.
 
     """
     try:
-        logger.info("Starting model performance evaluation...")
-
-        # Calculate confusion matrix
-        tn, fp, fn, tp = confusion_matrix(y_true, y_pred).ravel()
-
-        # Calculate metrics
-        precision = precision_score(y_true, y_pred)
-        recall = recall_score(y_true, y_pred)
-        f_score = f1_score(y_true, y_pred)
-        accuracy = accuracy_score(y_true, y_pred)
-        miss_rate = fn / (fn + tp)
-        fallout_rate = fp / (fp + tn)
+        # Calculate the metrics from the confusion counts
+        metrics = compute_metrics(y_true, y_pred)
+        precision, recall, f_score, accuracy, miss_rate, fallout_rate = (metrics[name] for name in Metric_Names)
 
         # Log the metrics
-        logger.info(f"Precision: {precision:.4f}")
-        logger.info(f"Recall: {recall:.4f}")
-        logger.info(f"F1 Score: {f_score:.4f}")
-        logger.info(f"Accuracy: {accuracy:.4f}")
-        logger.info(f"Miss Rate: {miss_rate:.4f}")
-        logger.info(f"Fallout Rate: {fallout_rate:.4f}")
-
-        logger.info("Model performance evaluation completed successfully.")
+        logger.info("Precision: %.4f, Recall: %.4f, F1 Score: %.4f, Accuracy: %.4f, Miss Rate: %.4f, Fallout Rate: %.4f",
+                    precision, recall, f_score, accuracy, miss_rate, fallout_rate)
 
         return precision, recall, f_score, accuracy, miss_rate, fallout_rate
 
@@ -41,75 +31,131 @@ def calculate_metrics(y_true, y_pred):
 
 
 
-def grid_search_func(X_train, y_train, X_test, y_test, models, param_grids):
-    """
-    Function to perform grid search on multiple models and evaluate them using different metrics.
+def model_results(model_name, search_result, X_test, y_test, n_resamples=None):
     """
-    # Initialize an empty list to store results
-    results_list = []
+    Evaluates the best estimator of a search on the test set and returns its row of the results table.
+    With n_resamples, bootstrap confidence intervals of the metrics are added to the row.
 
+    """
+    best_params = search_result['best_params']
+    logger.info(f"{model_name}'s best parameters: {best_params}")
+    logger.info(f"{model_name}'s search took {search_result['search_time']:.2f} seconds ({search_result['n_fits']} fits).")
+
+    # A search whose every candidate was cancelled by its budget has no model to evaluate
+    if search_result['best_estimator'] is None:
+        precision = recall = f_score = accuracy = miss_rate = fallout_rate = np.nan
+        y_pred = None
+    else:
+        # Make predictions with the best model
+        y_pred = search_result['best_estimator'].predict(X_test)
+
+        # Calculate the metrics for the best model
+        precision, recall, f_score, accuracy, miss_rate, fallout_rate = calculate_metrics(y_test, y_pred)
+
+    row = {
+        'Model': model_name,
+        'Precision': round(precision, 2),
+        'Recall': round(recall, 2),
+        'F-Score': round(f_score, 2),
+        'Accuracy': round(accuracy, 2),
+        'Miss rate': round(miss_rate, 2),
+        'Fall-out rate': round(fallout_rate, 2),
+    }
+
+    # Bootstrap confidence intervals of the metrics on the test set
+    if n_resamples and y_pred is not None:
+        for name, (low, high) in bootstrap_metrics(y_test, y_pred, n_resamples).items():
+            row[f"{name} CI low"] = round(low, 2)
+            row[f"{name} CI high"] = round(high, 2)
+
+    row.update({
+        'Search strategy': search_result['strategy'],
+        'Search time (s)': round(search_result['search_time'], 2),
+        'Fits': search_result['n_fits'],
+        'Cancelled fits': len(search_result.get('cancelled', [])),
+        'Best parameters': best_params,
+    })
+    return row
+
+
+def grid_search_feature_sets(feature_sets, y_train, y_test, models, param_grids, search_strategies=None, cache=None, n_resamples=None, ensemble=None, budgets=None,
+                             preprocessing=None, work_queue=None, preprocessing_batch_size=None):
+    """
+    Function to perform the searches of all models on several feature sets with one shared scheduler,
+    then evaluate each best model on its test set.
+    feature_sets maps a feature set name to its (X_train, X_test) pair. Returns a results DataFrame per feature set
+    and the fitted best estimators keyed by (feature set, model).
+    With an EstimatorCache, fits already done in earlier runs are reused.
+    With n_resamples, the results include bootstrap confidence intervals of every metric.
+    With ensemble ({'pools': extra training rows per feature set, 'y_pool', 'n_subsets', 'sampling'}), every best model
+    is refit as an UndersampledEnsemble on its training set plus the extra rows before it is evaluated.
+    With budgets (model name -> {'core_share', 'time_limit', 'max_fit_time'}), the searches run under those resource
+    limits, and the fits they cancel are counted in the results.
+    With preprocessing (feature set name -> numbers of principal components), the matrices of those feature sets are
+    unscaled and are standardized and projected inside every fold (in chunks of preprocessing_batch_size rows if one is given);
+    their best estimators are scaler -> PCA -> model pipelines.
+    With a work_queue directory, the fits are run by the workers of that shared directory (see src/worker.py).
+    """
     try:
-        logger.info("Starting grid search for model selection...")
-
-        # Loop through each model and perform grid search
-        for model_name in models:
-            logger.info(f"Performing grid search for {model_name}...")
-
-            # Perform Grid Search
-            grid_search = GridSearchCV(models[model_name], param_grids[model_name], cv=5, n_jobs=-1)
-            grid_search.fit(X_train, y_train)
-
-            # Get the best model and make predictions
-            best_model = grid_search.best_estimator_
-            y_pred = best_model.predict(X_test)
-
-            # Get best parameters for the model
-            best_params = grid_search.best_params_
-            logger.info(f"{model_name}'s best parameters: {best_params}")
-
-            # Calculate the metrics for the best model
-            precision, recall, f_score, accuracy, miss_rate, fallout_rate = calculate_metrics(y_test, y_pred)
-
-            # Store the results in the results list
-            results = {
-                'Model': model_name,
-                'Precision': round(precision, 2),
-                'Recall': round(recall, 2),
-                'F-Score': round(f_score, 2),
-                'Accuracy': round(accuracy, 2),
-                'Miss rate': round(miss_rate, 2),
-                'Fall-out rate': round(fallout_rate, 2),
-            }
-
-            # Append the results to the list
-            results_list.append(results)
-
-        # Convert results to a DataFrame
-        results_df = pd.DataFrame(results_list)
+        logger.info(f"Starting grid search for model selection on {len(feature_sets)} feature sets...")
+
+        # Run every (feature set, model) search in one task graph
+        search_results = run_schedule({name: X_train for name, (X_train, _) in feature_sets.items()},
+                                      y_train, models, param_grids, search_strategies, cv=5, n_jobs=-1, cache=cache,
+                                      budgets=budgets, preprocessing=preprocessing, work_queue=work_queue,
+                                      preprocessing_batch_size=preprocessing_batch_size)
+
+        # Refit every best model as an ensemble over balanced subsets of the training set and the extra rows
+        if ensemble is not None:
+            y_full = np.concatenate([np.asarray(y_train), ensemble['y_pool']])
+            for (set_name, model_name), result in search_results.items():
+                if result['best_estimator'] is None:
+                    continue
+                X_full = np.concatenate([np.asarray(feature_sets[set_name][0]), ensemble['pools'][set_name]])
+                estimator, steps = result['best_estimator'], []
+                if isinstance(estimator, Pipeline):
+                    # Keep the preprocessing fitted during the search, and ensemble the model on the transformed rows
+                    steps, estimator = estimator.steps[:-1], estimator.steps[-1][1]
+                    X_full = Pipeline(steps).transform(X_full)
+                model = UndersampledEnsemble(estimator, ensemble['n_subsets'], ensemble['sampling']).fit(X_full, y_full)
+                result['best_estimator'] = Pipeline(steps + [('model', model)]) if steps else model
+                result['strategy'] = f"{result['strategy']} + ensemble of {len(model.estimators_)}"
+                result['n_fits'] += len(model.estimators_)
+            logger.info(f"Refitted {len(search_results)} best models as undersampled ensembles.")
+
+        # Record the fits and fitting time of every search
+        for (set_name, model_name), result in search_results.items():
+            profiler.record_search(f"search {set_name}/{model_name}", result['search_time'], result['n_fits'], result['n_cached'])
+            profiler.count_fits(result['n_fits'], result['n_cached'])
+
+        # Build one results table per feature set
+        results_dfs = {}
+        for set_name, (_, X_test) in feature_sets.items():
+            logger.info(f"Evaluating models trained on {set_name}...")
+            results_list = [model_results(model_name, search_results[(set_name, model_name)], X_test, y_test, n_resamples)
+                            for model_name in models]
+            results_dfs[set_name] = pd.DataFrame(results_list)
+
+        best_estimators = {key: result['best_estimator'] for key, result in search_results.items()}
         logger.info("Grid search completed successfully.")
-
-        return results_df
+        return results_dfs, best_estimators
 
     except Exception as e:
         logger.error(f"An error occurred during grid search: {e}")
-        return None
-    
+        return None, None
+
 
-def select_pca_components(X_train, X_test, pca_model, n_components):
+def grid_search_func(X_train, y_train, X_test, y_test, models, param_grids, search_strategies=None, cache=None, n_resamples=None, budgets=None,
+                     work_queue=None):
     """
-    Selects the first n principal components from the training and test sets.
+    Function to perform grid search on multiple models and evaluate them using different metrics.
+    The search strategy of each model (exhaustive or successive halving) is taken from search_strategies,
+    models that are not listed there are searched exhaustively.
+    With n_resamples, bootstrap confidence intervals of every metric are added to the results.
+    With budgets, the searches of the listed models run under their core share and time limits.
+    With a work_queue directory, the fits are spread over the workers of that shared directory.
     """
-    try:
-        # Select the first n components from the training set
-        X_train_selected = X_train[:, :n_components]
-
-        # Apply the PCA transformation on the test set
-        X_test_selected = pca_model.transform(X_test)[:, :n_components]
-
-        logger.info(f"Successfully selected the first {n_components} principal components.")
-        return X_train_selected, X_test_selected
-
-    except Exception as e:
-        logger.error(f"Error selecting PCA components: {e}")
-        return None, None
-
+    results_dfs, _ = grid_search_feature_sets({'Features': (X_train, X_test)}, y_train, y_test,
+                                           models, param_grids, search_strategies, cache, n_resamples, budgets=budgets,
+                                           work_queue=work_queue)
+    return None if results_dfs is None else results_dfs['Features']
@@ -1,105 +1,256 @@
+import numpy as np
 import pandas as pd
 from logger import logger
 from Preprocessing.visualization import plot_categorical_data, plot_numerical_data
-from Preprocessing.preprocessing import explore_data, fill_missing_bmi, encode_columns
-from config import Categorical_Columns, Numeric_Columns, Encoding_Dictionary, Features, Models, ParametersForGridSearch
-from FeatureAnalysis.visualization import plot_correlation_heatmap, plot_scree_plot
-from FeatureAnalysis.feature_analysis import pca_analysis, split_data, pca_contribution
-from FeatureAnalysis.balancing import balance_data
-from models import grid_search_func, select_pca_components
+from Preprocessing.preprocessing import explore_data, fill_missing_bmi, encode_columns, apply_schema
+from Preprocessing.streaming import stream_preprocess, load_columnar
+from config import Categorical_Columns, Numeric_Columns, Encoding_Dictionary, Features, ParametersForGridSearch, SearchStrategies, Cache_Directory, Cache_Max_Size_MB, Feature_Sets, Export_Selection_Metric, Model_Artifact_Path, Streaming_Chunksize, Intermediate_Directory, Column_Schema, Categorical_Dtype, Feature_Dtype, Feature_Store_Directory, Bootstrap_Resamples, Balancing_Mode, Ensemble_Subsets, Ensemble_Sampling, Search_Budgets, Work_Queue_Directory, PCA_Batch_Size
+from FeatureAnalysis.visualization import plot_correlation_matrix, plot_scree_plot
+from cache import EstimatorCache
+from feature_store import FeatureStore, frame_digest
+from inference import export_model
+from profiler import profiler
+from plotting import plot_queue
 
+def _feature_store():
+    """
+    Returns the feature store of the configured directory, or None if it is disabled.
+    """
+    return FeatureStore(Feature_Store_Directory) if Feature_Store_Directory else None
+
+@profiler.stage('preprocess_data')
 def preprocess_data(filepath):
     """
-    Preprocess the dataset: explore, visualize, handle missing values, and encode catecorical columns
+    Preprocess the dataset, in memory or in chunks (Streaming_Chunksize), or load the result of an earlier run
+    with the same data file and preprocessing configuration from the feature store.
+    Returns the preprocessed DataFrame and the fitted BMI imputer (needed to score new records).
     
     """
+    store = _feature_store()
+    if store is not None:
+        key = store.key(('file', filepath), Categorical_Columns, Numeric_Columns, Encoding_Dictionary, Column_Schema, Categorical_Dtype)
+        healthCareDataFrame, objects = store.load_frame(key, 'preprocessed')
+        if healthCareDataFrame is not None:
+            logger.info(f"Loaded the preprocessed dataset from the feature store (key {key}).")
+            return healthCareDataFrame, objects['bmi_imputer']
+
+    if Streaming_Chunksize:
+        healthCareDataFrame, bmi_imputer = preprocess_data_streaming(filepath)
+    else:
+        healthCareDataFrame, bmi_imputer = preprocess_data_in_memory(filepath)
+
+    if store is not None:
+        store.save_frame(key, 'preprocessed', healthCareDataFrame, bmi_imputer=bmi_imputer)
+    return healthCareDataFrame, bmi_imputer
+
+def preprocess_data_in_memory(filepath):
+    """
+    Preprocess the dataset: explore, visualize, handle missing values, and encode catecorical columns
     
+    """
     logger.info("Starting preprocessing...")
 
     # Load the healthcare dataset into a pandas DataFrame 
     healthCareDataFrame = pd.read_csv(filepath, index_col='id')
 
     # Perform an initial exploration of the dataset
-    explore_data(healthCareDataFrame, Categorical_Columns)
+    explore_data(healthCareDataFrame, Categorical_Columns, Categorical_Dtype)
 
     # Visualize categorical column distributions
-    plot_categorical_data(healthCareDataFrame, Categorical_Columns)
+    plot_queue.submit('categorical distributions', plot_categorical_data, healthCareDataFrame, Categorical_Columns)
 
     # Visualize numerical column distributions 
-    plot_numerical_data(healthCareDataFrame, Numeric_Columns)
+    plot_queue.submit('numerical distributions', plot_numerical_data, healthCareDataFrame, Numeric_Columns)
 
-    # Fill missing BMI values
-    healthCareDataFrame = fill_missing_bmi(healthCareDataFrame)
+    # Fill missing BMI values and keep the fitted imputer for new records
+    healthCareDataFrame, bmi_imputer = fill_missing_bmi(healthCareDataFrame, return_imputer=True)
 
     # Encode categorical columns using predefined encoding dictionary
     healthCareDataFrame = encode_columns(healthCareDataFrame, Encoding_Dictionary)
 
+    # Cast the encoded columns to their compact types
+    healthCareDataFrame = apply_schema(healthCareDataFrame, Column_Schema)
+
     logger.info("Preprocessing completed.")
-    return healthCareDataFrame
+    return healthCareDataFrame, bmi_imputer
+
+def preprocess_data_streaming(filepath):
+    """
+    Preprocess a dataset too large for memory: read it in chunks, explore it incrementally and write the
+    encoded, imputed rows to a memory-mapped columnar dataset.
+    
+    """
+    logger.info("Starting streaming preprocessing...")
+
+    # Explore, encode and impute the dataset chunk by chunk
+    stats, bmi_imputer = stream_preprocess(filepath, Intermediate_Directory, Categorical_Columns, Numeric_Columns, Encoding_Dictionary, Streaming_Chunksize, Column_Schema)
+
+    # Visualize the column distributions from the bounded random sample of rows
+    logger.info(f"Plotting distributions from a sample of {len(stats.sample)} rows.")
+    plot_queue.submit('categorical distributions', plot_categorical_data, stats.sample, Categorical_Columns)
+    plot_queue.submit('numerical distributions', plot_numerical_data, stats.sample, Numeric_Columns)
+
+    # Open the preprocessed dataset with memory-mapped columns
+    healthCareDataFrame = load_columnar(Intermediate_Directory)
+
+    logger.info("Streaming preprocessing completed.")
+    return healthCareDataFrame, bmi_imputer
 
+def split_data_stored(df, outcome):
+    """
+    split_data of the unscaled features with the scaler and the moments of the training and testing rows, reusing
+    the split feature matrices of an earlier run from the feature store.
+    Stored matrices are returned memory-mapped, so grid-search workers share them instead of receiving copies.
+    
+    """
+    from FeatureAnalysis.feature_analysis import split_data
+
+    store = _feature_store()
+    if store is None:
+        return split_data(df, outcome, return_scaler=True, dtype=Feature_Dtype, return_moments=True, scale=False,
+                          batch_size=PCA_Batch_Size)
+
+    key = store.key(frame_digest(df), outcome, Feature_Dtype, 'unscaled')
+    arrays, objects = store.load_arrays(key, 'split')
+    if arrays is not None and 'moments' in objects:
+        logger.info(f"Loaded the split feature matrices from the feature store (key {key}).")
+    else:
+        # Split and store the matrices, then reopen them memory-mapped
+        outputs = split_data(df, outcome, return_scaler=True, dtype=Feature_Dtype, return_moments=True, scale=False,
+                             batch_size=PCA_Batch_Size)
+        X_train, X_test, y_train, y_test, scaler, moments = outputs
+        if X_train is None:
+            return outputs
+        store.save_arrays(key, 'split', {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test},
+                          scaler=scaler, moments=moments)
+        arrays, objects = store.load_arrays(key, 'split')
+        if arrays is None:
+            return outputs
+
+    return arrays['X_train'], arrays['X_test'], arrays['y_train'], arrays['y_test'], objects['scaler'], objects['moments']
+
+@profiler.stage('feature_analysis')
 def feature_analysis(healthCareDataFrame):
     """
     Perform PCA analysis before and after balancing.
     
     """
+    # scikit-learn is only loaded by the stages that use it
+    from FeatureAnalysis.feature_analysis import pca_contribution, scaled_training_moments
+    from FeatureAnalysis.balancing import balance_data
+
     logger.info("Starting feature analysis...")
 
-    # Plot correlation heatmap to identify relationships between features  
-    plot_correlation_heatmap(healthCareDataFrame)
+    # Split the dataset into training and testing sets, collecting the moments of the rows in the same scan
+    X_train, X_test, y_train, y_test, scaler, (train_moments, test_moments) = split_data_stored(healthCareDataFrame, 'stroke')
 
-    # Split the dataset into training and testing sets
-    X_train, X_test, y_train, y_test = split_data(healthCareDataFrame, 'stroke')
+    # Plot correlation heatmap to identify relationships between features (from the moments of all rows)
+    plot_queue.submit('correlation heatmap', plot_correlation_matrix, train_moments.merge(test_moments).correlation())
 
-    # Perform PCA analysis on the training data to reduce dimensionality 
-    X_pca, pca = pca_analysis(X_train)
+    # Perform PCA analysis on the standardized training data (from the moments of its rows)
+    pca = scaled_training_moments(train_moments, scaler).pca(dtype=X_train.dtype)
 
     # Plot the scree plot to visualize explained variance before balancing 
-    plot_scree_plot(pca, 'before balancing')
+    plot_queue.submit('scree plot before balancing', plot_scree_plot, pca, 'before balancing')
 
     # Analyze the contribution of features in PCA 
     pca_contribution(pca, Features)
 
     # Balance the dataset to ensure equal distribution of stroke and non-stroke cases
-    balanceHealthCareDataFrame = balance_data(healthCareDataFrame)
+    # (the ensemble mode keeps the non-stroke cases that were left out)
+    if Balancing_Mode == 'ensemble':
+        balanceHealthCareDataFrame, unusedHealthCareDataFrame = balance_data(healthCareDataFrame, return_unused=True)
+    else:
+        balanceHealthCareDataFrame = balance_data(healthCareDataFrame)
 
     # Split the balanced dataset into training and testing sets
-    X_train_balanced, X_test_balanced, y_train_balanced, y_test_balanced = split_data(balanceHealthCareDataFrame, 'stroke')
+    X_train_balanced, X_test_balanced, y_train_balanced, y_test_balanced, scaler_balanced, (train_moments_balanced, _) = \
+        split_data_stored(balanceHealthCareDataFrame, 'stroke')
+
+    # Keep the unscaled features of the left-out cases, like the balanced training set
+    unused_balanced = None
+    if Balancing_Mode == 'ensemble':
+        unused_features = unusedHealthCareDataFrame.drop(columns=['stroke']).astype(Feature_Dtype).to_numpy()
+        unused_balanced = (unused_features, unusedHealthCareDataFrame['stroke'].astype(int).to_numpy())
 
     # Perform PCA again on the balanced dataset
-    X_pca_balanced, pca_balanced = pca_analysis(X_train_balanced)
+    pca_balanced = scaled_training_moments(train_moments_balanced, scaler_balanced).pca(dtype=X_train_balanced.dtype)
 
     # Plot the scree plot after balancing to see the effect of balancing on feature importance 
-    plot_scree_plot(pca_balanced, 'after balancing')
+    plot_queue.submit('scree plot after balancing', plot_scree_plot, pca_balanced, 'after balancing')
 
     # Analyze the contribution of features in PCA after balancing 
     pca_contribution(pca_balanced, Features)
 
     logger.info("Feature analysis completed.")
-    return X_train_balanced, X_test_balanced, y_train_balanced, y_test_balanced, X_pca_balanced, pca_balanced
+    return X_train_balanced, X_test_balanced, y_train_balanced, y_test_balanced, unused_balanced
 
 
-def train_models(X_train_balanced, X_test_balanced, y_train_balanced, y_test_balanced, X_pca_balanced, pca_balanced):
+@profiler.stage('train_models')
+def train_models(X_train_balanced, X_test_balanced, y_train_balanced, y_test_balanced, unused_balanced=None):
     """
     Train models on full features and PCA-reduced features, then save results.
+    The features are unscaled: the scaler and the PCA are fitted inside every cross-validation fold, and the number
+    of principal components of a feature set is searched with the model parameters.
+    With the rows left out by balancing (unused_balanced, in ensemble mode), every tuned model is refit
+    as an undersampled ensemble that also uses them.
+    Returns the results table and the fitted best estimators of every feature set.
     
     """
-    logger.info("Starting model training...")
+    from models import grid_search_feature_sets
+    from config import Models
 
-    # Train models using all features and perform grid search for hyperparameter tuning
-    ModelsResultsAllFeatures = grid_search_func(X_train_balanced, y_train_balanced, X_test_balanced, y_test_balanced, Models, ParametersForGridSearch)
+    logger.info("Starting model training...")
 
-    # Select top 2 principal components and train models with reduced feature set
-    X_train_pca_2, X_test_pca_2 = select_pca_components(X_pca_balanced, X_test_balanced, pca_balanced, 2)
-    ModelsResults2PCA = grid_search_func(X_train_pca_2, y_train_balanced, X_test_pca_2, y_test_balanced, Models, ParametersForGridSearch)
+    # Every feature set shares the unscaled matrices, with its number of principal components (or the numbers to search)
+    feature_sets = {set_name: (X_train_balanced, X_test_balanced) for set_name in Feature_Sets}
+    preprocessing = {set_name: components if isinstance(components, list) else [components]
+                     for set_name, components in Feature_Sets.items()}
 
-    # Select top 8 principal components and train models reduced feature set
-    X_train_pca_8, X_test_pca_8 = select_pca_components(X_pca_balanced, X_test_balanced, pca_balanced, 8)
-    ModelsResults8PCA = grid_search_func(X_train_pca_8, y_train_balanced, X_test_pca_8, y_test_balanced, Models, ParametersForGridSearch)
+    # The undersampled ensembles add the left-out rows to the training set, the fitted preprocessing transforms them
+    ensemble = None
+    if unused_balanced is not None:
+        X_unused, y_unused = unused_balanced
+        pools = {set_name: X_unused for set_name in Feature_Sets}
+        ensemble = {'pools': pools, 'y_pool': y_unused, 'n_subsets': Ensemble_Subsets, 'sampling': Ensemble_Sampling}
 
+    # Train models on all feature sets with one shared scheduler and perform grid search for hyperparameter tuning
+    cache = EstimatorCache(Cache_Directory, Cache_Max_Size_MB) if Cache_Directory else None
+    ModelsResults, best_estimators = grid_search_feature_sets(feature_sets, y_train_balanced, y_test_balanced, Models, ParametersForGridSearch, SearchStrategies, cache, Bootstrap_Resamples, ensemble, Search_Budgets, preprocessing, Work_Queue_Directory, PCA_Batch_Size)
 
     # Save results to CSV files
-    ModelsResultsAllFeatures.to_csv("ModelsResults_AllFeatures.csv", index=False)
-    ModelsResults2PCA.to_csv("ModelsResults_2PCA.csv", index=False)
-    ModelsResults8PCA.to_csv("ModelsResults_8PCA.csv", index=False)
+    for set_name, results_df in ModelsResults.items():
+        results_df.to_csv(f"ModelsResults_{set_name}.csv", index=False)
 
     logger.info("Model results saved successfully as CSV files.")
+    return ModelsResults, best_estimators
+
+
+@profiler.stage('export_best_model')
+def export_best_model(ModelsResults, best_estimators, bmi_imputer, feature_columns):
+    """
+    Export the best model over all feature sets, together with its fitted preprocessing chain.
+    
+    """
+    # Find the feature set and model with the best selection metric
+    best_score, best_set, best_model = None, None, None
+    for set_name, results_df in ModelsResults.items():
+        for _, row in results_df.iterrows():
+            if pd.isna(row[Export_Selection_Metric]):
+                continue
+            if best_score is None or row[Export_Selection_Metric] > best_score:
+                best_score, best_set, best_model = row[Export_Selection_Metric], set_name, row['Model']
+    logger.info(f"Best model by {Export_Selection_Metric}: {best_model} on {best_set} ({best_score}).")
+
+    # Split the scaler -> PCA -> model pipeline of the search into the steps of the artifact
+    steps = dict(best_estimators[(best_set, best_model)].steps)
+    scaler, pca = steps['scaler'], steps.get('pca')
+    n_components = pca.n_components_ if pca is not None else None
+
+    # The scaler was fitted on the feature matrix, name its columns like the records it will transform
+    scaler.feature_names_in_ = np.asarray(feature_columns, dtype=object)
+
+    # Save the model with the BMI imputation, encoding, scaler and (for PCA feature sets) the PCA
+    metrics = ModelsResults[best_set].set_index('Model').loc[best_model].to_dict()
+    return export_model(Model_Artifact_Path, steps['model'], best_model, best_set, feature_columns,
+                        bmi_imputer, Encoding_Dictionary, scaler, pca, n_components, metrics)
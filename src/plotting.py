@@ -0,0 +1,90 @@
+import os
+import json
+import joblib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from logger import logger, configure_worker, worker_config
+from config import Plot_Mode, Plot_Workers, Plot_Directory
+
+
+class PlotQueue:
+    """
+    Deferred queue of plot jobs, so drawing the figures does not hold up preprocessing and training.
+    mode='process' renders the plots in a pool of worker processes while the pipeline goes on,
+    mode='inline' renders them right away, and mode='off' skips them (headless runs).
+    A job is skipped when the hash of its inputs matches the one stored for the PNG files it saved last time.
+    """
+
+    def __init__(self, mode='process', max_workers=2, directory='plots'):
+        self.mode = mode
+        self.max_workers = max_workers
+        self.manifest_path = os.path.join(directory, 'plot_hashes.json')
+        self.pending = []
+        self._executor = None
+        self._manifest = None
+
+    def _load_manifest(self):
+        if self._manifest is None:
+            try:
+                with open(self.manifest_path) as file:
+                    self._manifest = json.load(file)
+            except (OSError, ValueError):
+                self._manifest = {}
+        return self._manifest
+
+    def _up_to_date(self, name, digest):
+        entry = self._load_manifest().get(name)
+        return entry is not None and entry['hash'] == digest and all(os.path.exists(path) for path in entry['files'])
+
+    def _record(self, name, digest, files):
+        self._load_manifest()[name] = {'hash': digest, 'files': files}
+
+    def submit(self, name, plot_function, *args):
+        """
+        Queues the plot job name, plot_function(*args). The function must be defined at module level
+        (so worker processes can import it) and return the paths of the plots it saved.
+
+        """
+        if self.mode == 'off':
+            return
+
+        digest = joblib.hash((plot_function.__module__, plot_function.__name__, args))
+        if self._up_to_date(name, digest):
+            logger.info(f"Skipping plot job '{name}', its plots are up to date.")
+            return
+
+        if self.mode == 'inline':
+            self._record(name, digest, plot_function(*args))
+            return
+
+        # Worker processes are started without fork, so they do not inherit the threads of the main process,
+        # and they send their log records to the listener of the main process
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=configure_worker, initargs=worker_config())
+        self.pending.append((name, digest, self._executor.submit(plot_function, *args)))
+
+    def close(self):
+        """
+        Waits for the queued plots and saves the hashes of the rendered ones.
+
+        """
+        for name, digest, future in self.pending:
+            try:
+                self._record(name, digest, future.result())
+            except Exception as e:
+                logger.error(f"Error in plot job '{name}': {e}")
+        self.pending = []
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        if self._manifest:
+            os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+            with open(self.manifest_path, 'w') as file:
+                json.dump(self._manifest, file, indent=2)
+
+
+# Plot queue shared by the pipeline stages
+plot_queue = PlotQueue(Plot_Mode, Plot_Workers, Plot_Directory)
@@ -0,0 +1,19 @@
+import argparse
+from config import Model_Artifact_Path
+from inference import load_model, predict_file
+
+def main():
+    # Read the command line arguments
+    parser = argparse.ArgumentParser(description="Score patient records with the exported stroke prediction model.")
+    parser.add_argument('input', help="CSV or JSONL file of patient records")
+    parser.add_argument('output', help="CSV file to write the predictions to")
+    parser.add_argument('--artifact', default=Model_Artifact_Path, help="Model artifact saved by the training pipeline")
+    parser.add_argument('--chunksize', type=int, default=10000, help="Number of rows scored per batch")
+    args = parser.parse_args()
+
+    # Load the fitted preprocessing chain and model, then score the file chunk by chunk
+    artifact = load_model(args.artifact)
+    predict_file(args.input, args.output, artifact, args.chunksize)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import time
+import cProfile
+from contextlib import contextmanager
+import pandas as pd
+from logger import logger, LazyMessage, stage_log_level
+from config import Profile_Stage, Profile_Directory
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+def _reset_peak_rss():
+    """
+    Resets the peak resident set size of the process where the kernel supports it (Linux),
+    so the peak of every stage can be measured on its own.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the process in MB, or None if it cannot be measured.
+    Reads VmHWM on Linux, getrusage elsewhere, and psutil (if installed) on Windows.
+    """
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return max_rss / 1024 ** 2 if sys.platform == 'darwin' else max_rss / 1024
+
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 ** 2
+    except (ImportError, AttributeError):
+        return None
+
+
+class StageProfiler:
+    """
+    Records the wall time, CPU time, peak RSS and number of model fits of the pipeline stages.
+    Stages can be nested; a stage's peak RSS includes the peaks of the stages inside it.
+    One stage can be run under cProfile, its statistics are dumped to profile_directory/<stage>.prof.
+    """
+
+    def __init__(self, profile_stage=None, profile_directory='profiles'):
+        self.profile_stage = profile_stage
+        self.profile_directory = profile_directory
+        self.records = []
+        self._open = []
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager (or decorator) measuring one stage of the pipeline, logged at its level from Stage_Log_Levels.
+
+        """
+        record = {'stage': name, 'kind': 'stage', 'wall_time': None, 'cpu_time': None, 'fit_time': None,
+                  'peak_rss_mb': None, 'fits': 0, 'cached_fits': 0}
+        self.records.append(record)
+
+        # The enclosing stage keeps the peak reached so far, before it is reset for this stage
+        if self._open:
+            self._carry_peak(self._open[-1], peak_rss_mb())
+        self._open.append(record)
+        _reset_peak_rss()
+
+        profile = cProfile.Profile() if name == self.profile_stage else None
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            with stage_log_level(name):
+                yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+                os.makedirs(self.profile_directory, exist_ok=True)
+                profile_path = os.path.join(self.profile_directory, f"{name}.prof")
+                profile.dump_stats(profile_path)
+                logger.info(f"cProfile statistics of stage {name} saved as {profile_path}.")
+
+            record['wall_time'] = time.perf_counter() - start_wall
+            record['cpu_time'] = time.process_time() - start_cpu
+            self._carry_peak(record, peak_rss_mb())
+            record['peak_rss_mb'] = record.pop('_peak_rss_mb', None)
+            self._open.pop()
+            if self._open:
+                self._carry_peak(self._open[-1], record['peak_rss_mb'])
+            logger.info(f"Stage {name} took {record['wall_time']:.2f} s (CPU {record['cpu_time']:.2f} s).")
+
+    @staticmethod
+    def _carry_peak(record, peak):
+        if peak is not None:
+            record['_peak_rss_mb'] = max(record.get('_peak_rss_mb', 0), peak)
+
+    def count_fits(self, fits, cached_fits=0):
+        """
+        Adds model fits (and fits loaded from the estimator cache) to every open stage.
+
+        """
+        for record in self._open:
+            record['fits'] += fits
+            record['cached_fits'] += cached_fits
+
+    def record_search(self, name, fit_time, fits, cached_fits=0):
+        """
+        Records one parameter search. Searches share a process pool, so their time is the total
+        time spent fitting their tasks in the workers rather than a wall time.
+
+        """
+        self.records.append({'stage': name, 'kind': 'search', 'wall_time': None, 'cpu_time': None, 'fit_time': fit_time,
+                             'peak_rss_mb': None, 'fits': fits, 'cached_fits': cached_fits})
+
+    def summary(self):
+        """
+        Returns the recorded stages and searches as a table.
+
+        """
+        columns = ['stage', 'kind', 'wall_time', 'cpu_time', 'fit_time', 'peak_rss_mb', 'fits', 'cached_fits']
+        return pd.DataFrame(self.records, columns=columns).set_index('stage').round(2)
+
+    def write_report(self, path):
+        """
+        Writes the recorded stages and searches to a JSON timing report and logs the summary table.
+
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'records': self.records}, file, indent=2)
+        logger.info("Timing report saved as %s:\n%s", path, LazyMessage(lambda: self.summary().to_string()))
+
+
+# Profiler shared by the pipeline stages
+profiler = StageProfiler(Profile_Stage, Profile_Directory)
@@ -0,0 +1,407 @@
+import time
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs, parallel_config
+from sklearn.base import clone
+from search import (Search_Strategies, PCA_Parameter, make_folds, subsample_indices, fit_and_score, fit_and_score_path,
+                    warm_start_parameter, fit_preprocessing, preprocessing_pipeline)
+from cache import array_digest, CacheSnapshot
+from executor import BudgetedExecutor, SharedData
+from work_queue import WorkQueueExecutor
+from logger import logger, configure_worker, worker_config
+
+
+def _timed_fit_and_score(estimator, params, X, y, train_idx, test_idx, cache=None, cache_key=None, n_features=None):
+    """
+    Runs one (params, fold) task and returns its score, the time it took and whether a fit was needed.
+    When a cache is given, a previously stored score is returned without fitting.
+
+    """
+    if cache is not None:
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return entry['score'], 0.0, False
+
+    start_time = time.perf_counter()
+    model, score = fit_and_score(estimator, params, X, y, train_idx, test_idx, n_features)
+    elapsed = time.perf_counter() - start_time
+
+    if cache is not None:
+        cache.put(cache_key, model, score)
+    return score, elapsed, True
+
+
+def _timed_fit_path(estimator, params, param, values, X, y, train_idx, test_idx, warm_model=None, cache=None, cache_keys=None, n_features=None):
+    """
+    Runs one warm-start path task (the candidates params + {param: value} on one fold, see fit_and_score_path).
+    Returns the scores, the time spent fitting, the number of fits, cache hits and warm-started fits,
+    and the final model, which the next halving round can keep growing.
+    With a cache, the points already stored are loaded and the path is only fitted from its first missing point,
+    growing the cached model before it.
+
+    """
+    entries = [cache.get(key) for key in cache_keys] if cache is not None else [None] * len(values)
+    missing = [index for index, entry in enumerate(entries) if entry is None]
+    if not missing:
+        return [entry['score'] for entry in entries], 0.0, 0, len(values), 0, entries[-1]['model']
+
+    start = missing[0]
+    if start > 0:
+        warm_model = entries[start - 1]['model']
+    n_fits = len(values) - start
+    n_warm = n_fits if warm_model is not None else n_fits - 1
+
+    scores = [entry['score'] for entry in entries[:start]]
+    path = fit_and_score_path(estimator, params, param, values[start:], X, y, train_idx, test_idx, warm_model, n_features)
+    elapsed = 0.0
+    for index in range(start, len(values)):
+        start_time = time.perf_counter()
+        model, score = next(path)
+        elapsed += time.perf_counter() - start_time
+
+        scores.append(score)
+        if cache is not None and entries[index] is None:
+            cache.put(cache_keys[index], model, score)
+    return scores, elapsed, n_fits, start, n_warm, model
+
+
+def _group_paths(candidates, param):
+    """
+    Groups the (params, n_samples) candidates of a round into warm-start paths: candidates that only differ
+    in param share one path, in increasing order of param. Without a warm-start parameter every candidate
+    is its own group. Returns (params without param, n_samples, path id, [(candidate index, value)]) groups.
+
+    """
+    groups = {}
+    for index, (params, n_samples) in enumerate(candidates):
+        if param is None or param not in params:
+            groups[index] = (params, n_samples, None, [(index, None)])
+            continue
+        base = {name: value for name, value in params.items() if name != param}
+        path_id = (n_samples, repr(sorted(base.items())))
+        groups.setdefault(path_id, (base, n_samples, path_id, []))[3].append((index, params[param]))
+
+    for _, _, path_id, members in groups.values():
+        if path_id is not None:
+            members.sort(key=lambda member: member[1])
+    return list(groups.values())
+
+
+def _timed_refit(estimator, params, X, y, cache=None, cache_key=None, n_features=None):
+    """
+    Refits the estimator with the best parameters on the whole training set (or loads it from the cache).
+
+    """
+    if cache is not None:
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return entry['model'], 0.0, False
+
+    start_time = time.perf_counter()
+    model = clone(estimator).set_params(**params).fit(X[:, :n_features], y)
+    elapsed = time.perf_counter() - start_time
+
+    if cache is not None:
+        cache.put(cache_key, model, None)
+    return model, elapsed, True
+
+
+def _run_with_snapshot(function, *args):
+    """
+    Runs a task whose cache is a CacheSnapshot (on a work queue worker) and returns its output
+    with the cache entries it stored.
+
+    """
+    output = function(*args)
+    snapshot = next((arg for arg in args if isinstance(arg, CacheSnapshot)), None)
+    return output, [] if snapshot is None else snapshot.stored
+
+
+def run_schedule(feature_sets, y_train, models, param_grids, search_strategies=None, cv=5, n_jobs=-1, cache=None, warm_start=True, budgets=None,
+                 preprocessing=None, work_queue=None, preprocessing_batch_size=None):
+    """
+    Runs the parameter searches of every (feature set, model) pair as a single task graph.
+    The cross-validation folds are computed once and shared by all feature sets, and every round of
+    (feature set x model x parameter combination x fold) tasks is spread over one process pool.
+    With an EstimatorCache, fits that were already done in an earlier run are loaded instead of refitted.
+    Estimators whose warm-started fits are exact (forests and boosting) are grown along the parameter of the grid they
+    can grow by (n_estimators or max_iter): the candidates of a round that only differ in it are fitted as one path, and a halving round
+    keeps growing the previous round's models instead of refitting them (warm_start=False refits every candidate).
+
+    budgets maps a model name to the budget of each of its searches: core_share (fraction of the workers its fits
+    may occupy at once), time_limit (seconds of fitting after which the search stops with the best candidate scored
+    so far) and max_fit_time (seconds after which a candidate's fit is cancelled and its worker replaced).
+    With budgets the tasks run in a BudgetedExecutor instead of joblib. Cancelled candidates score -inf and are
+    reported; everything else is deterministic, the tasks and their seeds do not depend on the scheduling.
+
+    preprocessing maps a feature set name to the numbers of principal components to search (None: the scaled features).
+    The matrices of those feature sets are unscaled, and their searches run scaler -> PCA -> model inside every fold:
+    the scaler and the PCA are fitted once per fold on its training rows (and once on the whole training set for the
+    refits) and shared by every model, candidate and feature set, and the number of components is searched as the
+    pca__n_components parameter. Their best estimators are scaler -> PCA -> model pipelines. A feature set with a single
+    number of components keeps it fixed, and it is left out of its best parameters. With a preprocessing_batch_size, the
+    preprocessing is fitted and applied in chunks of that many rows.
+
+    With a work_queue directory, the tasks are handed to the workers of a WorkQueueExecutor on that (shared) directory
+    instead, which can run on other machines and join or leave during the search (start them with src/worker.py).
+    The budgets are not applied to the work queue, and the cache stays with the coordinator: the entries of every
+    task are looked up before it is queued, and the fits it returns are stored when its outcome comes back.
+
+    feature_sets maps a feature set name to its training matrix. Returns a dictionary keyed by
+    (feature set, model) with the fitted best estimator, best parameters, number of fits (and of cached and
+    warm-started ones), the cancelled fits, strategy and search time (the total time spent fitting that search's tasks).
+    """
+    search_strategies = search_strategies or {}
+    budgets = {name: budget for name, budget in (budgets or {}).items() if name in models}
+    if work_queue is not None and budgets:
+        logger.warning("The work queue does not enforce search budgets, running the searches without them.")
+        budgets = {}
+    y_train = np.asarray(y_train)
+    # Feature sets given the same matrix keep sharing it (and its preprocessing fits)
+    matrices_by_id = {}
+    X_sets = {name: matrices_by_id.setdefault(id(X), np.asarray(X)) for name, X in feature_sets.items()}
+    preprocessing = {name: list(components) for name, components in (preprocessing or {}).items() if name in X_sets}
+
+    # Compute the folds once, every feature set has the same rows
+    folds = make_folds(y_train, cv)
+    n_train = min(len(train) for train, _ in folds)
+
+    # Hash the data and the folds once, the cache keys of the single fits are built from these
+    data_digests = {name: (array_digest(X, y_train), name in preprocessing) for name, X in X_sets.items()} if cache is not None else {}
+    fold_digests = [array_digest(train, test) if cache is not None else None for train, test in folds]
+
+    def cache_key(key, params, fold_id):
+        return None if cache is None else cache.key(data_digests[key[0]], models[key[1]], params, fold_id)
+
+    def task_cache(keys):
+        # Work queue tasks get a snapshot of their entries, the workers may not reach the cache directory
+        return cache.snapshot(keys) if cache is not None and work_queue is not None else cache
+
+    # Start one search generator per (feature set, model), and find the parameter its fits can be warm-started along;
+    # the feature sets with in-fold preprocessing search the number of principal components with the model's parameters
+    searches, pending, results, paths = {}, {}, {}, {}
+    for set_name in X_sets:
+        for model_name in models:
+            options = dict(search_strategies.get(model_name, {'strategy': 'exhaustive'}))
+            strategy = options.pop('strategy', 'exhaustive')
+            key = (set_name, model_name)
+            param_grid = param_grids[model_name]
+            if set_name in preprocessing:
+                param_grid = {**param_grid, PCA_Parameter: preprocessing[set_name]}
+            searches[key] = Search_Strategies[strategy](param_grid, n_train, **options)
+            pending[key] = next(searches[key])
+            paths[key] = warm_start_parameter(models[model_name], [param_grid]) if warm_start else None
+            results[key] = {'strategy': strategy, 'n_fits': 0, 'n_cached': 0, 'n_warm': 0, 'search_time': 0.0,
+                            'cancelled': [], 'best_seen': None}
+
+    # Final models of the last round's paths, which the next round of a halving search keeps growing
+    warm_models = {}
+
+    def warm_model(key, fold, path_id, first_value):
+        model = warm_models.get((key, fold, path_id))
+        return model if model is not None and model.get_params()[paths[key]] < first_value else None
+
+    # Fit the scaler -> PCA preprocessing once per fold on its training rows, and once on the whole training set for
+    # the refits (index len(folds)); every model, candidate and feature set of the same matrix shares the fits
+    matrices, with_pca = {}, {}
+    for name, components in preprocessing.items():
+        matrix_id = id(X_sets[name])
+        matrices[matrix_id] = X_sets[name]
+        with_pca[matrix_id] = with_pca.get(matrix_id, False) or any(n is not None for n in components)
+    fits = {matrix_id: [fit_preprocessing(X, train_idx, with_pca[matrix_id], preprocessing_batch_size)
+                        for train_idx in [train for train, _ in folds] + [np.arange(len(X))]]
+            for matrix_id, X in matrices.items()}
+    if fits:
+        logger.info(f"Fitted the in-fold preprocessing of {len(fits)} training matrices on {len(folds)} folds.")
+
+    arrays = {('X', name): X for name, X in X_sets.items() if name not in preprocessing}
+    for matrix_id, matrix_fits in fits.items():
+        for index, fit in enumerate(matrix_fits):
+            arrays[('scaled', matrix_id, index)] = fit['scaled']
+            if fit['projected'] is not None:
+                arrays[('projected', matrix_id, index)] = fit['projected']
+    arrays['y'] = y_train
+
+    # The work queue and the searches with a budget use executors whose workers get the data once;
+    # the budgets need one that can cancel single fits
+    if work_queue is not None:
+        pool = WorkQueueExecutor(work_queue, arrays)
+        data, group_budgets = SharedData, {}
+        logger.info(f"Handing the search tasks to the workers of {work_queue} ({len(pool.live_workers())} live).")
+    elif budgets:
+        n_workers = effective_n_jobs(n_jobs)
+        pool = BudgetedExecutor(n_workers, arrays)
+        data = SharedData
+        group_budgets = {key: {'max_workers': max(1, round(budgets[key[1]].get('core_share', 1.0) * n_workers)),
+                               'time_limit': budgets[key[1]].get('time_limit')}
+                         for key in results if key[1] in budgets}
+    else:
+        # The joblib workers send their log records to the listener of the main process
+        with parallel_config(backend='loky', initializer=configure_worker, initargs=worker_config()):
+            pool = Parallel(n_jobs=n_jobs)
+        data = arrays.__getitem__
+    y_data = data('y')
+
+    def task_data(key, fold, params):
+        # Returns the matrix of a candidate on a fold (None: the whole training set), its parameters without
+        # the number of principal components and the number of columns it uses
+        if key[0] not in preprocessing:
+            return data(('X', key[0])), params, None
+        n_components = params[PCA_Parameter]
+        model_params = {name: value for name, value in params.items() if name != PCA_Parameter}
+        index = len(folds) if fold is None else fold
+        return data(('scaled' if n_components is None else 'projected', id(X_sets[key[0]]), index)), model_params, n_components
+
+    def execute(calls):
+        # Runs (group, function, args, max_time) calls and returns their (status, output, elapsed) outcomes
+        if work_queue is not None and cache is not None:
+            # Store the fits of the queued tasks in the coordinator's cache
+            outcomes = pool.run([(group, _run_with_snapshot, (function, *args), max_time)
+                                 for group, function, args, max_time in calls], group_budgets)
+            for _, (output, stored), _ in outcomes:
+                for entry in stored:
+                    cache.put(*entry)
+            return [(status, output, elapsed) for status, (output, _), elapsed in outcomes]
+        if budgets or work_queue is not None:
+            return pool.run(calls, group_budgets)
+        return [('done', output, None) for output in pool(delayed(function)(*args) for _, function, args, _ in calls)]
+
+    def max_fit_time(key, n_candidates):
+        budget = budgets.get(key[1], {})
+        return None if budget.get('max_fit_time') is None else budget['max_fit_time'] * n_candidates
+
+    with pool:
+        round_index = 0
+        while pending:
+            round_index += 1
+
+            # Flatten the current round of every active search into one list of tasks,
+            # with one task per warm-start path and fold
+            tasks = [(key, fold, params, n_samples, path_id, members)
+                     for key, candidates in pending.items()
+                     for params, n_samples, path_id, members in _group_paths(candidates, paths[key])
+                     for fold in range(len(folds))]
+            n_candidates = sum(len(members) for *_, members in tasks)
+            logger.info(f"Scheduling round {round_index}: {n_candidates} fits in {len(tasks)} tasks from {len(pending)} searches.")
+
+            calls = []
+            for key, fold, params, n_samples, path_id, members in tasks:
+                X, model_params, n_features = task_data(key, fold, params)
+                train_idx, test_idx = subsample_indices(folds[fold][0], n_samples), folds[fold][1]
+                fold_id = (fold_digests[fold], n_samples)
+                if path_id is None:
+                    calls.append((key, _timed_fit_and_score,
+                                  (models[key[1]], model_params, X, y_data, train_idx, test_idx,
+                                   task_cache([cache_key(key, params, fold_id)]), cache_key(key, params, fold_id), n_features),
+                                  max_fit_time(key, 1)))
+                else:
+                    values = [value for _, value in members]
+                    path_keys = [cache_key(key, {**params, paths[key]: value}, fold_id) for value in values]
+                    calls.append((key, _timed_fit_path,
+                                  (models[key[1]], model_params, paths[key], values, X, y_data, train_idx, test_idx,
+                                   warm_model(key, fold, path_id, values[0]), task_cache(path_keys), path_keys, n_features),
+                                  max_fit_time(key, len(members))))
+            outcomes = execute(calls)
+
+            # Gather the fold scores of each search and advance it to its next round
+            scores = {key: np.zeros((len(candidates), len(folds))) for key, candidates in pending.items()}
+            warm_models = {}
+            for (key, fold, _, _, path_id, members), (status, output, elapsed) in zip(tasks, outcomes):
+                if status != 'done':
+                    # Cancelled candidates get no score, the search ranks them last
+                    for candidate, _ in members:
+                        scores[key][candidate, fold] = np.nan
+                        results[key]['cancelled'].append({'params': pending[key][candidate][0], 'fold': fold, 'reason': status})
+                    results[key]['search_time'] += elapsed
+                    continue
+                if path_id is None:
+                    score, elapsed, fitted = output
+                    output = [score], elapsed, int(fitted), int(not fitted), 0, None
+                fold_scores, elapsed, n_fits, n_cached, n_warm, model = output
+
+                for (candidate, _), score in zip(members, fold_scores):
+                    scores[key][candidate, fold] = score
+                results[key]['n_fits'] += n_fits
+                results[key]['n_cached'] += n_cached
+                results[key]['n_warm'] += n_warm
+                results[key]['search_time'] += elapsed
+                if model is not None:
+                    warm_models[(key, fold, path_id)] = model
+
+            for key in list(pending):
+                mean_scores = np.nan_to_num(scores[key].mean(axis=1), nan=-np.inf)
+                best = int(np.argmax(mean_scores))
+                if np.isfinite(mean_scores[best]) and (results[key]['best_seen'] is None or mean_scores[best] >= results[key]['best_seen'][0]):
+                    results[key]['best_seen'] = (mean_scores[best], pending[key][best][0])
+
+                # A search that used up its time limit ends with the best candidate it scored
+                if budgets and key in pool.exhausted:
+                    results[key]['best_params'] = None if results[key]['best_seen'] is None else results[key]['best_seen'][1]
+                    del pending[key]
+                    continue
+
+                try:
+                    pending[key] = searches[key].send(mean_scores)
+                except StopIteration as stop:
+                    results[key]['best_params'] = stop.value if np.isfinite(mean_scores.max()) else \
+                        None if results[key]['best_seen'] is None else results[key]['best_seen'][1]
+                    del pending[key]
+
+            if cache is not None:
+                cache.evict()
+
+        # Refit every search's best parameters on its full training set in the same pool
+        # (refits have no budget, only searches where every candidate was cancelled are left without a model)
+        keys = [key for key in results if results[key]['best_params'] is not None]
+        refit_data = {key: task_data(key, None, results[key]['best_params']) for key in keys}
+        refit_keys = {key: cache_key(key, results[key]['best_params'], 'full') for key in keys}
+        refits = execute([
+            (('refit',) + key, _timed_refit,
+             (models[key[1]], refit_data[key][1], refit_data[key][0], y_data,
+              task_cache([refit_keys[key]]), refit_keys[key], refit_data[key][2]),
+             None)
+            for key in keys
+        ])
+
+    for key in results:
+        results[key]['best_estimator'] = None
+        if results[key]['cancelled']:
+            reasons = sorted({entry['reason'] for entry in results[key]['cancelled']})
+            logger.warning(f"Search {key}: {len(results[key]['cancelled'])} fits were cancelled ({', '.join(reasons)}).")
+    for key, (_, (model, elapsed, fitted), _) in zip(keys, refits):
+        if key[0] in preprocessing:
+            # Chain the model with the preprocessing fitted on the whole training set
+            model = preprocessing_pipeline(fits[id(X_sets[key[0]])][len(folds)], results[key]['best_params'][PCA_Parameter],
+                                           model, X_sets[key[0]].dtype)
+            if len(preprocessing[key[0]]) == 1:
+                # The number of components was not searched, report only the model's parameters
+                results[key]['best_params'] = {name: value for name, value in results[key]['best_params'].items()
+                                               if name != PCA_Parameter}
+        results[key]['best_estimator'] = model
+        results[key]['n_fits' if fitted else 'n_cached'] += 1
+        results[key]['search_time'] += elapsed
+    for key in results:
+        if results[key]['best_estimator'] is None:
+            logger.warning(f"Search {key} has no model: every candidate was cancelled.")
+
+    n_warm = sum(result['n_warm'] for result in results.values())
+    if n_warm:
+        logger.info(f"Warm-started {n_warm} fits from smaller fits of the same candidate.")
+
+    if cache is not None:
+        cache.evict()
+        n_cached = sum(result['n_cached'] for result in results.values())
+        logger.info(f"Loaded {n_cached} fits from the estimator cache.")
+
+    return results
+
+
+def run_search(estimator, param_grid, X, y, strategy='exhaustive', cv=5, n_jobs=-1, cache=None, **options):
+    """
+    Tunes a single estimator with the chosen search strategy and refits the best parameters on all of X.
+    Returns the fitted best estimator, its parameters and the number of fits performed.
+
+    """
+    results = run_schedule({'X': X}, y, {'model': estimator}, {'model': param_grid},
+                           {'model': {'strategy': strategy, **options}}, cv=cv, n_jobs=n_jobs, cache=cache)
+    result = results[('X', 'model')]
+    return result['best_estimator'], result['best_params'], result['n_fits']
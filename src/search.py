@@ -0,0 +1,211 @@
+import math
+import warnings
+import numpy as np
+from sklearn.base import clone
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from sklearn.neural_network import MLPClassifier, MLPRegressor
+from sklearn.pipeline import Pipeline
+from logger import logger
+from FeatureAnalysis.moments import MomentAccumulator
+from FeatureAnalysis.feature_analysis import pca_transform
+
+# Parameters a warm-started fit can grow: n_estimators adds trees or boosting stages, max_iter adds iterations
+Warm_Start_Parameters = ['n_estimators', 'max_iter']
+
+# Estimators whose warm-started fit is not the fit of the grown value from scratch (an MLP restarts its optimizer
+# state and early-stopping counters), so they are only grown to update a deployed model, never in a search
+Approximate_Warm_Start = (MLPClassifier, MLPRegressor)
+
+# Search parameter of the number of principal components of the in-fold preprocessing (None: the scaled features),
+# named like the parameter of the PCA step of the fitted pipelines
+PCA_Parameter = 'pca__n_components'
+
+
+def make_folds(y, n_splits=5):
+    """
+    Computes the stratified cross-validation folds (the same splits GridSearchCV(cv=5) uses).
+
+    """
+    return list(StratifiedKFold(n_splits=n_splits).split(np.zeros(len(y)), y))
+
+
+def subsample_indices(train_idx, n_samples, random_state=42):
+    """
+    Returns a reproducible subset of n_samples training indices (all of them if n_samples is None).
+
+    """
+    if n_samples is None or n_samples >= len(train_idx):
+        return train_idx
+    rng = np.random.RandomState(random_state)
+    return np.sort(rng.permutation(train_idx)[:n_samples])
+
+
+def fit_preprocessing(X, train_idx, with_pca=True, batch_size=None):
+    """
+    Fits the scaler -> PCA preprocessing on the training rows of a fold, from one MomentAccumulator of them.
+    Returns the scaler, the moments of the scaled training rows (the PCA of any number of components is derived
+    from them), and the scaled rows and their projection on all components (None without with_pca) for all of X,
+    which every model and candidate of the fold shares.
+    With a batch_size, the moments are accumulated and the rows projected in chunks of that many rows.
+
+    """
+    step = batch_size or max(len(train_idx), 1)
+    moments = MomentAccumulator(range(X.shape[1]))
+    for start in range(0, len(train_idx), step):
+        moments.update(X[train_idx[start:start + step]])
+    scaler = moments.scaler()
+    scaled = scaler.transform(X)
+    scaled_moments = moments.standardize(scaler.mean_, scaler.scale_)
+    projected = pca_transform(scaled_moments.pca(dtype=X.dtype), scaled, batch_size) if with_pca else None
+    return {'scaler': scaler, 'moments': scaled_moments, 'scaled': scaled, 'projected': projected}
+
+
+def preprocessing_pipeline(preprocessing, n_components, model, dtype=np.float64):
+    """
+    Returns the scaler -> PCA(n_components) -> model pipeline of a model fitted on the output of fit_preprocessing
+    (without the PCA step when n_components is None), which predicts from the unscaled features.
+
+    """
+    steps = [('scaler', preprocessing['scaler'])]
+    if n_components is not None:
+        steps.append(('pca', preprocessing['moments'].pca(n_components, dtype=dtype)))
+    return Pipeline(steps + [('model', model)])
+
+
+def fit_and_score(estimator, params, X, y, train_idx, test_idx, n_features=None):
+    """
+    Fits a fresh copy of the estimator with the given parameters on one fold.
+    With n_features, only the first n_features columns of X are used (e.g. the top principal components).
+    Returns the fitted model and its accuracy on the fold's validation rows.
+
+    """
+    columns = slice(n_features)
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train_idx, columns], y[train_idx])
+    return model, model.score(X[test_idx, columns], y[test_idx])
+
+
+def warm_start_parameter(estimator, candidates, exact=True):
+    """
+    Returns the parameter of Warm_Start_Parameters that the candidates vary and the estimator can grow
+    by warm starting, or None if there is none.
+    With exact=False, the estimators of Approximate_Warm_Start are grown as well (for incremental updates).
+
+    """
+    params = estimator.get_params()
+    if 'warm_start' not in params or (exact and isinstance(estimator, Approximate_Warm_Start)):
+        return None
+    for name in Warm_Start_Parameters:
+        if name in params and any(name in candidate for candidate in candidates):
+            return name
+    return None
+
+
+def grow_model(model, param, value, X, y):
+    """
+    Grows a fitted model to value of its warm-start parameter by training only the difference:
+    forests and boosting get the missing trees or stages, MLPs the missing iterations (continuing from their weights).
+    X and y may be new rows, which is how a deployed model is updated incrementally.
+    Returns the grown model.
+
+    """
+    previous = model.get_params()[param]
+    if isinstance(model, (MLPClassifier, MLPRegressor)):
+        # MLPs train for max_iter more iterations on every warm-started fit
+        model.set_params(warm_start=True, max_iter=value - previous)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', ConvergenceWarning)
+            model.fit(X, y)
+    else:
+        model.set_params(warm_start=True, **{param: value})
+        model.fit(X, y)
+    model.set_params(warm_start=False, **{param: value})
+    return model
+
+
+def fit_and_score_path(estimator, params, param, values, X, y, train_idx, test_idx, warm_model=None, n_features=None):
+    """
+    Fits the candidates params + {param: value} for the increasing values of a warm-start path on one fold.
+    The first value is fitted (or warm_model, already fitted to a smaller value, is grown to it) and every
+    next model extends the previous one, e.g. a 200-tree forest is built by adding trees to the 50- and 100-tree fits.
+    Yields the model and its score at each value; the model object keeps growing, so copy it to keep it.
+    With n_features, only the first n_features columns of X are used.
+
+    """
+    columns = slice(n_features)
+    X_train, y_train, X_test = X[train_idx, columns], y[train_idx], X[test_idx, columns]
+    model = warm_model
+    for value in values:
+        if model is None:
+            model = clone(estimator).set_params(**params, **{param: value}).fit(X_train, y_train)
+        else:
+            model = grow_model(model, param, value, X_train, y_train)
+        yield model, model.score(X_test, y[test_idx])
+
+
+def exhaustive_search(param_grid, n_train):
+    """
+    Evaluates every parameter combination on the full training folds (same as GridSearchCV).
+    Yields one round of (params, n_samples) candidates and receives their mean scores.
+
+    """
+    candidates = list(ParameterGrid(param_grid))
+    scores = yield [(params, None) for params in candidates]
+    return candidates[int(np.argmax(scores))]
+
+
+def halving_search(param_grid, n_train, resource='n_samples', factor=3, min_resources=None):
+    """
+    Successive halving: every candidate starts with a small budget of samples (or estimators),
+    and only the best 1/factor of the candidates move on to the next round with factor times more.
+    The last round always uses the full budget.
+
+    """
+    grid = dict(param_grid)
+
+    # Work out the budget range for the resource
+    if resource == 'n_samples':
+        max_resources = n_train
+        min_resources = min_resources or max(20, n_train // factor ** 2)
+    else:
+        values = grid.pop(resource, None)
+        if not values:
+            raise ValueError(f"Resource '{resource}' must be a parameter in the grid.")
+        max_resources = max(values)
+        min_resources = min_resources or min(values)
+
+    candidates = list(ParameterGrid(grid))
+
+    # Number of rounds is limited both by the budget range and by the number of candidates
+    possible_rounds = 1 + int(math.floor(math.log(max_resources / min_resources, factor)))
+    required_rounds = 1 + int(math.floor(math.log(len(candidates), factor)))
+    n_rounds = max(1, min(possible_rounds, required_rounds))
+
+    for round_index in range(n_rounds):
+        n_resources = max(1, int(max_resources // factor ** (n_rounds - 1 - round_index)))
+        logger.info(f"Halving round {round_index + 1}/{n_rounds}: {len(candidates)} candidates with {resource}={n_resources}.")
+
+        if resource == 'n_samples':
+            scores = yield [(params, n_resources) for params in candidates]
+        else:
+            scores = yield [({**params, resource: n_resources}, None) for params in candidates]
+
+        # Keep the best candidates for the next round (ties keep their grid order)
+        if round_index < n_rounds - 1:
+            n_keep = max(1, math.ceil(len(candidates) / factor))
+            ranking = np.argsort(-np.asarray(scores), kind='stable')[:n_keep]
+            candidates = [candidates[i] for i in ranking]
+
+    best_params = candidates[int(np.argmax(scores))]
+    if resource != 'n_samples':
+        best_params = {**best_params, resource: max_resources}
+    return best_params
+
+
+# Available search strategies, chosen per model in config.SearchStrategies
+Search_Strategies = {
+    'exhaustive': exhaustive_search,
+    'halving': halving_search,
+}
+
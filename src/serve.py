@@ -0,0 +1,21 @@
+import argparse
+from config import Model_Artifact_Path, Serving_Host, Serving_Port, Serving_Max_Batch_Size, Serving_Max_Wait_ms
+from inference import load_model
+from server import serve
+
+def main():
+    # Read the command line arguments
+    parser = argparse.ArgumentParser(description="Serve the exported stroke prediction model over HTTP.")
+    parser.add_argument('--artifact', default=Model_Artifact_Path, help="Model artifact saved by the training pipeline")
+    parser.add_argument('--host', default=Serving_Host)
+    parser.add_argument('--port', type=int, default=Serving_Port)
+    parser.add_argument('--max-batch-size', type=int, default=Serving_Max_Batch_Size, help="Most records scored in one batch")
+    parser.add_argument('--max-wait-ms', type=float, default=Serving_Max_Wait_ms, help="Longest wait for a batch to fill")
+    args = parser.parse_args()
+
+    # Load the fitted preprocessing chain and model, then serve until interrupted
+    artifact = load_model(args.artifact)
+    serve(artifact, args.host, args.port, args.max_batch_size, args.max_wait_ms)
+
+if __name__ == '__main__':
+    main()
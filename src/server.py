@@ -0,0 +1,296 @@
+import json
+import math
+import time
+import asyncio
+from collections import deque
+import numpy as np
+import pandas as pd
+from logger import logger
+from inference import predict_batch
+
+# Upper bounds (in milliseconds) of the request latency histogram reported by /metrics
+Latency_Buckets_ms = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+Reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class ServerMetrics:
+    """
+    Counters of a ScoringServer: requests, records and batches, the latency histogram of the requests
+    (from the parsed request to its response) and the batch size histogram.
+    """
+
+    def __init__(self, n_recent=10000):
+        self.start_time = time.perf_counter()
+        self.n_requests = 0
+        self.n_records = 0
+        self.n_batches = 0
+        self.n_errors = 0
+        self.max_queue_depth = 0
+        self.latency_counts = [0] * (len(Latency_Buckets_ms) + 1)
+        self.batch_sizes = {}
+        self.recent_latencies = deque(maxlen=n_recent)
+
+    def record_request(self, latency):
+        self.n_requests += 1
+        self.latency_counts[int(np.searchsorted(Latency_Buckets_ms, latency * 1000))] += 1
+        self.recent_latencies.append(latency)
+
+    def record_batch(self, n_records):
+        self.n_batches += 1
+        self.n_records += n_records
+        self.batch_sizes[n_records] = self.batch_sizes.get(n_records, 0) + 1
+
+    def snapshot(self, queue_depth):
+        """
+        Returns the metrics as a dictionary, with the throughput since the start and the p50/p99 latencies
+        of the last requests.
+
+        """
+        uptime = time.perf_counter() - self.start_time
+        latencies = np.asarray(self.recent_latencies) * 1000
+        buckets = [f"le_{bound}ms" for bound in Latency_Buckets_ms] + ['le_inf']
+        return {
+            'uptime_s': round(uptime, 3),
+            'requests': self.n_requests,
+            'records': self.n_records,
+            'batches': self.n_batches,
+            'errors': self.n_errors,
+            'requests_per_s': round(self.n_requests / uptime, 2) if uptime > 0 else 0.0,
+            'records_per_s': round(self.n_records / uptime, 2) if uptime > 0 else 0.0,
+            'mean_batch_size': round(self.n_records / self.n_batches, 2) if self.n_batches else 0.0,
+            'queue_depth': queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'latency_p50_ms': round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+            'latency_p99_ms': round(float(np.percentile(latencies, 99)), 3) if len(latencies) else None,
+            'latency_histogram': dict(zip(buckets, self.latency_counts)),
+            'batch_size_histogram': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+        }
+
+
+class ScoringServer:
+    """
+    Asyncio HTTP server that scores patient records with an exported model artifact (see inference.export_model).
+    POST /predict takes one JSON record (or a list of them) with the feature columns of the raw data (a missing
+    BMI is null) and returns the stroke prediction and probability of each. Concurrent requests are gathered into
+    micro-batches of up to max_batch_size records, waiting at most max_wait_ms after the first one, and every batch
+    is scored with one vectorized predict_batch call in a worker thread, so the event loop keeps accepting requests.
+    The values of every request are checked before it is queued (a bad one is answered with 400), and the requests
+    of a batch that still fails are scored one by one, so only the failing request gets an error.
+    GET /metrics returns the ServerMetrics and GET /health reports that the server is up.
+    """
+
+    def __init__(self, artifact, max_batch_size=64, max_wait_ms=5.0):
+        self.artifact = artifact
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = ServerMetrics()
+        self.queue_depth = 0
+        self.required_columns = list(artifact['feature_columns'])
+        # Encoded columns take the category names, the others numbers (null only where the BMI imputer fills it in)
+        self.categorical_columns = set(artifact['encoding_dict'])
+        self.nullable_columns = {artifact['bmi_imputer'].bmi_col}
+        self.server = None
+        self.port = None
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """
+        Starts listening (port 0 picks a free port, see self.port) and the batching loop.
+
+        """
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self._batch_loop())
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info(f"Scoring server listening on http://{host}:{self.port} (micro-batches of up to "
+                    f"{self.max_batch_size} records within {self.max_wait * 1000:g} ms).")
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher.cancel()
+
+    async def score(self, records):
+        """
+        Queues the records for the next micro-batch and returns their predictions.
+
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue_depth += len(records)
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, self.queue_depth)
+        await self.queue.put((records, future))
+        return await future
+
+    async def _batch_loop(self):
+        # Take the first waiting request, then add requests until the batch is full or the wait is over
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            n_records = len(items[0][0])
+            deadline = loop.time() + self.max_wait
+            while n_records < self.max_batch_size:
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                n_records += len(item[0])
+            self.queue_depth -= n_records
+
+            # Score the whole batch with one vectorized call, then hand every request its rows
+            try:
+                rows = await self._predict([record for records, _ in items for record in records])
+            except Exception as e:
+                logger.error(f"Error scoring a batch of {n_records} records: {e}")
+                if len(items) > 1:
+                    await self._score_separately(items)
+                elif not items[0][1].done():
+                    items[0][1].set_exception(e)
+                continue
+            self.metrics.record_batch(n_records)
+
+            start = 0
+            for records, future in items:
+                if not future.done():
+                    future.set_result(rows[start:start + len(records)])
+                start += len(records)
+
+    async def _predict(self, records):
+        # Scores the records in a worker thread and returns one JSON-ready row per record
+        df = pd.DataFrame(records)
+        predictions = await asyncio.get_running_loop().run_in_executor(None, predict_batch, df, self.artifact)
+        return predictions.astype(object).where(predictions.notna(), None).to_dict('records')
+
+    async def _score_separately(self, items):
+        # Scores the requests of a failed batch one by one, so the others are not failed with the bad one
+        for records, future in items:
+            try:
+                rows = await self._predict(records)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            self.metrics.record_batch(len(records))
+            if not future.done():
+                future.set_result(rows)
+
+    def _coerce(self, record):
+        # Returns a copy of the record with the numbers of its numeric columns as floats,
+        # raises a ValueError naming the first value that cannot be scored
+        coerced = dict(record)
+        for column in self.required_columns:
+            value = record[column]
+            if column in self.categorical_columns:
+                if not isinstance(value, str):
+                    raise ValueError(f"{column} has to be a string, got {value!r}.")
+            elif value is None:
+                if column not in self.nullable_columns:
+                    raise ValueError(f"{column} cannot be null.")
+                coerced[column] = math.nan
+            else:
+                try:
+                    number = float(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{column} has to be a number, got {value!r}.") from None
+                if not math.isfinite(number):
+                    raise ValueError(f"{column} has to be a finite number, got {value!r}.")
+                coerced[column] = number
+        return coerced
+
+    async def _handle_connection(self, reader, writer):
+        # Serve the requests of a keep-alive connection one after the other
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                start_time = time.perf_counter()
+                status, payload = await self._respond(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if path == '/predict':
+                    self.metrics.record_request(time.perf_counter() - start_time)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/metrics':
+            return 200, self.metrics.snapshot(self.queue_depth)
+        if path != '/predict':
+            return 404, {'error': f"Unknown path {path}."}
+        if method != 'POST':
+            return 405, {'error': "Send the records with POST."}
+
+        # Check the records before queueing them, so one bad request does not fail the others of its batch
+        try:
+            records = json.loads(body)
+        except ValueError:
+            self.metrics.n_errors += 1
+            return 400, {'error': "The body is not valid JSON."}
+        records = records if isinstance(records, list) else [records]
+        missing = sorted({column for record in records for column in self.required_columns
+                          if not isinstance(record, dict) or column not in record})
+        if not records or missing:
+            self.metrics.n_errors += 1
+            return 400, {'error': f"Every record needs the columns {self.required_columns}, missing: {missing}."}
+        try:
+            records = [self._coerce(record) for record in records]
+        except ValueError as e:
+            self.metrics.n_errors += 1
+            return 400, {'error': str(e)}
+
+        try:
+            predictions = await self.score(records)
+        except Exception as e:
+            self.metrics.n_errors += 1
+            return 500, {'error': str(e)}
+        return 200, {'predictions': predictions}
+
+
+async def _read_request(reader):
+    # Reads one HTTP/1.1 request, returns None when the client closed the connection
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return method, path.split('?', 1)[0], headers, body
+
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {Reasons[status]}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+def serve(artifact, host='127.0.0.1', port=8080, max_batch_size=64, max_wait_ms=5.0):
+    """
+    Runs a ScoringServer until it is interrupted.
+
+    """
+    async def run():
+        server = ScoringServer(artifact, max_batch_size, max_wait_ms)
+        await server.start(host, port)
+        async with server.server:
+            await server.server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        logger.info("Scoring server stopped.")
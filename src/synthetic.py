@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from config import Encoding_Dictionary
+
+# Category frequencies of the original healthcare-dataset-stroke-data.csv
+# (the categories of the encoded columns are taken from Encoding_Dictionary, missing ones get a frequency of 0)
+Category_Frequencies = {
+    'gender': {'Female': 0.5859, 'Male': 0.4139, 'Other': 0.0002},
+    'hypertension': {0: 0.9025, 1: 0.0975},
+    'heart_disease': {0: 0.946, 1: 0.054},
+    'ever_married': {'Yes': 0.6562, 'No': 0.3438},
+    'work_type': {'Private': 0.5724, 'Self-employed': 0.1603, 'children': 0.1344, 'Govt_job': 0.1286, 'Never_worked': 0.0043},
+    'Residence_type': {'Urban': 0.508, 'Rural': 0.492},
+    'smoking_status': {'never smoked': 0.3703, 'Unknown': 0.3022, 'formerly smoked': 0.1732, 'smokes': 0.1544},
+    'stroke': {0: 0.9513, 1: 0.0487},
+}
+
+# Log-odds of a stroke per unit of the risk factors, so the synthetic labels can be learned like the real ones
+Stroke_Risk_Coefficients = {'age': 0.075, 'hypertension': 0.5, 'heart_disease': 0.4, 'avg_glucose_level': 0.005}
+
+
+def _stroke_labels(df, rng):
+    """
+    Draws the stroke labels from a logistic risk model of the age, hypertension, heart disease and glucose level,
+    with the intercept chosen (by bisection) so the stroke rate matches Category_Frequencies.
+
+    """
+    score = sum(coefficient * df[column].to_numpy(dtype=float) for column, coefficient in Stroke_Risk_Coefficients.items())
+    low, high = -50.0, 50.0
+    for _ in range(60):
+        intercept = (low + high) / 2
+        rate = np.mean(1 / (1 + np.exp(-(score + intercept))))
+        low, high = (intercept, high) if rate < Category_Frequencies['stroke'][1] else (low, intercept)
+    return (rng.random(len(df)) < 1 / (1 + np.exp(-(score + intercept)))).astype(int)
+
+
+def _draw_categories(column, n_rows, rng):
+    """
+    Draws a categorical column with the frequencies of Category_Frequencies, over the categories of
+    Encoding_Dictionary for the encoded columns, so the synthetic data always matches the encoding.
+
+    """
+    frequencies = Category_Frequencies[column]
+    categories = list(Encoding_Dictionary.get(column, frequencies))
+    probabilities = np.array([frequencies.get(category, 0.0) for category in categories])
+    values = np.array(categories, dtype=object if isinstance(categories[0], str) else int)
+    return rng.choice(values, size=n_rows, p=probabilities / probabilities.sum())
+
+
+def generate_stroke_data(n_rows, random_state=42, start_id=1):
+    """
+    Generates a synthetic dataset with the same columns and similar distributions as the stroke dataset,
+    for benchmarking the pipeline at larger sizes: the same categories, BMI missing rate (3.93%) and stroke rate (4.87%).
+    Strokes are more likely with the same risk factors as in the real data. Ids start at start_id.
+
+    """
+    rng = np.random.default_rng(random_state)
+    df = pd.DataFrame({'id': np.arange(start_id, start_id + n_rows)})
+
+    for column in Category_Frequencies:
+        if column != 'stroke':
+            df[column] = _draw_categories(column, n_rows, rng)
+
+    df['age'] = np.round(rng.uniform(0.08, 82, n_rows), 2)
+    df['avg_glucose_level'] = np.round(np.clip(np.exp(rng.normal(4.59, 0.36, n_rows)), 55, 272), 2)
+    bmi = np.round(np.clip(rng.normal(28.9, 7.85, n_rows), 10.3, 97.6), 1)
+    bmi[rng.random(n_rows) < 0.0393] = np.nan
+    df['bmi'] = bmi
+    df['stroke'] = _stroke_labels(df, rng)
+
+    columns = ['id', 'gender', 'age', 'hypertension', 'heart_disease', 'ever_married', 'work_type',
+               'Residence_type', 'avg_glucose_level', 'bmi', 'smoking_status', 'stroke']
+    return df[columns]
+
+
+def write_stroke_csv(filepath, n_rows, chunksize=100000, random_state=42):
+    """
+    Writes n_rows synthetic records to a CSV file like healthcare-dataset-stroke-data.csv, generated in chunks
+    so files larger than memory can be written. Returns the file path.
+
+    """
+    for start in range(0, n_rows, chunksize):
+        chunk = generate_stroke_data(min(chunksize, n_rows - start), random_state + start // chunksize, start_id=start + 1)
+        chunk.to_csv(filepath, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    return filepath
@@ -0,0 +1,24 @@
+import argparse
+import pandas as pd
+from config import Model_Artifact_Path, Incremental_Growth
+from inference import load_model, save_model, update_model
+
+def main():
+    # Read the command line arguments
+    parser = argparse.ArgumentParser(description="Update the exported stroke prediction model with new labelled patient records.")
+    parser.add_argument('input', help="CSV or JSONL file of new patient records, with their stroke column")
+    parser.add_argument('--artifact', default=Model_Artifact_Path, help="Model artifact saved by the training pipeline")
+    parser.add_argument('--output', help="Where to save the updated artifact (defaults to overwriting --artifact)")
+    args = parser.parse_args()
+
+    # Load the new records and the fitted preprocessing chain and model
+    df = pd.read_json(args.input, lines=True) if args.input.endswith(('.jsonl', '.json')) else pd.read_csv(args.input)
+    artifact = load_model(args.artifact)
+
+    # Grow the model on the new records and save it
+    artifact = update_model(df, artifact, Incremental_Growth)
+    if artifact is not None:
+        save_model(args.output or args.artifact, artifact)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+import os
+import time
+import uuid
+import pickle
+import socket
+import threading
+import joblib
+from executor import SharedData
+from logger import logger
+
+
+def _write_atomic(path, obj):
+    # Write to a temporary name and rename, so readers never see a partial file
+    temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temporary, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _make_directories(directory):
+    for name in ('tasks', 'running', 'results', 'workers', 'shared'):
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+
+class WorkQueueExecutor:
+    """
+    Coordinator of a work queue in a shared directory (e.g. on NFS), for spreading a search over several machines.
+    Tasks are written to tasks/, a worker (see run_worker) claims one by renaming it into its own running/ directory,
+    which only one worker can do, and writes its outcome to results/. Workers can join and leave at any time:
+    every worker keeps touching its heartbeat file in workers/, and the tasks held by a worker whose heartbeat is
+    older than heartbeat_timeout seconds are moved back to tasks/ for the others.
+    shared is written once and loaded (memory-mapped) once per worker, tasks refer to its entries with SharedData.
+    Runs the same (group, function, args, max_time) tasks as BudgetedExecutor; the functions must be importable
+    by the workers, and the time limits are not enforced (a remote fit cannot be cancelled).
+    run raises a RuntimeError when its tasks wait pickup_timeout seconds without any live worker (None: it waits).
+    """
+
+    def __init__(self, directory, shared=None, heartbeat_timeout=30.0, poll_interval=0.05, pickup_timeout=300.0):
+        self.directory = directory
+        self.heartbeat_timeout = heartbeat_timeout
+        self.pickup_timeout = pickup_timeout
+        self.poll_interval = poll_interval
+        self.run_id = uuid.uuid4().hex[:12]
+        self.n_batches = 0
+        self.n_requeued = 0
+        self.used_time = {}
+        self.exhausted = set()
+        _make_directories(directory)
+        self.shared_path = os.path.join(directory, 'shared', f"{self.run_id}.joblib")
+        joblib.dump(shared or {}, self.shared_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def live_workers(self):
+        """
+        Returns the ids of the workers whose heartbeat is recent.
+
+        """
+        now = time.time()
+        workers = []
+        for name in os.listdir(self._path('workers')):
+            try:
+                if now - os.path.getmtime(self._path('workers', name)) <= self.heartbeat_timeout:
+                    workers.append(name)
+            except FileNotFoundError:
+                pass
+        return workers
+
+    def _requeue_dead_workers(self):
+        # Move the tasks of workers without a recent heartbeat back to the queue
+        live = set(self.live_workers())
+        for worker_id in os.listdir(self._path('running')):
+            if worker_id in live:
+                continue
+            for name in os.listdir(self._path('running', worker_id)):
+                try:
+                    os.replace(self._path('running', worker_id, name), self._path('tasks', name))
+                except FileNotFoundError:
+                    continue
+                self.n_requeued += 1
+                logger.warning(f"Worker {worker_id} stopped sending heartbeats, re-queued its task {name}.")
+            try:
+                os.rmdir(self._path('running', worker_id))
+            except OSError:
+                pass
+
+    def run(self, tasks, budgets=None):
+        """
+        Queues the tasks and waits for their outcomes, returned in the task order as ('done', result, elapsed).
+        Exceptions of tasks are raised, and a RuntimeError when no worker was live for pickup_timeout seconds.
+        budgets are accepted like in BudgetedExecutor.run but not enforced.
+
+        """
+        self.n_batches += 1
+        prefix = f"{self.run_id}-{self.n_batches:06d}"
+
+        # Queue the tasks in order, the workers claim them by name order
+        names = {}
+        for index, (_, function, args, _) in enumerate(tasks):
+            name = f"{prefix}-{index:08d}.task"
+            _write_atomic(self._path('tasks', name), (os.path.basename(self.shared_path), function, args))
+            names[name] = index
+
+        outcomes = [None] * len(tasks)
+        pending = set(names)
+        attended_since = warned_since = time.perf_counter()
+        while pending:
+            # Collect the outcomes written by the workers
+            for result_name in os.listdir(self._path('results')):
+                name = result_name[:-len('.result')]
+                if not result_name.endswith('.result') or name not in pending:
+                    continue
+                success, result, elapsed = _read(self._path('results', result_name))
+                os.remove(self._path('results', result_name))
+                pending.discard(name)
+                if not success:
+                    raise result
+                index = names[name]
+                outcomes[index] = ('done', result, elapsed)
+                self.used_time[tasks[index][0]] = self.used_time.get(tasks[index][0], 0.0) + elapsed
+
+            # Give up when the tasks have had no live worker for pickup_timeout seconds
+            self._requeue_dead_workers()
+            now = time.perf_counter()
+            if not pending or self.live_workers():
+                attended_since = warned_since = now
+            elif self.pickup_timeout is not None and now - attended_since > self.pickup_timeout:
+                raise RuntimeError(f"No worker on {self.directory} picked up the {len(pending)} waiting tasks "
+                                   f"within {self.pickup_timeout:g} seconds.")
+            elif now - warned_since > self.heartbeat_timeout:
+                logger.warning(f"No live workers on {self.directory}, {len(pending)} tasks are waiting.")
+                warned_since = now
+            time.sleep(self.poll_interval)
+
+        return outcomes
+
+    def close(self):
+        """
+        Removes the queued tasks, the late results and the shared data of this coordinator.
+
+        """
+        for folder in ('tasks', 'results'):
+            for name in os.listdir(self._path(folder)):
+                if name.startswith(self.run_id):
+                    try:
+                        os.remove(self._path(folder, name))
+                    except FileNotFoundError:
+                        pass
+        if os.path.exists(self.shared_path):
+            os.remove(self.shared_path)
+
+
+def _heartbeat(path, interval, stop):
+    # Touch the heartbeat file until the worker stops, also while a long task is running
+    while not stop.wait(interval):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            open(path, 'w').close()
+
+
+def run_worker(directory, heartbeat_interval=5.0, idle_timeout=None):
+    """
+    Worker loop of a WorkQueueExecutor: claims the queued tasks in name order, runs them and writes their outcomes.
+    Tasks whose coordinator is gone (its shared data was removed) are dropped. Stops after idle_timeout seconds without tasks (None: never), or on KeyboardInterrupt / SystemExit, in which
+    case its running task is put back in the queue. Returns the number of tasks it ran.
+
+    """
+    _make_directories(directory)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    heartbeat_path = os.path.join(directory, 'workers', worker_id)
+    running_directory = os.path.join(directory, 'running', worker_id)
+    open(heartbeat_path, 'w').close()
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(heartbeat_path, heartbeat_interval, stop), daemon=True).start()
+    logger.info(f"Worker {worker_id} started on {directory}.")
+
+    shared, n_tasks, idle_since, claimed = {}, 0, time.perf_counter(), None
+    try:
+        while idle_timeout is None or time.perf_counter() - idle_since < idle_timeout:
+            # Claim the first queued task another worker has not taken yet (the coordinator removes the running
+            # directory of a worker it took for dead)
+            os.makedirs(running_directory, exist_ok=True)
+            for name in sorted(os.listdir(os.path.join(directory, 'tasks'))):
+                if not name.endswith('.task'):
+                    continue
+                try:
+                    os.replace(os.path.join(directory, 'tasks', name), os.path.join(running_directory, name))
+                except FileNotFoundError:
+                    continue
+                claimed = name
+                break
+            if claimed is None:
+                time.sleep(0.05)
+                continue
+
+            # Load the task and the shared data of its coordinator (once per coordinator); a task whose coordinator
+            # is gone (close removed its shared data) or that was re-queued in the meantime is dropped
+            start = time.perf_counter()
+            try:
+                shared_name, function, args = _read(os.path.join(running_directory, claimed))
+                if shared_name not in shared:
+                    shared = {shared_name: joblib.load(os.path.join(directory, 'shared', shared_name), mmap_mode='r')}
+            except FileNotFoundError:
+                logger.warning(f"Dropped task {claimed}, its coordinator is gone.")
+                if os.path.exists(os.path.join(running_directory, claimed)):
+                    os.remove(os.path.join(running_directory, claimed))
+                claimed = None
+                continue
+            except Exception as e:
+                outcome = (False, e, 0.0)
+            else:
+                args = [shared[shared_name][arg.key] if isinstance(arg, SharedData) else arg for arg in args]
+                try:
+                    outcome = (True, function(*args), time.perf_counter() - start)
+                except Exception as e:
+                    outcome = (False, e, time.perf_counter() - start)
+            _write_atomic(os.path.join(directory, 'results', f"{claimed}.result"), outcome)
+            if os.path.exists(os.path.join(running_directory, claimed)):
+                os.remove(os.path.join(running_directory, claimed))
+            claimed, n_tasks, idle_since = None, n_tasks + 1, time.perf_counter()
+    finally:
+        # Leave the queue: put the unfinished task back for the other workers, unless its coordinator is gone
+        # (the shared data of a coordinator is named by the run id that starts its task names)
+        stop.set()
+        if claimed is not None and os.path.exists(os.path.join(running_directory, claimed)):
+            if os.path.exists(os.path.join(directory, 'shared', f"{claimed.split('-', 1)[0]}.joblib")):
+                os.replace(os.path.join(running_directory, claimed), os.path.join(directory, 'tasks', claimed))
+            else:
+                os.remove(os.path.join(running_directory, claimed))
+        if os.path.isdir(running_directory):
+            os.rmdir(running_directory)
+        if os.path.exists(heartbeat_path):
+            os.remove(heartbeat_path)
+        logger.info(f"Worker {worker_id} stopped after {n_tasks} tasks.")
+    return n_tasks
@@ -0,0 +1,19 @@
+import sys
+import signal
+import argparse
+from work_queue import run_worker
+
+def main():
+    # Read the command line arguments
+    parser = argparse.ArgumentParser(description="Run grid-search fits from a shared work-queue directory.")
+    parser.add_argument('directory', help="Work-queue directory shared with the training pipeline (config.Work_Queue_Directory)")
+    parser.add_argument('--heartbeat', type=float, default=5.0, help="Seconds between two heartbeats of the worker")
+    parser.add_argument('--idle-timeout', type=float, default=None, help="Stop after this many seconds without tasks")
+    args = parser.parse_args()
+
+    # Leave the queue cleanly when the worker is stopped, so its running task is re-queued at once
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    run_worker(args.directory, args.heartbeat, args.idle_timeout)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import pytest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from sklearn.datasets import make_classification
+from sklearn.tree import DecisionTreeClassifier
+from cache import EstimatorCache
+from scheduler import run_search
+
+@pytest.fixture
+
+def sample_data():
+    """ Creates a small classification problem for testing """
+    return make_classification(n_samples=200, n_features=6, random_state=42)
+
+def test_cache_only_fits_new_combinations(sample_data, tmp_path):
+    """ Tests that a re-run with one extra grid value only fits the new combination """
+    X, y = sample_data
+    cache = EstimatorCache(str(tmp_path))
+    estimator = DecisionTreeClassifier(random_state=42)
+
+    _, first_params, first_fits = run_search(estimator, {'max_depth': [2, 4]}, X, y, n_jobs=1, cache=cache)
+    _, second_params, second_fits = run_search(estimator, {'max_depth': [2, 4, 8]}, X, y, n_jobs=1, cache=cache)
+
+    assert first_fits == 2 * 5 + 1, "The first run should fit everything"
+    assert second_fits <= 5 + 1, "The second run should only fit the new grid value (and a new refit)"
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """ Tests that the cache stays under its size cap by evicting the oldest entries """
+    cache = EstimatorCache(str(tmp_path), max_size_mb=0)
+    cache.put('old', DecisionTreeClassifier(), 0.5)
+    cache.evict()
+
+    assert cache.get('old') is None, "Entries over the size cap should be evicted"
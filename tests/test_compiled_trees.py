@@ -0,0 +1,55 @@
+import pytest
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from sklearn.datasets import make_classification
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.svm import SVC
+from compiled_trees import compile_trees, class_fractions
+
+@pytest.fixture
+
+def sample_data():
+    """ Creates a classification problem with a few missing values """
+    X, y = make_classification(n_samples=600, n_features=8, random_state=42)
+    X[::13, 2] = np.nan
+    return X, y
+
+@pytest.mark.parametrize('model', [DecisionTreeClassifier(random_state=42),
+                                   RandomForestClassifier(n_estimators=20, random_state=42),
+                                   GradientBoostingClassifier(n_estimators=30, random_state=42)])
+def test_compiled_trees_match_sklearn(sample_data, model):
+    """ Tests that the compiled trees predict exactly the same classes and probabilities as the model """
+    X, y = sample_data
+    if isinstance(model, GradientBoostingClassifier):
+        X = np.nan_to_num(X)
+    model.fit(X, y)
+    compiled = compile_trees(model)
+
+    for batch in (X[:1], X[:64], X):
+        assert np.array_equal(compiled.predict(batch), model.predict(batch)), "Predictions should be identical"
+        assert np.array_equal(compiled.predict_proba(batch), model.predict_proba(batch)), "Probabilities should be identical"
+
+def test_compile_rejects_other_models(sample_data):
+    """ Tests that models without trees cannot be compiled """
+    X, y = sample_data
+    with pytest.raises(ValueError):
+        compile_trees(SVC().fit(np.nan_to_num(X), y))
+
+def test_boosting_rejects_missing_values(sample_data):
+    """ Tests that compiled gradient boosting rejects missing values like scikit-learn instead of scoring them """
+    X, y = sample_data
+    model = GradientBoostingClassifier(n_estimators=5, random_state=42).fit(np.nan_to_num(X), y)
+    with pytest.raises(ValueError):
+        model.predict_proba(X)
+    with pytest.raises(ValueError, match='NaN'):
+        compile_trees(model).predict_proba(X)
+
+def test_class_counts_are_normalized():
+    """ Tests that leaf class counts (scikit-learn before 1.4) become fractions and that fractions are kept as they are """
+    counts = np.array([[3.0, 1.0], [0.0, 2.5], [0.0, 0.0]])
+    fractions = np.array([[0.1, 0.9], [1.0, 0.0]])
+    assert np.array_equal(class_fractions(counts), [[0.75, 0.25], [0.0, 1.0], [0.0, 0.0]]), "Counts should be divided by their sum"
+    assert class_fractions(fractions) is fractions, "Fractions should not be divided again"
@@ -0,0 +1,38 @@
+import pytest
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from sklearn.datasets import make_classification
+from estimators import CategoricalHistGradientBoosting, NystroemSVM
+from search import grow_model
+
+@pytest.fixture
+
+def sample_data():
+    """ Creates a classification problem with a scaled categorical column """
+    X, y = make_classification(n_samples=600, n_features=6, random_state=42)
+    X[:, 0] = (np.digitize(X[:, 0], [-1, 0, 1]) - 1.5) / 1.1
+    return X, y
+
+def test_hist_gradient_boosting_categories(sample_data):
+    """ Tests that low-cardinality columns become native categories and warm starting adds iterations """
+    X, y = sample_data
+    model = CategoricalHistGradientBoosting(max_iter=20, random_state=42).fit(X, y)
+
+    assert list(model.categories_) == [0], "Only the categorical column should be detected"
+    assert model.model_.is_categorical_.tolist() == [True] + [False] * 5, "The column should be split natively"
+
+    X_unknown = X.copy()
+    X_unknown[:, 0] = 9.0
+    assert len(model.predict(X_unknown)) == len(X), "Unknown categories should be scored as missing values"
+
+    grow_model(model, 'max_iter', 40, X, y)
+    assert model.n_iter_ == 40 and model.max_iter == 40, "Warm starting should add the missing iterations"
+
+def test_nystroem_svm(sample_data):
+    """ Tests that the kernel approximation learns the problem """
+    X, y = sample_data
+    model = NystroemSVM(n_components=100, random_state=42).fit(X[:400], y[:400])
+
+    assert model.score(X[400:], y[400:]) > 0.8, "The approximate kernel SVM should classify the held-out rows"
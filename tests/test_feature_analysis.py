@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from sklearn.datasets import make_classification
+from FeatureAnalysis.feature_analysis import pca_analysis, pca_transform
+from FeatureAnalysis.balancing import undersample_indices, UndersampledEnsemble
+from FeatureAnalysis.moments import MomentAccumulator
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+@pytest.fixture
+
+def sample_data():
+    """ Creates a standardized float32 feature matrix for testing """
+    X, _ = make_classification(n_samples=1000, n_features=10, n_informative=10, n_redundant=0, random_state=42)
+    X = (X - X.mean(axis=0)) / X.std(axis=0)
+    return X[:700].astype('float32'), X[700:].astype('float32')
+
+def test_incremental_pca_matches_pca(sample_data):
+    """ Tests that the chunked PCA gives the same scree, loadings and projections as the full PCA """
+    X_train, X_test = sample_data
+    X_pca, pca = pca_analysis(X_train)
+    X_pca_incremental, pca_incremental = pca_analysis(X_train, batch_size=128)
+
+    assert np.allclose(pca.explained_variance_ratio_, pca_incremental.explained_variance_ratio_, atol=1e-5), "Scree values should match"
+    assert np.allclose(pca.components_, pca_incremental.components_, atol=1e-4), "Loadings should match"
+    assert np.allclose(X_pca, X_pca_incremental, atol=1e-3), "Training projections should match"
+    assert X_pca_incremental.dtype == X_train.dtype, "Projections should keep the type of the features"
+
+    X_test_pca = pca_transform(pca_incremental, X_test, batch_size=128)
+    assert np.allclose(pca.transform(X_test), X_test_pca, atol=1e-3), "Chunked test projections should match"
+
+def test_merged_moments_match_sklearn(sample_data):
+    """ Tests that merged chunk moments give the correlation, scaler and PCA of the whole matrix """
+    X = np.concatenate(sample_data) * 3 + 1
+    chunks = [MomentAccumulator.from_array(X[start:start + 300]) for start in range(0, len(X), 300)]
+    moments = chunks[0].merge(chunks[1]).merge(chunks[2].merge(chunks[3]))
+
+    scaler = moments.scaler()
+    expected_scaler = StandardScaler().fit(X)
+    pca = moments.pca()
+    expected_pca = PCA().fit(X)
+
+    assert moments.n_samples == len(X), "Every row should be counted once"
+    assert np.allclose(moments.correlation().to_numpy(), np.corrcoef(X, rowvar=False)), "Correlations should match"
+    assert np.allclose(scaler.mean_, expected_scaler.mean_) and np.allclose(scaler.scale_, expected_scaler.scale_), "Scaler parameters should match"
+    assert np.allclose(pca.explained_variance_, expected_pca.explained_variance_, rtol=1e-4), "Explained variances should match"
+    assert np.allclose(pca.transform(X), expected_pca.transform(X), atol=1e-3), "Projections should match"
+
+def test_undersampled_ensemble():
+    """ Tests that disjoint subsets share only the minority rows and that the ensemble averages its members """
+    X, y = make_classification(n_samples=1000, weights=[0.9], random_state=42)
+    subsets = undersample_indices(y, sampling='disjoint')
+    minority = np.flatnonzero(y == 1)
+
+    assert len(subsets) == (y == 0).sum() // len(minority), "All disjoint majority subsets should be used"
+    majority_rows = np.concatenate([np.setdiff1d(subset, minority) for subset in subsets])
+    assert len(np.unique(majority_rows)) == len(majority_rows), "Majority rows should not repeat across subsets"
+    assert all(np.isin(minority, subset).all() for subset in subsets), "Every subset should have all minority rows"
+
+    ensemble = UndersampledEnsemble(DecisionTreeClassifier(max_depth=3, random_state=42), n_subsets=4, n_jobs=1).fit(X, y)
+    expected = np.mean([member.predict_proba(X) for member in ensemble.estimators_], axis=0)
+    assert np.allclose(ensemble.predict_proba(X), expected), "Probabilities should be the members' average"
+    assert set(ensemble.predict(X)) <= {0, 1}, "Predictions should be class labels"
@@ -0,0 +1,48 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from feature_store import FeatureStore, frame_digest
+
+@pytest.fixture
+
+def sample_df():
+    """ Creates a small encoded DataFrame with compact column types """
+    return pd.DataFrame({
+        'age': np.array([67.0, 61.0, 80.0], dtype='float32'),
+        'hypertension': [False, True, False],
+        'work_type': np.array([0, 1, 2], dtype='int8'),
+    }, index=pd.Index([9046, 51676, 31112], name='id'))
+
+def test_frame_round_trip(sample_df, tmp_path):
+    """ Tests that a stored frame is loaded memory-mapped with the same content, types and objects """
+    store = FeatureStore(str(tmp_path / 'store'))
+    data_path = tmp_path / 'data.csv'
+    data_path.write_text('id,age\n1,67\n')
+    key = store.key(('file', str(data_path)), {'age': 'float32'})
+
+    assert store.load_frame(key, 'preprocessed') == (None, None), "An empty store should miss"
+    store.save_frame(key, 'preprocessed', sample_df, bmi_imputer='imputer')
+    df, objects = store.load_frame(key, 'preprocessed')
+
+    assert df.equals(sample_df), "The loaded frame should match the stored one"
+    assert isinstance(df['age'].values.base, np.memmap) or isinstance(df['age'].values, np.memmap), "Columns should be memory-mapped"
+    assert objects['bmi_imputer'] == 'imputer', "Stored objects should be loaded with the frame"
+    assert frame_digest(df) == frame_digest(sample_df), "Memory-mapped and in-memory frames should have the same digest"
+
+    data_path.write_text('id,age\n1,68\n')
+    assert store.key(('file', str(data_path)), {'age': 'float32'}) != key, "Changing the data file should change the key"
+
+def test_arrays_round_trip(tmp_path):
+    """ Tests that stored arrays are loaded as read-only memory maps """
+    store = FeatureStore(str(tmp_path / 'store'))
+    X = np.arange(12, dtype='float32').reshape(4, 3)
+    store.save_arrays('key', 'split', {'X_train': X, 'y_train': pd.Series([0, 1, 1, 0])}, scaler='scaler')
+    arrays, objects = store.load_arrays('key', 'split')
+
+    assert isinstance(arrays['X_train'], np.memmap), "Arrays should be memory-mapped"
+    assert not arrays['X_train'].flags.writeable, "Memory-mapped arrays should be read-only"
+    assert (arrays['X_train'] == X).all() and list(arrays['y_train']) == [0, 1, 1, 0], "Arrays should keep their values"
+    assert objects == {'scaler': 'scaler'}, "Stored objects should be loaded with the arrays"
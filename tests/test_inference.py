@@ -0,0 +1,114 @@
+import pytest
+import pandas as pd
+import sys
+import os
+import subprocess
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from Preprocessing.preprocessing import fill_missing_bmi, encode_columns
+from FeatureAnalysis.feature_analysis import split_data
+from config import Encoding_Dictionary
+import inference
+from inference import export_model, load_model, predict_file, update_model, predict_batch
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/healthcare-dataset-stroke-data.csv')
+
+@pytest.fixture
+
+def raw_df():
+    """ Loads the first rows of the stroke dataset """
+    return pd.read_csv(DATA_PATH, index_col='id', nrows=300)
+
+def test_export_and_predict_file(raw_df, tmp_path):
+    """ Tests that an exported artifact scores a CSV file in chunks like the training preprocessing """
+    df, bmi_imputer = fill_missing_bmi(raw_df, return_imputer=True)
+    df = encode_columns(df, Encoding_Dictionary)
+    X_train, X_test, y_train, y_test, scaler = split_data(df, 'stroke', return_scaler=True)
+    model = DecisionTreeClassifier(random_state=42).fit(X_train, y_train)
+
+    artifact_path = str(tmp_path / 'model.joblib')
+    export_model(artifact_path, model, 'Decision Tree', 'AllFeatures', df.columns.drop('stroke'),
+                 bmi_imputer, Encoding_Dictionary, scaler)
+
+    output_path = str(tmp_path / 'predictions.csv')
+    n_rows, _ = predict_file(DATA_PATH, output_path, load_model(artifact_path), chunksize=2000)
+    predictions = pd.read_csv(output_path)
+
+    assert n_rows == len(predictions), "Every input row should get an output row"
+    assert predictions['stroke_prediction'].notna().all(), "Every row should be scored"
+    assert list(predictions['id'][:300]) == list(raw_df.index), "Predictions should keep the input order"
+
+def test_rows_with_missing_values_are_skipped(raw_df, tmp_path):
+    """ Tests that rows with a missing or non-numeric feature are left unscored instead of failing the whole file """
+    df, bmi_imputer = fill_missing_bmi(raw_df, return_imputer=True)
+    df = encode_columns(df, Encoding_Dictionary)
+    X_train, _, y_train, _, scaler = split_data(df, 'stroke', return_scaler=True)
+    model = LogisticRegression().fit(X_train, y_train)
+    artifact = export_model(str(tmp_path / 'model.joblib'), model, 'Logistic Regression', 'AllFeatures', df.columns.drop('stroke'),
+                            bmi_imputer, Encoding_Dictionary, scaler)
+
+    records = pd.read_csv(DATA_PATH, nrows=20).astype({'avg_glucose_level': object, 'hypertension': object})
+    records.loc[2, 'age'] = None
+    records.loc[5, 'avg_glucose_level'] = 'abc'
+    records.loc[7, 'hypertension'] = None
+    records.loc[9, 'bmi'] = None
+    records.to_csv(tmp_path / 'records.csv', index=False)
+
+    n_rows, _ = predict_file(str(tmp_path / 'records.csv'), str(tmp_path / 'predictions.csv'), artifact, chunksize=8)
+    predictions = pd.read_csv(tmp_path / 'predictions.csv')
+
+    assert n_rows == 20, "Every row should get an output row"
+    assert list(predictions.index[predictions['stroke_prediction'].isna()]) == [2, 5, 7], \
+        "Only the rows with a missing or non-numeric feature should be unscored (a missing BMI is imputed)"
+
+@pytest.mark.parametrize('model', [RandomForestClassifier(n_estimators=10, random_state=42),
+                                   GradientBoostingClassifier(n_estimators=10, random_state=42)])
+def test_compiled_and_sklearn_paths_agree_on_invalid_rows(raw_df, tmp_path, monkeypatch, model):
+    """ Tests that small batches (compiled trees) and large batches (scikit-learn) score the same rows alike, bad rows included """
+    df, bmi_imputer = fill_missing_bmi(raw_df, return_imputer=True)
+    df = encode_columns(df, Encoding_Dictionary)
+    X_train, _, y_train, _, scaler = split_data(df, 'stroke', return_scaler=True)
+    artifact = export_model(str(tmp_path / 'model.joblib'), model.fit(X_train, y_train), type(model).__name__, 'AllFeatures',
+                            df.columns.drop('stroke'), bmi_imputer, Encoding_Dictionary, scaler)
+
+    records = pd.read_csv(DATA_PATH, nrows=20)
+    records.loc[3, 'age'] = None
+    records.loc[6, 'heart_disease'] = None
+    records.loc[8, 'gender'] = 'Unknown'
+    compiled = predict_batch(records, artifact)
+    monkeypatch.setattr(inference, 'Compiled_Trees_Max_Batch', 0)
+    expected = predict_batch(records, artifact)
+
+    assert artifact['compiled'] is not None, "The tree model should be compiled"
+    assert list(compiled.index[compiled['stroke_prediction'].isna()]) == [3, 6, 8], "The invalid rows should be unscored"
+    pd.testing.assert_frame_equal(compiled, expected, check_exact=True)
+
+def test_update_model_with_new_records(raw_df, tmp_path):
+    """ Tests that new records grow a forest without refitting it, and that other models are left alone """
+    df, bmi_imputer = fill_missing_bmi(raw_df, return_imputer=True)
+    df = encode_columns(df, Encoding_Dictionary)
+    X_train, _, y_train, _, scaler = split_data(df, 'stroke', return_scaler=True)
+
+    forest = RandomForestClassifier(n_estimators=10, random_state=42).fit(X_train, y_train)
+    first_trees = list(forest.estimators_)
+    artifact = export_model(str(tmp_path / 'model.joblib'), forest, 'Random Forest', 'AllFeatures', df.columns.drop('stroke'), bmi_imputer, Encoding_Dictionary, scaler)
+    new_records = pd.read_csv(DATA_PATH).sample(1000, random_state=42)
+
+    updated = update_model(new_records, artifact, {'n_estimators': 5})
+    assert updated['model'].n_estimators == 15 and updated['n_updates'] == 1, "The forest should get 5 more trees"
+    assert updated['model'].estimators_[:10] == first_trees, "The existing trees should be kept"
+    assert predict_batch(new_records, updated)['stroke_prediction'].notna().all(), "The updated model should score records"
+
+    artifact['model'] = DecisionTreeClassifier(random_state=42).fit(X_train, y_train)
+    assert update_model(new_records, artifact, {'n_estimators': 5}) is None, "A decision tree cannot grow incrementally"
+
+def test_scoring_entry_points_do_not_import_sklearn():
+    """ Tests that importing the scoring command line tools loads neither scikit-learn nor SciPy """
+    code = ("import sys; sys.path.insert(0, sys.argv[1]); import predict, serve; "
+            "print(sorted({name.split('.')[0] for name in sys.modules} & {'sklearn', 'scipy'}))")
+    result = subprocess.run([sys.executable, '-c', code, SRC_PATH], capture_output=True, text=True, cwd=os.path.dirname(SRC_PATH))
+    assert result.returncode == 0, f"Importing predict and serve should work: {result.stderr}"
+    assert result.stdout.strip() == '[]', f"predict and serve should not import {result.stdout.strip()} at start-up"
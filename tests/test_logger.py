@@ -0,0 +1,41 @@
+import pytest
+import logging
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import logger as logger_module
+from logger import logger, LazyMessage, stage_log_level
+
+@pytest.fixture
+
+def counter():
+    """ Creates a message function that counts its calls """
+    calls = []
+
+    def message():
+        calls.append(1)
+        return "statistics"
+    return message, calls
+
+def test_lazy_message_only_formats_enabled_records(counter, caplog, monkeypatch):
+    """ Tests that a lazy message is only computed for records that are emitted, and only once """
+    message, calls = counter
+    monkeypatch.setitem(logger_module.Stage_Log_Levels, 'quiet stage', 'WARNING')
+
+    with stage_log_level('quiet stage'):
+        logger.info("Statistics:\n%s", LazyMessage(message))
+    assert calls == [], "A filtered record should not compute its message"
+
+    with caplog.at_level(logging.INFO, logger='logger'):
+        logger.info("Statistics:\n%s", LazyMessage(message))
+    assert calls == [1], "An emitted record should compute its message once for all handlers"
+    assert "Statistics:\nstatistics" in caplog.text, "The message should be formatted into the record"
+
+def test_stage_log_level_is_restored(monkeypatch):
+    """ Tests that a stage level applies inside the stage and the previous level is restored after it """
+    monkeypatch.setitem(logger_module.Stage_Log_Levels, 'quiet stage', 'ERROR')
+    previous = logger.level
+
+    with stage_log_level('quiet stage'):
+        assert not logger.isEnabledFor(logging.WARNING), "Warnings should be filtered inside the stage"
+    assert logger.level == previous, "The level should be restored after the stage"
@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from sklearn.metrics import precision_score, recall_score, f1_score, accuracy_score
+import metrics
+from metrics import compute_metrics, bootstrap_metrics
+from models import calculate_metrics
+
+@pytest.fixture
+
+def predictions():
+    """ Creates labels and a batch of prediction vectors """
+    rng = np.random.default_rng(42)
+    y_true = rng.integers(0, 2, 200)
+    y_pred = rng.integers(0, 2, (16, 200))
+    return y_true, y_pred
+
+def test_batch_metrics_match_sklearn(predictions):
+    """ Tests that every row of a batch gets the same metrics as scikit-learn """
+    y_true, y_pred = predictions
+    metrics = compute_metrics(y_true, y_pred)
+
+    for row in range(len(y_pred)):
+        assert np.isclose(metrics['Precision'][row], precision_score(y_true, y_pred[row])), "Precision should match"
+        assert np.isclose(metrics['Recall'][row], recall_score(y_true, y_pred[row])), "Recall should match"
+        assert np.isclose(metrics['F-Score'][row], f1_score(y_true, y_pred[row])), "F-Score should match"
+        assert np.isclose(metrics['Accuracy'][row], accuracy_score(y_true, y_pred[row])), "Accuracy should match"
+        assert np.isclose(metrics['Miss rate'][row], 1 - metrics['Recall'][row]), "Miss rate should be 1 - recall"
+
+    assert calculate_metrics(y_true, y_pred[0]) == tuple(metrics[name][0] for name in metrics), \
+        "calculate_metrics should return the metrics of a single vector"
+
+def test_metrics_without_positive_predictions():
+    """ Tests that metrics with an empty denominator are 0 instead of NaN """
+    metrics = compute_metrics([0, 1, 0, 1], [0, 0, 0, 0])
+
+    assert metrics['Precision'] == 0.0 and metrics['F-Score'] == 0.0, "Precision and F-Score should be 0"
+    assert metrics['Accuracy'] == 0.5 and metrics['Miss rate'] == 1.0, "Other metrics should still be computed"
+
+def test_bootstrap_intervals(predictions, monkeypatch):
+    """ Tests that the vectorized bootstrap matches resampling in a loop and brackets the point estimate """
+    y_true, y_pred = predictions
+    intervals = bootstrap_metrics(y_true, y_pred[0], n_resamples=500, random_state=0)
+
+    rng = np.random.default_rng(0)
+    indices = rng.integers(0, len(y_true), size=(500, len(y_true)), dtype=np.int32)
+    f_scores = [f1_score(y_true[row], y_pred[0][row]) for row in indices]
+    point = compute_metrics(y_true, y_pred[0])
+
+    assert np.allclose(intervals['F-Score'], np.percentile(f_scores, [2.5, 97.5])), "Intervals should match a loop over resamples"
+
+    monkeypatch.setattr(metrics, 'Bootstrap_Chunk_Size', 7 * len(y_true))
+    assert bootstrap_metrics(y_true, y_pred[0], n_resamples=500, random_state=0) == intervals, "Chunks should draw the same resamples"
+    for name, (low, high) in intervals.items():
+        assert low <= point[name] <= high, f"The {name} interval should contain the point estimate"
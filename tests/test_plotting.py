@@ -0,0 +1,47 @@
+import pytest
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from plotting import PlotQueue, plot_queue
+from Preprocessing import visualization
+from config import Plot_Directory
+
+def save_plot(df, path, calls):
+    """ Stands in for a plot function: writes a file and returns its path """
+    calls.append(path)
+    with open(path, 'w') as file:
+        file.write(df.to_csv())
+    return [path]
+
+def test_plot_queue_skips_unchanged_plots(tmp_path):
+    """ Tests that plots are only redrawn when their input data changes, and never in 'off' mode """
+    df = pd.DataFrame({'age': [67.0, 61.0, 80.0]})
+    path = str(tmp_path / 'age.png')
+
+    calls = []
+    queue = PlotQueue('inline', directory=str(tmp_path))
+    queue.submit('age', save_plot, df, path, calls)
+    queue.close()
+    assert calls == [path], "The first run should draw the plot"
+
+    calls = []
+    queue = PlotQueue('inline', directory=str(tmp_path))
+    queue.submit('age', save_plot, df, path, calls)
+    assert calls == [], "Unchanged data should not be plotted again"
+    queue.submit('age', save_plot, df * 2, path, calls)
+    assert calls == [path], "Changed data should be plotted again"
+
+    calls = []
+    PlotQueue('off', directory=str(tmp_path)).submit('age', save_plot, df * 3, path, calls)
+    assert calls == [], "No plots should be drawn in 'off' mode"
+
+def test_plots_are_saved_in_the_plot_directory(tmp_path, monkeypatch):
+    """ Tests that the plots and the plot hashes both go to Plot_Directory """
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'gender': ['Male', 'Female', 'Male']})
+    files = visualization.plot_categorical_data(df, ['gender'])
+
+    assert files == [os.path.join(Plot_Directory, 'gender_value_counts.png')], "The plot should be saved in Plot_Directory"
+    assert os.path.exists(files[0]), "The plot file should exist"
+    assert os.path.dirname(plot_queue.manifest_path) == Plot_Directory, "The plot hashes should be stored next to the plots"
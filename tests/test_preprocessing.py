@@ -3,7 +3,7 @@ import pandas as pd
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
-from Preprocessing.preprocessing import explore_data, fill_missing_bmi, encode_columns
+from Preprocessing.preprocessing import explore_data, fill_missing_bmi, encode_columns, BMIImputer
 from logger import logger
 
 @pytest.fixture
@@ -38,6 +38,21 @@ def test_fill_missing_bmi(sample_df):
     assert df['bmi'].isna().sum() == 0, "Function should fill all missing BMI values"
     assert df['bmi'].dtype in [float, int], "BMI values should be numeric"
     assert (df['bmi'] >= 10).all() and (df['bmi'] <= 60).all(), "BMI values should be in a reasonable range"
+
+def test_bmi_imputer_on_new_rows(sample_df):
+    """ Tests that a fitted BMIImputer fills new rows with the medians learned during training """
+    imputer = BMIImputer().fit(sample_df)
+    new_rows = pd.DataFrame({
+        'gender': ['Male', 'Female', 'Other'],
+        'bmi': [None, None, None],
+        'avg_glucose_level': [500.0, 10.0, 90.0]
+    })
+
+    df = imputer.transform(new_rows)
+
+    assert df['bmi'].isna().sum() == 0, "Rows outside the training glucose range or with unseen genders should be filled"
+    assert df['bmi'][0] == 27.75, "Groups without a learned median should fall back to the gender median"
+    assert df['bmi'][2] == imputer.overall_median_, "Unseen genders should use the overall median"
     
 def test_encode_columns():
     """ Tests the encode_columns function """
@@ -0,0 +1,30 @@
+import pytest
+import json
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from profiler import StageProfiler
+
+def test_stage_profiler_report(tmp_path):
+    """ Tests that nested stages, fit counts and searches end up in the JSON timing report """
+    profiler = StageProfiler(profile_stage='inner', profile_directory=str(tmp_path / 'profiles'))
+
+    @profiler.stage('outer')
+    def outer():
+        with profiler.stage('inner'):
+            sum(range(100000))
+            profiler.count_fits(3, cached_fits=2)
+        profiler.record_search('search X/model', fit_time=0.5, fits=3, cached_fits=2)
+
+    outer()
+    report_path = str(tmp_path / 'timing_report.json')
+    profiler.write_report(report_path)
+    with open(report_path) as file:
+        records = {record['stage']: record for record in json.load(file)['records']}
+
+    assert set(records) == {'outer', 'inner', 'search X/model'}, "Every stage and search should be recorded"
+    assert records['outer']['fits'] == 3 and records['outer']['cached_fits'] == 2, "Fits should count in the enclosing stages"
+    assert records['outer']['wall_time'] >= records['inner']['wall_time'] > 0, "The outer stage should include the inner one"
+    assert records['outer']['peak_rss_mb'] is None or records['outer']['peak_rss_mb'] >= records['inner']['peak_rss_mb'], \
+        "The outer stage's peak should include the inner stage's peak"
+    assert os.path.exists(tmp_path / 'profiles' / 'inner.prof'), "The selected stage should be profiled"
@@ -0,0 +1,127 @@
+import pytest
+import time
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.datasets import make_classification
+from sklearn.model_selection import GridSearchCV
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.decomposition import PCA
+from sklearn.neural_network import MLPClassifier
+import scheduler
+from scheduler import run_search, run_schedule
+from search import fit_preprocessing, warm_start_parameter
+
+class SleepyClassifier(ClassifierMixin, BaseEstimator):
+    """ Stands in for a slow model: fitting sleeps for delay seconds """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def fit(self, X, y):
+        time.sleep(self.delay)
+        self.classes_ = np.unique(y)
+        return self
+
+    def predict(self, X):
+        return np.full(len(X), self.classes_[0])
+
+@pytest.fixture
+
+def sample_data():
+    """ Creates a small classification problem for testing """
+    return make_classification(n_samples=200, n_features=6, random_state=42)
+
+def test_exhaustive_search_matches_grid_search(sample_data):
+    """ Tests that the exhaustive strategy picks the same parameters as GridSearchCV """
+    X, y = sample_data
+    estimator = DecisionTreeClassifier(random_state=42)
+    param_grid = {'max_depth': [None, 2, 4], 'min_samples_leaf': [1, 4]}
+
+    grid_search = GridSearchCV(estimator, param_grid, cv=5).fit(X, y)
+    _, best_params, n_fits = run_search(estimator, param_grid, X, y, strategy='exhaustive', n_jobs=1)
+
+    assert best_params == grid_search.best_params_, "Exhaustive search should match GridSearchCV"
+    assert n_fits == 6 * 5 + 1, "Every candidate should be fitted on every fold, plus the refit"
+
+def test_halving_search_on_estimators(sample_data):
+    """ Tests that successive halving uses fewer fits and ends with the full number of estimators """
+    X, y = sample_data
+    estimator = RandomForestClassifier(random_state=42)
+    param_grid = {'n_estimators': [5, 10, 20], 'max_depth': [None, 2, 4, 8]}
+
+    best_model, best_params, n_fits = run_search(estimator, param_grid, X, y, strategy='halving',
+                                                 n_jobs=1, resource='n_estimators', factor=2)
+
+    assert best_params['n_estimators'] == 20, "The final round should use the full number of estimators"
+    assert best_model.n_estimators == 20, "The refitted model should use the best parameters"
+    assert n_fits < 12 * 5, "Halving should need fewer fits than the exhaustive search"
+
+def test_warm_start_path_matches_grid_search(sample_data):
+    """ Tests that growing the forests along n_estimators scores like refitting every value """
+    X, y = sample_data
+    estimator = RandomForestClassifier(random_state=42)
+    param_grid = {'n_estimators': [5, 10, 20], 'max_depth': [None, 2, 4]}
+
+    grid_search = GridSearchCV(estimator, param_grid, cv=5).fit(X, y)
+    result = run_schedule({'X': X}, y, {'model': estimator}, {'model': param_grid}, n_jobs=1)[('X', 'model')]
+
+    assert result['best_params'] == grid_search.best_params_, "Warm-started paths should match GridSearchCV"
+    assert result['n_warm'] == 3 * 2 * 5, "The 10- and 20-tree fits should extend the smaller fits"
+
+def test_mlp_is_not_warm_started_in_searches():
+    """ Tests that MLPs are only grown by warm starting for incremental updates, where a fresh fit is not expected """
+    candidates = [{'max_iter': [100, 200]}]
+    assert warm_start_parameter(MLPClassifier(), candidates) is None, "A warm-started MLP restarts its optimizer, searches should refit it"
+    assert warm_start_parameter(MLPClassifier(), candidates, exact=False) == 'max_iter', "Updates should still grow MLP iterations"
+    assert warm_start_parameter(RandomForestClassifier(), [{'n_estimators': [5, 10]}]) == 'n_estimators', "Forests grow exactly"
+
+def test_budget_cancels_slow_candidates(sample_data):
+    """ Tests that fits over their budget are cancelled and reported, without changing the other searches """
+    X, y = sample_data
+    models = {'Decision Tree': DecisionTreeClassifier(random_state=42), 'Slow': SleepyClassifier()}
+    param_grids = {'Decision Tree': {'max_depth': [2, 4]}, 'Slow': {'delay': [0.0, 30.0]}}
+    budgets = {'Slow': {'core_share': 0.5, 'max_fit_time': 0.5}}
+
+    start_time = time.perf_counter()
+    results = run_schedule({'X': X}, y, models, param_grids, cv=2, n_jobs=2, budgets=budgets)
+    unbudgeted = run_schedule({'X': X}, y, {'Decision Tree': models['Decision Tree']}, param_grids, cv=2, n_jobs=1)
+
+    slow = results[('X', 'Slow')]
+    assert time.perf_counter() - start_time < 30, "Slow fits should not run to the end"
+    assert slow['best_params'] == {'delay': 0.0}, "The search should pick the candidate within its budget"
+    assert [entry['reason'] for entry in slow['cancelled']] == ['timeout'] * 2, "Both folds of the slow candidate should be cancelled"
+    assert results[('X', 'Decision Tree')]['best_params'] == unbudgeted[('X', 'Decision Tree')]['best_params'], \
+        "Searches without a budget should not be affected"
+
+def test_in_fold_preprocessing_matches_pipeline_search(sample_data, monkeypatch):
+    """ Tests that in-fold scaling and PCA search like a GridSearchCV pipeline, fitting the preprocessing once per fold """
+    X, y = sample_data
+    X = X * 10 + 5
+    fits = []
+    monkeypatch.setattr(scheduler, 'fit_preprocessing', lambda *args: fits.append(1) or fit_preprocessing(*args))
+
+    pipeline = Pipeline([('scaler', StandardScaler()), ('pca', PCA()), ('model', LogisticRegression())])
+    grid_search = GridSearchCV(pipeline, {'model__C': [0.01, 1], 'pca__n_components': [2, 4]}, cv=5).fit(X, y)
+    results = run_schedule({'All': X, 'PCA': X}, y, {'model': LogisticRegression()}, {'model': {'C': [0.01, 1]}},
+                           n_jobs=1, preprocessing={'All': [None], 'PCA': [2, 4]})
+    result = results[('PCA', 'model')]
+
+    assert result['best_params'] == {'C': grid_search.best_params_['model__C'], 'pca__n_components': grid_search.best_params_['pca__n_components']}, \
+        "In-fold preprocessing should pick the same parameters as the pipeline search"
+    assert isinstance(result['best_estimator'], Pipeline), "The best estimator should include its preprocessing"
+    assert np.array_equal(result['best_estimator'].predict(X), grid_search.predict(X)), "The pipelines should predict alike"
+    assert len(fits) == 5 + 1, "The preprocessing of the shared matrix should be fitted once per fold and once for the refits"
+    assert 'pca__n_components' not in results[('All', 'model')]['best_params'], "A fixed number of components should not be reported"
+
+    chunked = run_schedule({'PCA': X}, y, {'model': LogisticRegression()}, {'model': {'C': [0.01, 1]}},
+                           n_jobs=1, preprocessing={'PCA': [2, 4]}, preprocessing_batch_size=64)[('PCA', 'model')]
+    assert chunked['best_params'] == result['best_params'], "Chunked preprocessing should pick the same parameters"
+    assert np.allclose(chunked['best_estimator'].predict_proba(X), result['best_estimator'].predict_proba(X)), \
+        "Chunked preprocessing should fit the same pipeline"
@@ -0,0 +1,85 @@
+import pytest
+import json
+import asyncio
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from sklearn.ensemble import RandomForestClassifier
+from Preprocessing.preprocessing import fill_missing_bmi, encode_columns
+from FeatureAnalysis.feature_analysis import split_data
+from config import Encoding_Dictionary
+from inference import export_model, predict_batch
+from server import ScoringServer
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/healthcare-dataset-stroke-data.csv')
+
+@pytest.fixture
+
+def artifact(tmp_path):
+    """ Exports a small random forest trained on the first rows of the stroke dataset """
+    raw_df = pd.read_csv(DATA_PATH, index_col='id', nrows=300)
+    df, bmi_imputer = fill_missing_bmi(raw_df, return_imputer=True)
+    df = encode_columns(df, Encoding_Dictionary)
+    X_train, _, y_train, _, scaler = split_data(df, 'stroke', return_scaler=True)
+    model = RandomForestClassifier(n_estimators=10, random_state=42).fit(X_train, y_train)
+    return export_model(str(tmp_path / 'model.joblib'), model, 'Random Forest', 'AllFeatures', df.columns.drop('stroke'),
+                        bmi_imputer, Encoding_Dictionary, scaler)
+
+async def request(port, method, path, payload=None):
+    """ Sends one HTTP request and returns the status and JSON body of the response """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    return int(head.split()[1]), json.loads(body)
+
+def test_concurrent_requests_are_micro_batched(artifact):
+    """ Tests that concurrent single-patient requests are scored in shared batches like predict_batch """
+    df = pd.read_csv(DATA_PATH, nrows=30).drop(columns=['id', 'stroke'])
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+
+    async def run():
+        server = ScoringServer(artifact, max_batch_size=16, max_wait_ms=50)
+        await server.start('127.0.0.1', 0)
+        responses = await asyncio.gather(*[request(server.port, 'POST', '/predict', record) for record in records])
+        bad_request = await request(server.port, 'POST', '/predict', {'age': 50})
+        metrics = await request(server.port, 'GET', '/metrics')
+        await server.close()
+        return responses, bad_request, metrics
+
+    responses, (bad_status, _), (_, metrics) = asyncio.run(run())
+    expected = predict_batch(df, artifact)
+
+    assert [status for status, _ in responses] == [200] * len(records), "Every valid request should be scored"
+    assert [body['predictions'][0]['stroke_probability'] for _, body in responses] == list(expected['stroke_probability']), \
+        "Batched predictions should match predict_batch"
+    assert bad_status == 400, "A record without the feature columns should be rejected"
+    assert metrics['records'] == len(records) and metrics['batches'] < len(records), "Concurrent requests should share batches"
+
+def test_bad_record_does_not_fail_its_batch(artifact):
+    """ Tests that a bad record is rejected on its own while the good record sent with it is scored """
+    df = pd.read_csv(DATA_PATH, nrows=2).drop(columns=['id', 'stroke'])
+    good, bad = df.astype(object).where(df.notna(), None).to_dict('records')
+    bad['age'] = 'abc'
+    unscorable = dict(good, gender=['Male'])
+
+    async def run():
+        server = ScoringServer(artifact, max_batch_size=16, max_wait_ms=200)
+        await server.start('127.0.0.1', 0)
+        responses = await asyncio.gather(request(server.port, 'POST', '/predict', good),
+                                         request(server.port, 'POST', '/predict', bad))
+        # Records that reach the batch unchecked are scored one by one when the batch fails
+        scored = await asyncio.gather(server.score([good]), server.score([unscorable]), return_exceptions=True)
+        await server.close()
+        return responses, scored
+
+    ((good_status, good_body), (bad_status, bad_body)), (good_rows, bad_error) = asyncio.run(run())
+    expected = predict_batch(df.iloc[:1], artifact)['stroke_probability'].iloc[0]
+
+    assert good_status == 200 and good_body['predictions'][0]['stroke_probability'] == expected, "The good record should be scored"
+    assert bad_status == 400 and 'age' in bad_body['error'], "The bad value should be rejected with its column"
+    assert good_rows[0]['stroke_probability'] == expected, "The good request of a failed batch should still be scored"
+    assert isinstance(bad_error, Exception), "Only the request with the bad record should fail"
@@ -0,0 +1,58 @@
+import pytest
+import logging
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from Preprocessing.preprocessing import fill_missing_bmi, encode_columns, apply_schema
+from Preprocessing.streaming import stream_preprocess, load_columnar
+from logger import logger
+from config import Categorical_Columns, Numeric_Columns, Encoding_Dictionary, Column_Schema
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/healthcare-dataset-stroke-data.csv')
+
+def test_stream_preprocess_matches_in_memory(tmp_path):
+    """ Tests that streaming preprocessing produces the same dataset as the in-memory path """
+    output_directory = str(tmp_path / 'intermediate')
+    stats, imputer = stream_preprocess(DATA_PATH, output_directory, Categorical_Columns, Numeric_Columns,
+                                       Encoding_Dictionary, chunksize=1000)
+    df = load_columnar(output_directory)
+
+    expected = encode_columns(fill_missing_bmi(pd.read_csv(DATA_PATH, index_col='id')), Encoding_Dictionary)
+
+    assert list(df.columns) == list(expected.columns), "Columns should keep the file's order"
+    assert (df.index == expected.index).all(), "Rows should keep the file's order"
+    assert (df.astype(float).to_numpy() == expected.astype(float).to_numpy()).all(), "Values should match the in-memory path"
+    assert stats.missing_values['bmi'] == 201, "Missing values should be counted over all chunks"
+    assert stats.describe().loc['count', 'bmi'] == 4909, "Descriptive statistics should cover all chunks"
+
+def test_stream_preprocess_with_schema(tmp_path):
+    """ Tests that streaming preprocessing writes the compact types of the schema """
+    output_directory = str(tmp_path / 'intermediate')
+    stream_preprocess(DATA_PATH, output_directory, Categorical_Columns, Numeric_Columns,
+                      Encoding_Dictionary, chunksize=1000, schema=Column_Schema)
+    df = load_columnar(output_directory)
+
+    expected = encode_columns(fill_missing_bmi(pd.read_csv(DATA_PATH, index_col='id')), Encoding_Dictionary)
+    expected = apply_schema(expected, Column_Schema)
+
+    assert (df.dtypes == expected.dtypes).all(), "Columns should have the types of the schema"
+    assert df['stroke'].dtype == bool, "Flags should be stored as bool"
+    assert (df.astype(float).to_numpy() == expected.astype(float).to_numpy()).all(), "Values should match the in-memory path"
+
+def test_stream_preprocess_cleans_up_without_info_logs(tmp_path):
+    """ Tests that the spill files of the duplicate count are closed and removed when INFO messages are filtered """
+    output_directory = str(tmp_path / 'intermediate')
+    n_open = len(os.listdir('/proc/self/fd')) if os.path.isdir('/proc/self/fd') else None
+    previous = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        stats, _ = stream_preprocess(DATA_PATH, output_directory, Categorical_Columns, Numeric_Columns,
+                                     Encoding_Dictionary, chunksize=1000)
+    finally:
+        logger.setLevel(previous)
+
+    assert not os.path.exists(os.path.join(output_directory, '_hashes')), "The spill directory should be removed"
+    assert all(file.closed for file in stats.buckets), "The bucket files should be closed"
+    if n_open is not None:
+        assert len(os.listdir('/proc/self/fd')) <= n_open, "No file descriptor should be left open"
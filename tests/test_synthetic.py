@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from synthetic import generate_stroke_data, write_stroke_csv
+from Preprocessing.preprocessing import fill_missing_bmi, encode_columns, apply_schema
+from FeatureAnalysis.feature_analysis import split_data, pca_analysis
+from config import Encoding_Dictionary, Column_Schema
+
+@pytest.fixture
+
+def synthetic_df():
+    """ Generates a synthetic dataset of 50,000 records """
+    return generate_stroke_data(50000)
+
+def test_synthetic_data_keeps_the_schema(synthetic_df):
+    """ Tests that the synthetic records have the categories, missing BMI rate and class imbalance of the real data """
+    for column, mapping in Encoding_Dictionary.items():
+        assert set(synthetic_df[column]) <= set(mapping), f"{column} should only have the encoded categories"
+
+    assert abs(synthetic_df['bmi'].isna().mean() - 0.0393) < 0.005, "About 3.9% of the BMI values should be missing"
+    assert abs(synthetic_df['stroke'].mean() - 0.0487) < 0.005, "About 4.9% of the records should be strokes"
+    assert synthetic_df['id'].is_unique, "Ids should be unique"
+
+def test_stages_on_synthetic_data(synthetic_df):
+    """ Tests that the preprocessing, split and PCA stages run on a larger dataset """
+    df = apply_schema(encode_columns(fill_missing_bmi(synthetic_df.set_index('id')), Encoding_Dictionary), Column_Schema)
+    assert not df.isna().any().any(), "Preprocessing should leave no missing values"
+
+    X_train, X_test, y_train, y_test = split_data(df, 'stroke', dtype='float32')
+    X_pca, pca = pca_analysis(X_train)
+
+    assert len(X_train) + len(X_test) == len(df), "Every record should be in the training or the test set"
+    assert X_pca.shape == X_train.shape, "PCA should keep every component"
+    assert np.all(np.diff(pca.explained_variance_) <= 0), "Components should be sorted by explained variance"
+
+    X_raw, _, _, _, scaler, (train_moments, _) = split_data(df, 'stroke', return_scaler=True, return_moments=True,
+                                                            scale=False, batch_size=4096)
+    assert train_moments.n_samples == len(X_train), "Every training row should be counted once across the chunks"
+    assert np.allclose(scaler.mean_, X_raw.astype(np.float64).mean(axis=0)) and \
+        np.allclose(scaler.scale_, X_raw.astype(np.float64).std(axis=0)), "Chunked moments should give the scaler of the training rows"
+
+def test_write_stroke_csv_in_chunks(tmp_path):
+    """ Tests that a CSV file written in chunks has consecutive ids """
+    df = pd.read_csv(write_stroke_csv(str(tmp_path / 'stroke.csv'), 2500, chunksize=1000))
+
+    assert len(df) == 2500 and list(df['id']) == list(range(1, 2501)), "Ids should continue across chunks"
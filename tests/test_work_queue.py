@@ -0,0 +1,115 @@
+import pytest
+import os
+import sys
+import time
+import threading
+import subprocess
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from sklearn.datasets import make_classification
+from sklearn.tree import DecisionTreeClassifier
+from scheduler import run_schedule
+from cache import EstimatorCache
+from work_queue import WorkQueueExecutor, run_worker
+
+Worker_Script = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src/worker.py'))
+
+@pytest.fixture
+
+def start_worker(tmp_path):
+    """ Starts local worker processes on a queue directory and stops them after the test """
+    processes = []
+
+    def start(directory):
+        process = subprocess.Popen([sys.executable, Worker_Script, str(directory), '--heartbeat', '0.2'],
+                                   cwd=tmp_path, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        processes.append(process)
+        return process
+    yield start
+    for process in processes:
+        process.kill()
+        process.wait()
+
+def test_work_queue_search_matches_local_search(tmp_path, start_worker):
+    """ Tests that a search run by queue workers picks the same parameters as the local search """
+    X, y = make_classification(n_samples=200, n_features=6, random_state=42)
+    models = {'Decision Tree': DecisionTreeClassifier(random_state=42)}
+    param_grids = {'Decision Tree': {'max_depth': [None, 2, 4], 'min_samples_leaf': [1, 4]}}
+    for _ in range(2):
+        start_worker(tmp_path / 'queue')
+
+    queued = run_schedule({'X': X}, y, models, param_grids, n_jobs=1, work_queue=str(tmp_path / 'queue'))[('X', 'Decision Tree')]
+    local = run_schedule({'X': X}, y, models, param_grids, n_jobs=1)[('X', 'Decision Tree')]
+
+    assert queued['best_params'] == local['best_params'], "The queue workers should score the candidates like local fits"
+    assert queued['best_estimator'].get_depth() == local['best_estimator'].get_depth(), "The refit should be done by a worker"
+    assert os.listdir(tmp_path / 'queue' / 'tasks') == [], "No task should be left in the queue"
+
+def test_work_queue_uses_the_coordinator_cache(tmp_path, start_worker, monkeypatch):
+    """ Tests that a worker in another working directory fills and reads the coordinator's relative cache directory """
+    X, y = make_classification(n_samples=200, n_features=6, random_state=42)
+    models = {'Decision Tree': DecisionTreeClassifier(random_state=42)}
+    param_grids = {'Decision Tree': {'max_depth': [None, 2, 4]}}
+    (tmp_path / 'coordinator').mkdir()
+    monkeypatch.chdir(tmp_path / 'coordinator')
+    start_worker(tmp_path / 'queue')
+
+    first = run_schedule({'X': X}, y, models, param_grids, n_jobs=1, cache=EstimatorCache('cache'),
+                         work_queue=str(tmp_path / 'queue'))[('X', 'Decision Tree')]
+    second = run_schedule({'X': X}, y, models, param_grids, n_jobs=1, cache=EstimatorCache('cache'),
+                          work_queue=str(tmp_path / 'queue'))[('X', 'Decision Tree')]
+
+    assert first['n_fits'] == 3 * 5 + 1 and first['best_estimator'] is not None, "The first search should fit every task"
+    assert len(os.listdir(tmp_path / 'coordinator' / 'cache')) == 3 * 5 + 1, "The fits should be stored in the coordinator's cache"
+    assert second['n_fits'] == 0 and second['n_cached'] == 3 * 5 + 1, "The second search should load every fit from that cache"
+    assert not os.path.exists(tmp_path / 'cache'), "The worker should not write a cache of its own"
+
+def test_dead_worker_task_is_requeued(tmp_path, start_worker):
+    """ Tests that the task of a killed worker is handed to a worker that joins later """
+    directory = tmp_path / 'queue'
+    outcomes = []
+    with WorkQueueExecutor(str(directory), heartbeat_timeout=1.0) as executor:
+        first = start_worker(directory)
+        coordinator = threading.Thread(target=lambda: outcomes.extend(executor.run([('group', time.sleep, (2.0,), None)])))
+        coordinator.start()
+
+        # Kill the worker once it claimed the task, then let another one join
+        deadline = time.time() + 30
+        while time.time() < deadline and not any(os.listdir(directory / 'running' / name) for name in os.listdir(directory / 'running')):
+            time.sleep(0.05)
+        first.kill()
+        start_worker(directory)
+        coordinator.join(timeout=60)
+
+    assert [status for status, _, _ in outcomes] == ['done'], "The task should be completed by the second worker"
+    assert executor.n_requeued == 1, "The task of the killed worker should be re-queued once"
+
+def test_run_without_workers_times_out(tmp_path):
+    """ Tests that tasks nobody picks up fail the run and are removed from the queue """
+    directory = tmp_path / 'queue'
+    with pytest.raises(RuntimeError, match='picked up'):
+        with WorkQueueExecutor(str(directory), heartbeat_timeout=0.2, pickup_timeout=0.5) as executor:
+            executor.run([('group', time.sleep, (0.0,), None)])
+
+    assert os.listdir(directory / 'tasks') == [] and os.listdir(directory / 'shared') == [], "The run should leave nothing behind"
+
+def test_worker_drops_tasks_of_a_closed_coordinator(tmp_path):
+    """ Tests that a worker drops the tasks whose shared data is gone instead of crashing on them """
+    directory = tmp_path / 'queue'
+    executor = WorkQueueExecutor(str(directory), heartbeat_timeout=0.2, pickup_timeout=2.0)
+    errors = []
+
+    def coordinate():
+        try:
+            executor.run([('group', time.sleep, (0.0,), None)])
+        except RuntimeError as e:
+            errors.append(e)
+    coordinator = threading.Thread(target=coordinate)
+    coordinator.start()
+    while not os.listdir(directory / 'tasks'):
+        time.sleep(0.05)
+    os.remove(executor.shared_path)
+
+    assert run_worker(str(directory), heartbeat_interval=0.2, idle_timeout=0.5) == 0, "The stale task should not be run"
+    assert os.listdir(directory / 'tasks') == [] and os.listdir(directory / 'running') == [], "The stale task should be dropped"
+    coordinator.join(timeout=30)
+    assert len(errors) == 1, "The coordinator should give up on the dropped task"